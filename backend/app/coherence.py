@@ -0,0 +1,160 @@
+"""Cross-process invalidation of in-process mailbox caches.
+
+Every mailbox write bumps the single-row ``mailbox_state.version`` counter in
+the same transaction. Each worker remembers the last version it has seen and
+re-reads the counter at most once per ``CACHE_COHERENCE_INTERVAL`` seconds, so
+writes made by other workers become visible within that delay for the cost of
+one primary-key lookup per interval. Versions produced by this worker's own
+committed writes are acknowledged and do not trigger invalidation, because
+local writers update their caches directly.
+
+Each bump also logs the ids of the emails it changed in ``mailbox_changes``.
+A worker that sees versions written elsewhere reads their ids and hands them
+to the change subscribers, which re-read just those emails. Caches are only
+dropped when the log cannot explain the gap: it was trimmed past
+``CACHE_CHANGE_LOG_SIZE`` versions, a version was bumped without a log entry
+(a restore), or the database changed underneath.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from sqlite3 import Connection
+from typing import Callable, Iterable
+
+from app import database
+
+CHECK_INTERVAL = float(os.getenv("CACHE_COHERENCE_INTERVAL", "0.1"))
+# Guard against unbounded growth when writes happen but nothing ever reads.
+MAX_PENDING_ACKNOWLEDGEMENTS = 10_000
+CHANGE_LOG_SIZE = int(os.getenv("CACHE_CHANGE_LOG_SIZE", "10000"))
+
+
+class MailboxVersion:
+    def __init__(self, interval: float = CHECK_INTERVAL) -> None:
+        self.interval = interval
+        self.version: int | None = None
+        self.invalidations = 0
+        self.deltas = 0
+        self._database: str | None = None
+        self._checked_at = 0.0
+        self._acknowledged: set[int] = set()
+        self._listeners: list[Callable[[], None]] = []
+        self._change_listeners: list[Callable[[Connection, list[int]], None]] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Callable[[], None]) -> None:
+        """Register a callback that drops a local cache when another process writes."""
+        self._listeners.append(callback)
+
+    def subscribe_changes(self, callback: Callable[[Connection, list[int]], None]) -> None:
+        """Register a callback that re-reads the emails another process changed."""
+        self._change_listeners.append(callback)
+
+    def bump(self, conn: Connection, email_ids: Iterable[int] = ()) -> int:
+        """Record a write of ``email_ids`` in the current transaction and return its version."""
+        version = conn.execute(
+            "UPDATE mailbox_state SET version = version + 1 WHERE id = 1 RETURNING version"
+        ).fetchone()[0]
+        conn.execute(
+            "INSERT OR REPLACE INTO mailbox_changes (version, emails) VALUES (?, ?)",
+            (version, json.dumps(sorted(set(email_ids)))),
+        )
+        if version % 100 == 0:
+            conn.execute(
+                "DELETE FROM mailbox_changes WHERE version <= ?", (version - CHANGE_LOG_SIZE,)
+            )
+        database.on_commit(conn, lambda: self.acknowledge(version))
+        return version
+
+    def acknowledge(self, version: int) -> None:
+        with self._lock:
+            if self.version is None or version <= self.version:
+                return
+            self._acknowledged.add(version)
+            while self.version + 1 in self._acknowledged:
+                self.version += 1
+                self._acknowledged.discard(self.version)
+            if len(self._acknowledged) > MAX_PENDING_ACKNOWLEDGEMENTS:
+                self._acknowledged.clear()
+                self._checked_at = 0.0
+
+    def check(self, conn: Connection) -> int:
+        """Return the current mailbox version, invalidating caches if another worker wrote."""
+        now = time.monotonic()
+        if (
+            self.version is not None
+            and now - self._checked_at < self.interval
+            and self._database == database.DATABASE_PATH
+        ):
+            return self.version
+
+        observed = conn.execute("SELECT version FROM mailbox_state WHERE id = 1").fetchone()[0]
+        invalidate = False
+        remote: list[int] = []
+        with self._lock:
+            if self._database != database.DATABASE_PATH:
+                invalidate = self.version is not None
+                self._database = database.DATABASE_PATH
+                self.version = observed
+                self._acknowledged.clear()
+            elif self.version is None:
+                self.version = observed
+            elif observed != self.version:
+                # Gone backwards, or further behind than the log reaches.
+                invalidate = not 0 < observed - self.version <= CHANGE_LOG_SIZE
+                if not invalidate:
+                    remote = [
+                        version
+                        for version in range(self.version + 1, observed + 1)
+                        if version not in self._acknowledged
+                    ]
+                self._acknowledged = {
+                    version for version in self._acknowledged if version > observed
+                }
+                self.version = observed
+            self._checked_at = now
+            version = self.version
+
+        if invalidate:
+            self.invalidate()
+        elif remote:
+            self._apply_changes(conn, remote)
+        return version
+
+    def _apply_changes(self, conn: Connection, versions: list[int]) -> None:
+        rows = conn.execute(
+            "SELECT version, emails FROM mailbox_changes WHERE version BETWEEN ? AND ?",
+            (versions[0], versions[-1]),
+        ).fetchall()
+        logged = {row[0]: row[1] for row in rows}
+        if any(version not in logged for version in versions):
+            self.invalidate()
+            return
+        email_ids = sorted(
+            {email_id for version in versions for email_id in json.loads(logged[version])}
+        )
+        self.deltas += 1
+        if email_ids:
+            for callback in self._change_listeners:
+                callback(conn, email_ids)
+
+    def invalidate(self) -> None:
+        self.invalidations += 1
+        for callback in self._listeners:
+            callback()
+
+    def snapshot(self) -> dict:
+        return {
+            "version": self.version,
+            "interval_seconds": self.interval,
+            "invalidations": self.invalidations,
+            "deltas": self.deltas,
+            "subscribers": len(self._listeners) + len(self._change_listeners),
+        }
+
+
+mailbox_version = MailboxVersion()
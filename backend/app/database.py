@@ -1,31 +1,189 @@
 import os
+import queue
 import sqlite3
+import threading
 from contextlib import contextmanager
-from typing import Generator
+from typing import Callable, Generator
+from urllib.parse import quote
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATABASE_PATH = os.getenv("DATABASE_PATH", os.path.join(BASE_DIR, "data", "app.db"))
+# "file" (default), "memory" (process-local; DATABASE_PATH only names the
+# database) or "template" (a file cloned from a pre-migrated template when new).
+DATABASE_MODE = os.getenv("DATABASE_MODE", "file")
+# Migrated once and then copied into every new database. Used by "template"
+# mode, and by "memory" mode when set explicitly.
+DATABASE_TEMPLATE_PATH = os.getenv(
+    "DATABASE_TEMPLATE_PATH",
+    os.path.join(BASE_DIR, "data", "template.db") if DATABASE_MODE == "template" else "",
+)
+# Cold tier for archived mail, ATTACHed as "cold" on connections that need it.
+ARCHIVE_DATABASE_PATH = os.getenv(
+    "ARCHIVE_DATABASE_PATH", f"{os.path.splitext(DATABASE_PATH)[0]}-archive.db"
+)
+# Must stay above the number of canonical statements in the repositories so
+# every one of them remains prepared for the lifetime of a pooled connection.
+STATEMENT_CACHE_SIZE = int(os.getenv("DATABASE_STATEMENT_CACHE_SIZE", "128"))
+POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "8"))
 
 
-def get_connection() -> sqlite3.Connection:
-    """Create a new database connection."""
-    db_dir = os.path.dirname(DATABASE_PATH)
+class Connection(sqlite3.Connection):
+    """SQLite connection that remembers prepared statements and commit hooks."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: set[str] = set()
+        self.commit_callbacks: list[Callable[[], None]] = []
+        self.attached: set[str] = set()
+
+
+_pool: "queue.LifoQueue[Connection]" = queue.LifoQueue(maxsize=POOL_SIZE)
+# In memory mode the databases live as long as one connection to them is open.
+_keeper: sqlite3.Connection | None = None
+_keeper_lock = threading.Lock()
+
+
+def _memory_uri(path: str) -> str:
+    # The memdb VFS shares a database between connections whose name starts
+    # with "/", and unlike a shared-cache database it keeps normal file
+    # locking, so busy timeouts apply between concurrent writers.
+    return f"file:/{quote(path.lstrip('/'))}?vfs=memdb"
+
+
+def archive_location() -> str:
+    """What to ATTACH as the cold archive in the current mode."""
+    if DATABASE_MODE == "memory":
+        return _memory_uri(ARCHIVE_DATABASE_PATH)
+    return ARCHIVE_DATABASE_PATH
+
+
+def _ensure_keeper() -> None:
+    global _keeper
+    with _keeper_lock:
+        if _keeper is None:
+            _keeper = sqlite3.connect(_memory_uri(DATABASE_PATH), uri=True, check_same_thread=False)
+            _keeper.execute("ATTACH DATABASE ? AS cold", (archive_location(),))
+
+
+def connect(path: str | None = None, **kwargs) -> sqlite3.Connection:
+    """Open a raw connection to ``path`` (default ``DATABASE_PATH``) in the configured mode."""
+    path = path or DATABASE_PATH
+    if DATABASE_MODE == "memory":
+        if path == DATABASE_PATH:
+            _ensure_keeper()
+        return sqlite3.connect(_memory_uri(path), uri=True, **kwargs)
+    db_dir = os.path.dirname(path)
     if db_dir:
         os.makedirs(db_dir, exist_ok=True)
-    conn = sqlite3.connect(DATABASE_PATH)
+    return sqlite3.connect(path, **kwargs)
+
+
+def get_connection() -> sqlite3.Connection:
+    """Create a new database connection."""
+    conn = connect(
+        factory=Connection,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,
+    )
     conn.row_factory = sqlite3.Row  # Enable dict-like access to rows
     return conn
 
 
+def on_commit(conn: sqlite3.Connection, callback: Callable[[], None]) -> None:
+    """Run ``callback`` once the current transaction on ``conn`` commits.
+
+    Callbacks are dropped if the transaction rolls back. Connections that are
+    not managed by ``get_db`` run the callback immediately.
+    """
+    callbacks = getattr(conn, "commit_callbacks", None)
+    if callbacks is None:
+        callback()
+        return
+    callbacks.append(callback)
+
+
+def archive_exists() -> bool:
+    return DATABASE_MODE == "memory" or os.path.exists(ARCHIVE_DATABASE_PATH)
+
+
+def attach_archive(conn: sqlite3.Connection, create: bool = False) -> bool:
+    """ATTACH the cold archive database as ``cold``; return whether it is available.
+
+    The archive is attached lazily, outside of any transaction, and stays
+    attached for the lifetime of the pooled connection. Without ``create``,
+    a missing archive file simply means there is no cold tier yet, and so
+    does one that appeared after the current transaction began: ATTACH is not
+    allowed inside it. Callers that must see such an archive attach before
+    they begin (see ``write_coalescer``).
+    """
+    attached = getattr(conn, "attached", None)
+    if attached is not None and "cold" in attached:
+        return True
+    if attached is None:
+        names = {row[1] for row in conn.execute("PRAGMA database_list").fetchall()}
+        if "cold" in names:
+            return True
+    if not create and not archive_exists():
+        return False
+    if conn.in_transaction:
+        if not create:
+            return False
+        raise RuntimeError("Cannot attach the archive database inside a transaction")
+    conn.execute("ATTACH DATABASE ? AS cold", (archive_location(),))
+    if attached is not None:
+        attached.add("cold")
+    return True
+
+
+def _run_commit_callbacks(conn: sqlite3.Connection) -> None:
+    callbacks = conn.commit_callbacks
+    conn.commit_callbacks = []
+    for callback in callbacks:
+        callback()
+
+
+def _acquire() -> sqlite3.Connection:
+    try:
+        return _pool.get_nowait()
+    except queue.Empty:
+        return get_connection()
+
+
+def _release(conn: sqlite3.Connection) -> None:
+    conn.commit_callbacks.clear()
+    if conn.in_transaction:
+        conn.rollback()
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.close()
+
+
+def warm_pool(prepare: Callable[[sqlite3.Connection], object] | None = None) -> int:
+    """Fill the pool with open connections, running ``prepare`` on each; returns how many."""
+    conns = [_acquire() for _ in range(POOL_SIZE)]
+    try:
+        if prepare is not None:
+            for conn in conns:
+                prepare(conn)
+    finally:
+        for conn in conns:
+            _release(conn)
+    return len(conns)
+
+
 @contextmanager
 def get_db() -> Generator[sqlite3.Connection, None, None]:
-    """Context manager for database connections."""
-    conn = get_connection()
+    """Context manager for pooled database connections."""
+    conn = _acquire()
     try:
         yield conn
         conn.commit()
     except Exception:
+        conn.commit_callbacks.clear()
         conn.rollback()
         raise
+    else:
+        _run_commit_callbacks(conn)
     finally:
-        conn.close()
+        _release(conn)
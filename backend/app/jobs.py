@@ -0,0 +1,277 @@
+"""Durable SQLite-backed job queue for deferred write-side work.
+
+Jobs are enqueued inside the caller's transaction, so they exist exactly when
+the write that produced them commits. Worker threads claim a job by marking it
+``running`` with a visibility deadline; a job whose worker dies becomes
+claimable again once ``locked_until`` passes. A handler runs in the same
+transaction that marks its job done, and failures are retried with
+exponential backoff up to ``max_attempts``. Jobs with a ``dedup_key`` are
+collapsed while one with the same key is pending or running.
+
+Kinds registered with ``every=`` are periodic: one instance is seeded when the
+queue starts and each run queues the next one in its own transaction. A
+periodic handler may return a number of seconds to run again sooner, e.g.
+when it stopped after one batch of a larger piece of work.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from sqlite3 import Connection
+from typing import Callable
+
+from app import database
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "60"))
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 300.0
+FINISHED_RETENTION_SECONDS = 24 * 3600
+
+Handler = Callable[[Connection, dict], "float | None"]
+
+
+class StaleClaim(Exception):
+    """The job was claimed again after this worker's visibility deadline passed."""
+
+
+class JobQueue:
+    def __init__(
+        self,
+        workers: int = WORKERS,
+        poll_interval: float = POLL_INTERVAL_SECONDS,
+        visibility_timeout: float = VISIBILITY_TIMEOUT_SECONDS,
+    ) -> None:
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.visibility_timeout = visibility_timeout
+        self.handlers: dict[str, Handler] = {}
+        self.periodic: dict[str, float] = {}
+        self.completed = 0
+        self.failed = 0
+        self.retried = 0
+        # (seconds spent waiting in the queue, seconds spent running)
+        self._latencies: deque[tuple[float, float]] = deque(maxlen=1000)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def register(self, kind: str, every: float | None = None) -> Callable[[Handler], Handler]:
+        """Decorator registering the handler for a job kind, optionally run every N seconds."""
+
+        def decorator(handler: Handler) -> Handler:
+            self.handlers[kind] = handler
+            if every is not None:
+                self.periodic[kind] = every
+            return handler
+
+        return decorator
+
+    def enqueue(
+        self,
+        conn: Connection,
+        kind: str,
+        payload: dict | None = None,
+        *,
+        dedup_key: str | None = None,
+        delay: float = 0.0,
+        max_attempts: int = 5,
+    ) -> int | None:
+        """Queue a job in the caller's transaction; returns None if deduplicated."""
+        now = time.time()
+        cursor = conn.execute(
+            """
+            INSERT OR IGNORE INTO jobs (kind, payload, dedup_key, max_attempts, run_at, created_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (kind, json.dumps(payload or {}), dedup_key, max_attempts, now + delay, now),
+        )
+        if cursor.rowcount == 0:
+            return None
+        database.on_commit(conn, self._wakeup.set)
+        return cursor.lastrowid
+
+    def schedule_periodic(self, conn: Connection, kind: str, delay: float = 0.0) -> None:
+        self.enqueue(conn, kind, dedup_key=f"periodic:{kind}", delay=delay)
+
+    def start(self) -> None:
+        if self.periodic:
+            with database.get_db() as conn:
+                for kind in self.periodic:
+                    self.schedule_periodic(conn, kind)
+        if self._threads or self.workers <= 0:
+            return
+        self._stopping.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop, name=f"job-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def run_pending(self, limit: int | None = None) -> int:
+        """Run ready jobs on the calling thread until none are left (or ``limit``)."""
+        processed = 0
+        while limit is None or processed < limit:
+            if not self._run_one():
+                break
+            processed += 1
+        return processed
+
+    def _worker_loop(self) -> None:
+        last_purge = 0.0
+        while not self._stopping.is_set():
+            try:
+                ran = self._run_one()
+                if time.monotonic() - last_purge > 60:
+                    self.purge_finished()
+                    last_purge = time.monotonic()
+            except Exception:
+                logger.exception("Job worker iteration failed")
+                ran = False
+            if not ran:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def _claim(self) -> tuple | None:
+        now = time.time()
+        with database.get_db() as conn:
+            rows = conn.execute(
+                """
+                UPDATE jobs
+                SET status = 'running', attempts = attempts + 1, locked_until = ?, started_at = ?
+                WHERE id = (
+                    SELECT id FROM jobs
+                    WHERE (status = 'pending' AND run_at <= ?)
+                       OR (status = 'running' AND locked_until <= ?)
+                    ORDER BY run_at, id
+                    LIMIT 1
+                )
+                RETURNING id, kind, payload, attempts, max_attempts, run_at
+                """,
+                (now + self.visibility_timeout, now, now, now),
+            ).fetchall()
+        return tuple(rows[0]) if rows else None
+
+    def _run_one(self) -> bool:
+        job = self._claim()
+        if job is None:
+            return False
+
+        job_id, kind, payload, attempts, max_attempts, run_at = job
+        started = time.time()
+        try:
+            handler = self.handlers.get(kind)
+            if handler is None:
+                raise LookupError(f"No handler registered for job kind {kind!r}")
+            with database.get_db() as conn:
+                result = handler(conn, json.loads(payload))
+                # The attempt number fences off a worker whose claim already expired:
+                # raising rolls the handler's writes back with the stale attempt.
+                cursor = conn.execute(
+                    """
+                    UPDATE jobs SET status = 'done', finished_at = ?, locked_until = NULL
+                    WHERE id = ? AND attempts = ?
+                    """,
+                    (time.time(), job_id, attempts),
+                )
+                if cursor.rowcount == 0:
+                    raise StaleClaim(f"Job {job_id} attempt {attempts} was claimed again")
+                if kind in self.periodic:
+                    delay = result if isinstance(result, (int, float)) else self.periodic[kind]
+                    self.schedule_periodic(conn, kind, delay)
+        except StaleClaim as exc:
+            # The current claim owns the job now; its outcome is the one recorded.
+            logger.warning("%s", exc)
+            return True
+        except Exception as exc:
+            self._record_failure(job_id, kind, attempts, max_attempts, exc)
+            return True
+
+        self.completed += 1
+        self._latencies.append((max(0.0, started - run_at), time.time() - started))
+        return True
+
+    def _record_failure(
+        self, job_id: int, kind: str, attempts: int, max_attempts: int, exc: Exception
+    ) -> None:
+        now = time.time()
+        error = f"{type(exc).__name__}: {exc}"
+        with database.get_db() as conn:
+            if attempts >= max_attempts:
+                self.failed += 1
+                logger.error("Job %s failed permanently: %s", job_id, error)
+                conn.execute(
+                    """
+                    UPDATE jobs SET status = 'failed', finished_at = ?, locked_until = NULL, last_error = ?
+                    WHERE id = ? AND attempts = ?
+                    """,
+                    (now, error, job_id, attempts),
+                )
+                if kind in self.periodic:
+                    self.schedule_periodic(conn, kind, self.periodic[kind])
+            else:
+                self.retried += 1
+                backoff = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+                conn.execute(
+                    """
+                    UPDATE jobs SET status = 'pending', run_at = ?, locked_until = NULL, last_error = ?
+                    WHERE id = ? AND attempts = ?
+                    """,
+                    (now + backoff, error, job_id, attempts),
+                )
+
+    def purge_finished(self, older_than: float = FINISHED_RETENTION_SECONDS) -> int:
+        with database.get_db() as conn:
+            cursor = conn.execute(
+                "DELETE FROM jobs WHERE status = 'done' AND finished_at < ?",
+                (time.time() - older_than,),
+            )
+            return cursor.rowcount
+
+    def stats(self, conn: Connection) -> dict:
+        rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        depth = {row[0]: row[1] for row in rows}
+        oldest = conn.execute(
+            "SELECT MIN(run_at) FROM jobs WHERE status = 'pending'"
+        ).fetchone()[0]
+        samples = list(self._latencies)
+        waits = sorted(sample[0] for sample in samples)
+        runs = sorted(sample[1] for sample in samples)
+        return {
+            "depth": {status: depth.get(status, 0) for status in ("pending", "running", "failed")},
+            "oldest_pending_age_seconds": round(max(0.0, time.time() - oldest), 3) if oldest else 0.0,
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+            "queue_wait_seconds": _summary(waits),
+            "run_seconds": _summary(runs),
+            "workers": len(self._threads),
+        }
+
+
+def _summary(values: list[float]) -> dict:
+    if not values:
+        return {"avg": 0.0, "p95": 0.0}
+    return {
+        "avg": round(sum(values) / len(values), 6),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 6),
+    }
+
+
+job_queue = JobQueue()
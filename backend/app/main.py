@@ -1,10 +1,52 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.routes import emails_router, health_router, items_router
+import migrate
+from app import database, profiling
+from app.database import get_db
+from app.jobs import job_queue
+from app.middleware import AdmissionMiddleware, CompressionMiddleware
+from app.services import contact_service, email_service, stats_service
+from app.services.send_scheduler import send_scheduler
+from app.warmup import warmup
+from app.routes import (
+    admin_router,
+    contacts_router,
+    emails_router,
+    health_router,
+    items_router,
+    threads_router,
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if database.DATABASE_MODE == "memory":
+        # An in-memory database only exists in this process, so no separate
+        # `migrate.py upgrade` can prepare it: clone or migrate it here.
+        migrate.run_migrations("upgrade")
+    with get_db() as conn:
+        email_service.load_inbox_index(conn)
+        contact_service.load_contact_index(conn)
+        stats_service.rebuild_stats(conn, force=False)
+    job_queue.start()
+    send_scheduler.start()
+    warmup.start()
+    try:
+        yield
+    finally:
+        warmup.stop()
+        send_scheduler.stop()
+        job_queue.stop()
+
 
-app = FastAPI(title="Backend Exercise API", version="1.0.0")
+app = FastAPI(title="Backend Exercise API", version="1.0.0", lifespan=lifespan)
 
+# Middleware added first runs innermost: admission control sits inside CORS so
+# 429/503 responses still carry CORS headers.
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -15,11 +57,19 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware)
+# Outermost, so a profile covers admission and compression too. Not installed
+# at all unless profiling is enabled.
+if profiling.ENABLED:
+    app.add_middleware(profiling.ProfilingMiddleware)
 
 # Register routers
 app.include_router(health_router)
 app.include_router(emails_router)
+app.include_router(contacts_router)
 app.include_router(items_router)
+app.include_router(threads_router)
+app.include_router(admin_router)
 
 
 if __name__ == "__main__":
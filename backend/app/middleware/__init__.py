@@ -0,0 +1,9 @@
+from app.middleware.admission import AdmissionMiddleware, admission_controller
+from app.middleware.compression import CompressionMiddleware, compressed_body_cache
+
+__all__ = [
+    "AdmissionMiddleware",
+    "CompressionMiddleware",
+    "admission_controller",
+    "compressed_body_cache",
+]
@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import json
+import math
+import os
+import time
+from urllib.parse import parse_qs
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# (tokens per second, burst size) for every rate-limited route class.
+BUDGETS = {
+    "search": (
+        float(os.getenv("RATE_LIMIT_SEARCH_PER_SECOND", "2")),
+        float(os.getenv("RATE_LIMIT_SEARCH_BURST", "10")),
+    ),
+    "list": (
+        float(os.getenv("RATE_LIMIT_LIST_PER_SECOND", "10")),
+        float(os.getenv("RATE_LIMIT_LIST_BURST", "40")),
+    ),
+    "write": (
+        float(os.getenv("RATE_LIMIT_WRITE_PER_SECOND", "5")),
+        float(os.getenv("RATE_LIMIT_WRITE_BURST", "20")),
+    ),
+}
+MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64"))
+SHED_RETRY_AFTER_SECONDS = 1
+# Liveness must answer even when the API is saturated.
+EXEMPT_PATHS = frozenset({"/health", "/ready"})
+SWEEP_INTERVAL_SECONDS = 10.0
+
+
+def classify(scope: Scope) -> str | None:
+    """Return the rate-limit budget a request is charged against, if any."""
+    path: str = scope["path"]
+    if not path.startswith("/emails"):
+        return None
+    if scope["method"] != "GET":
+        return "write"
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    if any(value.strip() for value in query.get("search", [])):
+        return "search"
+    return "list"
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float) -> None:
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class AdmissionController:
+    """Per-client token buckets plus a global in-flight request limit.
+
+    A bucket that has been idle long enough to refill completely is
+    indistinguishable from a new one, so periodic sweeps drop it and memory
+    stays proportional to the number of recently active clients.
+    """
+
+    def __init__(
+        self,
+        budgets: dict[str, tuple[float, float]] | None = None,
+        max_concurrency: int = MAX_CONCURRENCY,
+    ) -> None:
+        self.budgets = budgets if budgets is not None else BUDGETS
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.admitted = 0
+        self.rate_limited = 0
+        self.shed = 0
+        self._buckets: dict[tuple[str, str], TokenBucket] = {}
+        self._last_sweep = time.monotonic()
+
+    def try_acquire(self, client: str, route_class: str, now: float | None = None) -> float:
+        """Take one token; return 0 on success or the seconds until one is available."""
+        now = time.monotonic() if now is None else now
+        rate, burst = self.budgets[route_class]
+        if now - self._last_sweep >= SWEEP_INTERVAL_SECONDS:
+            self.sweep(now)
+
+        key = (client, route_class)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(burst, now)
+        else:
+            bucket.tokens = min(burst, bucket.tokens + (now - bucket.updated_at) * rate)
+            bucket.updated_at = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        self.rate_limited += 1
+        return (1 - bucket.tokens) / rate if rate > 0 else float(SWEEP_INTERVAL_SECONDS)
+
+    def sweep(self, now: float) -> None:
+        for key, bucket in list(self._buckets.items()):
+            rate, burst = self.budgets[key[1]]
+            if rate > 0 and bucket.tokens + (now - bucket.updated_at) * rate >= burst:
+                del self._buckets[key]
+        self._last_sweep = now
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "max_concurrency": self.max_concurrency,
+            "active_buckets": len(self._buckets),
+            "rate_limited": self.rate_limited,
+            "shed": self.shed,
+        }
+
+
+admission_controller = AdmissionController()
+
+
+class AdmissionMiddleware:
+    """Rejects over-budget clients with 429 and sheds load with 503 past ``max_concurrency``."""
+
+    def __init__(self, app: ASGIApp, controller: AdmissionController | None = None) -> None:
+        self.app = app
+        self.controller = controller if controller is not None else admission_controller
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        controller = self.controller
+        route_class = classify(scope)
+        if route_class is not None:
+            client = scope["client"][0] if scope.get("client") else "unknown"
+            retry_after = controller.try_acquire(client, route_class)
+            if retry_after:
+                await reject(send, 429, "Rate limit exceeded", retry_after)
+                return
+
+        if controller.in_flight >= controller.max_concurrency:
+            controller.shed += 1
+            await reject(send, 503, "Server busy", SHED_RETRY_AFTER_SECONDS)
+            return
+
+        controller.in_flight += 1
+        controller.admitted += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.in_flight -= 1
+
+
+async def reject(send: Send, status: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import zlib
+from collections import OrderedDict
+
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+# Low levels keep compression well under the cost of building the response;
+# the ratio gained at higher levels is small for JSON.
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "4"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+CACHE_MAX_BYTES = int(os.getenv("COMPRESSION_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+# Bodies above this size are compressed on a worker thread instead of the event loop.
+OFFLOAD_THRESHOLD = 64 * 1024
+
+
+def supported_encodings() -> tuple[str, ...]:
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    """Pick the preferred encoding we support from an Accept-Encoding header."""
+    weights: dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        weights[token] = quality
+
+    best: str | None = None
+    best_quality = 0.0
+    for encoding in supported_encodings():
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def streaming_compressor(encoding: str):
+    """Return a ``(chunk, finish) -> bytes`` function for chunked responses."""
+    if encoding == "br":
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+        def process(chunk: bytes, finish: bool) -> bytes:
+            data = compressor.process(chunk) + compressor.flush()
+            return data + compressor.finish() if finish else data
+
+        return process
+
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def process(chunk: bytes, finish: bool) -> bytes:
+        data = compressor.compress(chunk)
+        return data + compressor.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+
+    return process
+
+
+class CompressedBodyCache:
+    """Byte-bounded LRU of compressed bodies keyed by (ETag or digest, encoding)."""
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], bytes] = OrderedDict()
+
+    def get(self, key: tuple[str, str]) -> bytes | None:
+        body = self._entries.get(key)
+        if body is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return body
+
+    def put(self, key: tuple[str, str], body: bytes) -> None:
+        if len(body) > self.max_bytes // 4 or key in self._entries:
+            return
+        self._entries[key] = body
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+compressed_body_cache = CompressedBodyCache(CACHE_MAX_BYTES)
+
+
+class CompressionMiddleware:
+    """Negotiates brotli/gzip and compresses responses above ``minimum_size``.
+
+    Complete ``GET`` responses are memoized by their ETag (or a digest of the
+    body when there is none), so hot responses are compressed only once. No
+    route sets an ETag today, so every cached lookup hashes the full body;
+    the digest is far cheaper than compressing it again.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = MINIMUM_SIZE,
+        cache: CompressedBodyCache | None = None,
+    ) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.cache = cache if cache is not None else compressed_body_cache
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            encoding = negotiate_encoding(headers.get("Accept-Encoding", ""))
+            if encoding is not None:
+                responder = CompressionResponder(
+                    self.app,
+                    encoding,
+                    self.minimum_size,
+                    self.cache if scope["method"] == "GET" else None,
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class CompressionResponder:
+    def __init__(
+        self,
+        app: ASGIApp,
+        encoding: str,
+        minimum_size: int,
+        cache: CompressedBodyCache | None,
+    ) -> None:
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.cache = cache
+        self.send: Send = unattached_send
+        self.initial_message: Message = {}
+        self.started = False
+        self.passthrough = False
+        self.compressor = None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        message_type = message["type"]
+        if message_type == "http.response.start":
+            # Hold the start message until we know how the body is encoded.
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers
+        elif message_type != "http.response.body":
+            await self.send(message)
+        elif self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+        elif not self.started:
+            self.started = True
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+
+            if not more_body and len(body) < self.minimum_size:
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                del headers["Content-Length"]
+                self.compressor = streaming_compressor(self.encoding)
+                message["body"] = self.compressor(body, False)
+            else:
+                message["body"] = await self.compress_complete(body, headers)
+                headers["Content-Length"] = str(len(message["body"]))
+
+            await self.send(self.initial_message)
+            await self.send(message)
+        elif self.compressor is not None:
+            more_body = message.get("more_body", False)
+            message["body"] = self.compressor(message.get("body", b""), not more_body)
+            await self.send(message)
+        else:
+            await self.send(message)
+
+    async def compress_complete(self, body: bytes, headers: MutableHeaders) -> bytes:
+        key = None
+        if self.cache is not None and self.initial_message["status"] == 200:
+            tag = headers.get("etag") or hashlib.blake2b(body, digest_size=16).hexdigest()
+            key = (tag, self.encoding)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        if len(body) >= OFFLOAD_THRESHOLD:
+            compressed = await anyio.to_thread.run_sync(compress, body, self.encoding)
+        else:
+            compressed = compress(body, self.encoding)
+
+        if key is not None:
+            self.cache.put(key, compressed)
+        return compressed
+
+
+async def unattached_send(message: Message) -> None:
+    raise RuntimeError("send awaitable not set")  # pragma: no cover
@@ -0,0 +1,276 @@
+"""Opt-in per-request profiling.
+
+When ``PROFILING_ENABLED`` is set, ``ProfilingMiddleware`` is installed and
+profiles a request if it carries the ``X-Profile`` header, or at random with
+probability ``PROFILING_SAMPLE_RATE``. A profiled request gets a cProfile
+capture of the event loop thread and of the worker thread running its sync
+endpoint (``ProfiledRoute``), plus a breakdown of the time spent in named
+phases that the data path marks with ``phase(...)``. The last
+``PROFILING_BUFFER_SIZE`` profiles are kept in memory and served by
+``/admin/profiles``; the response carries an ``X-Profile-Id`` header. Stored
+query strings keep only the values of ``VISIBLE_QUERY_PARAMETERS``, so search
+terms typed by users never reach the buffer.
+
+Without the middleware nothing is profiled: ``phase`` and ``ProfiledRoute``
+only look up an unset context variable.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import inspect
+import io
+import itertools
+import os
+import pstats
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Iterator
+from urllib.parse import parse_qsl, urlencode
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+ENABLED = os.getenv("PROFILING_ENABLED", "0") not in ("0", "false", "False", "")
+SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+BUFFER_SIZE = int(os.getenv("PROFILING_BUFFER_SIZE", "32"))
+HEADER = "x-profile"
+TOP_FUNCTIONS = 30
+# Parameters that shape the work without carrying user data.
+VISIBLE_QUERY_PARAMETERS = frozenset({"filter", "limit", "offset"})
+
+_current: ContextVar["RequestProfile | None"] = ContextVar("request_profile", default=None)
+_NOT_PROFILED = nullcontext()
+# A thread runs one cProfile at a time; a second profiled request sharing the
+# event loop thread gets its phases but no function table for that thread.
+_captured_threads: set[int] = set()
+_captured_lock = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, query: str) -> None:
+        self.method = method
+        self.path = path
+        self.query = query
+        self.started_at = time.time()
+        self.phases: dict[str, list] = {}
+        self._profilers: list[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                totals = self.phases.setdefault(name, [0.0, 0])
+                totals[0] += elapsed
+                totals[1] += 1
+
+    @contextmanager
+    def capture(self) -> Iterator[None]:
+        """Run the block under cProfile, unless this thread is already captured."""
+        thread = threading.get_ident()
+        with _captured_lock:
+            if thread in _captured_threads:
+                owner = False
+            else:
+                _captured_threads.add(thread)
+                owner = True
+        if not owner:
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._profilers.append(profiler)
+            with _captured_lock:
+                _captured_threads.discard(thread)
+
+    def report(self, status: int | None, elapsed: float) -> dict:
+        phases = {
+            name: {"seconds": round(seconds, 6), "calls": calls}
+            for name, (seconds, calls) in sorted(self.phases.items())
+        }
+        accounted = sum(seconds for seconds, _ in self.phases.values())
+        phases["other"] = {"seconds": round(max(0.0, elapsed - accounted), 6), "calls": 1}
+        return {
+            "method": self.method,
+            "path": self.path,
+            "query": self.query,
+            "status": status,
+            "started_at": self.started_at,
+            "duration_seconds": round(elapsed, 6),
+            "phases": phases,
+            "functions": self._top_functions(),
+        }
+
+    def _top_functions(self) -> list[dict]:
+        if not self._profilers:
+            return []
+        stats = pstats.Stats(self._profilers[0], stream=io.StringIO())
+        for profiler in self._profilers[1:]:
+            stats.add(profiler)
+        rows = []
+        for (filename, line, name), (_, calls, own, cumulative, _) in stats.stats.items():
+            rows.append(
+                {
+                    "function": f"{os.path.basename(filename)}:{line}({name})",
+                    "calls": calls,
+                    "own_seconds": round(own, 6),
+                    "cumulative_seconds": round(cumulative, 6),
+                }
+            )
+        rows.sort(key=lambda row: row["cumulative_seconds"], reverse=True)
+        return rows[:TOP_FUNCTIONS]
+
+
+def phase(name: str):
+    """Attribute the enclosed time to ``name`` when the current request is profiled."""
+    profile = _current.get()
+    if profile is None:
+        return _NOT_PROFILED
+    return profile.phase(name)
+
+
+class ProfileStore:
+    """Ring buffer of the most recent request profiles."""
+
+    def __init__(self, size: int = BUFFER_SIZE) -> None:
+        self._profiles: deque[dict] = deque(maxlen=size)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.recorded = 0
+
+    def add(self, report: dict) -> int:
+        with self._lock:
+            profile_id = next(self._ids)
+            self._profiles.append({"id": profile_id, **report})
+            self.recorded += 1
+            return profile_id
+
+    def list(self) -> list[dict]:
+        """Newest first, without the function tables."""
+        with self._lock:
+            profiles = list(self._profiles)
+        return [
+            {key: value for key, value in profile.items() if key != "functions"}
+            for profile in reversed(profiles)
+        ]
+
+    def get(self, profile_id: int) -> dict | None:
+        with self._lock:
+            for profile in self._profiles:
+                if profile["id"] == profile_id:
+                    return profile
+        return None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": ENABLED,
+                "sample_rate": SAMPLE_RATE,
+                "buffered": len(self._profiles),
+                "capacity": self._profiles.maxlen,
+                "recorded": self.recorded,
+            }
+
+
+profile_store = ProfileStore()
+
+
+def redact_query(query: str) -> str:
+    """``query`` with the value of every parameter but the visible ones replaced by ``*``."""
+    pairs = parse_qsl(query, keep_blank_values=True)
+    return urlencode(
+        [(name, value if name in VISIBLE_QUERY_PARAMETERS else "*") for name, value in pairs],
+        safe="*",
+    )
+
+
+def _requested(scope: Scope) -> bool:
+    value = Headers(scope=scope).get(HEADER)
+    if value is not None:
+        return value.strip().lower() not in ("0", "false", "")
+    return SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+
+
+class ProfilingMiddleware:
+    """Profiles requests asked for by header or picked by sampling."""
+
+    def __init__(self, app: ASGIApp, store: ProfileStore | None = None) -> None:
+        self.app = app
+        self.store = store if store is not None else profile_store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith("/admin") or not _requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile(
+            scope["method"],
+            scope["path"],
+            redact_query(scope.get("query_string", b"").decode("latin-1")),
+        )
+        status: int | None = None
+        started = time.perf_counter()
+        start_message: Message | None = None
+
+        async def send_profiled(message: Message) -> None:
+            nonlocal status, start_message
+            if message["type"] == "http.response.start":
+                # Held back until the body is done so the profile id can be sent.
+                status = message["status"]
+                start_message = message
+                return
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                profile_id = self.store.add(profile.report(status, time.perf_counter() - started))
+                if start_message is not None:
+                    headers = list(start_message.get("headers", []))
+                    headers.append((b"x-profile-id", str(profile_id).encode()))
+                    await send({**start_message, "headers": headers})
+                    start_message = None
+            elif start_message is not None:
+                await send(start_message)
+                start_message = None
+            await send(message)
+
+        token = _current.set(profile)
+        try:
+            with profile.capture():
+                await self.app(scope, receive, send_profiled)
+        finally:
+            _current.reset(token)
+
+
+def _profile_in_thread(call: Callable) -> Callable:
+    @wraps(call)
+    def run(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return call(*args, **kwargs)
+        with profile.capture():
+            return call(*args, **kwargs)
+
+    return run
+
+
+class ProfiledRoute(APIRoute):
+    """Route whose sync endpoint is captured on the worker thread it runs on."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs) -> None:
+        super().__init__(path, endpoint, **kwargs)
+        if not inspect.iscoroutinefunction(self.dependant.call):
+            self.dependant.call = _profile_in_thread(self.dependant.call)
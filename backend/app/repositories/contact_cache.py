@@ -0,0 +1,88 @@
+"""Bounded id -> contact map used to resolve email senders and recipients.
+
+Emails only store contact ids, so every serialized email needs two contact
+lookups. Contacts are few and rarely change compared to emails, which makes
+an LRU map in front of the ``contacts`` table cheap and almost always hit.
+Avatar changes are written through after commit. Contacts of emails changed
+by other processes are evicted through ``mailbox_version``'s change log and
+read again on their next use; the whole map is only dropped when that log
+cannot say which emails changed.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
+from app import database
+from app.coherence import mailbox_version
+from app.repositories.contact_index import ContactRecord
+
+MAX_ENTRIES = int(os.getenv("CONTACT_CACHE_SIZE", "50000"))
+
+
+class ContactCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._database: str | None = None
+        self._entries: OrderedDict[int, ContactRecord] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, contact_ids: Iterable[int]) -> tuple[dict[int, ContactRecord], list[int]]:
+        """Return the cached contacts and the ids that still have to be loaded."""
+        found: dict[int, ContactRecord] = {}
+        missing: dict[int, None] = {}
+        with self._lock:
+            if self._database != database.DATABASE_PATH:
+                self._entries.clear()
+                self._database = database.DATABASE_PATH
+            for contact_id in contact_ids:
+                if contact_id in found or contact_id is None:
+                    continue
+                contact = self._entries.get(contact_id)
+                if contact is None:
+                    missing[contact_id] = None
+                    continue
+                self._entries.move_to_end(contact_id)
+                found[contact_id] = contact
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, list(missing)
+
+    def put(self, contacts: Iterable[ContactRecord]) -> None:
+        with self._lock:
+            if self._database != database.DATABASE_PATH:
+                return
+            for contact in contacts:
+                self._entries[contact.id] = contact
+                self._entries.move_to_end(contact.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, contact_ids: Iterable[int]) -> None:
+        with self._lock:
+            for contact_id in contact_ids:
+                self._entries.pop(contact_id, None)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+contact_cache = ContactCache()
+mailbox_version.subscribe(contact_cache.invalidate)
@@ -0,0 +1,187 @@
+"""In-memory prefix index over contacts for recipient autocomplete.
+
+Every contact is indexed under its case-folded email address, full name and
+each later word of its name, in one sorted array of terms searched with
+``bisect``: the matches for a prefix are the contiguous run of terms starting
+at its insertion point. Most prefixes match few terms, so ranking them on
+demand is cheap. Short prefixes, and any prefix that turns out to match many
+terms, can cover a large share of the mailbox, so their top results are
+cached and kept current on every change: contact rank (frequency, then
+recency) only ever grows, which means a contact either enters a cached top
+list or leaves it unchanged.
+
+The index is loaded once and updated after each committed contact upsert.
+Contacts of emails changed by other processes are re-read through
+``mailbox_version``'s change log; the index is only dropped when that log
+cannot say which emails changed.
+"""
+
+from __future__ import annotations
+
+import heapq
+import os
+import threading
+from bisect import bisect_left, insort
+from typing import Iterable, NamedTuple
+
+from app import database
+from app.coherence import mailbox_version
+
+CACHED_PREFIX_LENGTH = int(os.getenv("CONTACT_INDEX_CACHED_PREFIX_LENGTH", "2"))
+# Prefixes matching more terms than this get their top results cached too.
+CACHE_MATCH_THRESHOLD = 256
+MAX_CACHED_PREFIXES = 4096
+MAX_RESULTS = 50
+
+
+class ContactRecord(NamedTuple):
+    id: int
+    name: str
+    email: str
+    avatar: str | None
+    frequency: int
+    last_seen: str
+
+
+def _rank(contact: ContactRecord) -> tuple[int, str, int]:
+    return (contact.frequency, contact.last_seen, -contact.id)
+
+
+def _terms(contact: ContactRecord) -> set[str]:
+    name = contact.name.casefold()
+    terms = {contact.email.casefold(), name}
+    terms.update(name.split()[1:])
+    return terms
+
+
+class ContactIndex:
+    def __init__(self, cached_prefix_length: int = CACHED_PREFIX_LENGTH) -> None:
+        self.cached_prefix_length = cached_prefix_length
+        self.lookups = 0
+        self.cache_hits = 0
+        self.loads = 0
+        self._database: str | None = None
+        self._contacts: dict[int, ContactRecord] = {}
+        self._terms: list[tuple[str, int]] = []
+        self._top: dict[str, list[ContactRecord]] = {}
+        self._changes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._database is not None and self._database == database.DATABASE_PATH
+
+    def begin_load(self) -> int:
+        with self._lock:
+            return self._changes
+
+    def replace(self, rows: Iterable, token: int) -> bool:
+        """Rebuild from ``(id, name, email, avatar, frequency, last_seen)`` rows."""
+        contacts = {row[0]: ContactRecord(*row[:5], row[5] or "") for row in rows}
+        terms = sorted(
+            (term, contact.id) for contact in contacts.values() for term in _terms(contact)
+        )
+        with self._lock:
+            if token != self._changes:
+                return False
+            self._contacts = contacts
+            self._terms = terms
+            self._top = {}
+            self._database = database.DATABASE_PATH
+            self.loads += 1
+        return True
+
+    def apply(self, rows: Iterable) -> None:
+        """Insert or re-rank contacts after an upsert has committed."""
+        with self._lock:
+            self._changes += 1
+            if self.loaded:
+                self._apply(rows)
+
+    def refresh(self, rows: Iterable, token: int) -> None:
+        """Apply contacts re-read for emails changed elsewhere.
+
+        ``token`` comes from ``begin_load`` before the rows were read; a local
+        upsert applied since may be newer, so the index is dropped instead.
+        """
+        with self._lock:
+            if token != self._changes:
+                self._drop()
+                return
+            self._changes += 1
+            if self.loaded:
+                self._apply(rows)
+
+    def _apply(self, rows: Iterable) -> None:
+        for row in rows:
+            contact = ContactRecord(*row[:5], row[5] or "")
+            terms = _terms(contact)
+            if contact.id not in self._contacts:
+                for term in terms:
+                    insort(self._terms, (term, contact.id))
+            self._contacts[contact.id] = contact
+            for prefix, top in self._top.items():
+                if any(term.startswith(prefix) for term in terms):
+                    self._update_top(top, contact)
+
+    def _update_top(self, top: list[ContactRecord], contact: ContactRecord) -> None:
+        candidates = [entry for entry in top if entry.id != contact.id]
+        candidates.append(contact)
+        candidates.sort(key=_rank, reverse=True)
+        top[:] = candidates[:MAX_RESULTS]
+
+    def search(self, prefix: str, limit: int) -> list[ContactRecord] | None:
+        """Best ``limit`` contacts matching ``prefix``, or None when not loaded."""
+        prefix = prefix.strip().casefold()
+        limit = min(limit, MAX_RESULTS)
+        with self._lock:
+            if not self.loaded:
+                return None
+            self.lookups += 1
+            cached = self._top.get(prefix)
+            if cached is not None:
+                self.cache_hits += 1
+                return cached[:limit]
+
+            matches: set[int] = set()
+            position = bisect_left(self._terms, (prefix,))
+            while position < len(self._terms) and self._terms[position][0].startswith(prefix):
+                matches.add(self._terms[position][1])
+                position += 1
+            cacheable = (
+                len(prefix) <= self.cached_prefix_length or len(matches) > CACHE_MATCH_THRESHOLD
+            )
+            size = MAX_RESULTS if cacheable else limit
+            top = heapq.nlargest(size, (self._contacts[i] for i in matches), key=_rank)
+            if cacheable:
+                if len(self._top) >= MAX_CACHED_PREFIXES:
+                    del self._top[next(iter(self._top))]
+                self._top[prefix] = top
+            return top[:limit]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._drop()
+
+    def _drop(self) -> None:
+        self._changes += 1
+        self._database = None
+        self._contacts = {}
+        self._terms = []
+        self._top = {}
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "loaded": self.loaded,
+                "contacts": len(self._contacts),
+                "terms": len(self._terms),
+                "cached_prefixes": len(self._top),
+                "lookups": self.lookups,
+                "cache_hits": self.cache_hits,
+                "loads": self.loads,
+            }
+
+
+contact_index = ContactIndex()
+mailbox_version.subscribe(contact_index.invalidate)
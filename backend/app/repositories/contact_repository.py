@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+from sqlite3 import Connection, Cursor
+
+from app.coherence import mailbox_version
+from app.database import on_commit
+from app.repositories import statements
+from app.repositories.contact_cache import contact_cache
+from app.repositories.contact_index import ContactRecord, contact_index
+
+CONTACT_COLUMNS = "id, name, email, avatar, frequency, last_seen"
+
+STATEMENTS: dict[str, str] = {
+    "upsert_contact": f"""
+        INSERT INTO contacts (name, email, avatar, frequency, last_seen)
+        VALUES (?, ?, ?, 1, ?)
+        ON CONFLICT (email, name) DO UPDATE SET
+            avatar = COALESCE(excluded.avatar, contacts.avatar),
+            frequency = contacts.frequency + 1,
+            last_seen = MAX(COALESCE(contacts.last_seen, ''), excluded.last_seen)
+        RETURNING {CONTACT_COLUMNS}
+        """,
+    # The no-op update makes RETURNING report existing contacts too.
+    "ensure_contact": f"""
+        INSERT INTO contacts (name, email, frequency)
+        VALUES (?, ?, 0)
+        ON CONFLICT (email, name) DO UPDATE SET frequency = contacts.frequency
+        RETURNING {CONTACT_COLUMNS}
+        """,
+    "fetch_contacts": f"""
+        SELECT {CONTACT_COLUMNS}
+        FROM contacts
+        WHERE id IN (SELECT value FROM json_each(?))
+        """,
+    "list_contacts": f"SELECT {CONTACT_COLUMNS} FROM contacts",
+    "contacts_of_emails": f"""
+        WITH changed AS (
+            SELECT sender_id, recipient_id FROM main.emails
+            WHERE id IN (SELECT value FROM json_each(?))
+        )
+        SELECT {CONTACT_COLUMNS}
+        FROM contacts
+        WHERE id IN (SELECT sender_id FROM changed UNION SELECT recipient_id FROM changed)
+        """,
+    "search_contacts": f"""
+        SELECT {CONTACT_COLUMNS}
+        FROM contacts
+        WHERE name LIKE ? ESCAPE '\\' OR email LIKE ? ESCAPE '\\'
+        ORDER BY frequency DESC, last_seen DESC, id ASC
+        LIMIT ?
+        """,
+}
+
+
+# Run once per pooled connection at warmup; see email_repository.WARM_STATEMENTS.
+WARM_STATEMENTS: dict[str, tuple] = {"fetch_contacts": ("[]",)}
+
+
+def _execute(conn: Connection, name: str, params: tuple | list = ()) -> Cursor:
+    return statements.execute(conn, STATEMENTS[name], params)
+
+
+def prepare_statements(conn: Connection) -> int:
+    for name, params in WARM_STATEMENTS.items():
+        _execute(conn, name, params).close()
+    return len(WARM_STATEMENTS)
+
+
+def serialize_contact(contact: ContactRecord) -> dict:
+    return {
+        "name": contact.name,
+        "email": contact.email,
+        "avatar": contact.avatar,
+        "frequency": contact.frequency,
+        "last_seen": contact.last_seen or None,
+    }
+
+
+def _record(row) -> ContactRecord:
+    return ContactRecord(row[0], row[1], row[2], row[3], row[4], row[5] or "")
+
+
+def record_contacts(
+    conn: Connection,
+    contacts: list[tuple[str, str, str | None]],
+    seen_at: str,
+) -> list[int]:
+    """Count one appearance of each ``(name, email, avatar)``; return their contact ids."""
+    rows = [
+        tuple(_execute(conn, "upsert_contact", (name, email, avatar, seen_at)).fetchone())
+        for name, email, avatar in contacts
+    ]
+
+    def publish() -> None:
+        contact_index.apply(rows)
+        contact_cache.put(_record(row) for row in rows)
+
+    on_commit(conn, publish)
+    return [row[0] for row in rows]
+
+
+def ensure_contact(conn: Connection, name: str, email: str) -> int:
+    """Return the id of the contact, creating it without counting an appearance."""
+    row = tuple(_execute(conn, "ensure_contact", (name, email)).fetchone())
+    on_commit(conn, lambda: contact_index.apply([row]))
+    return row[0]
+
+
+def resolve_contacts(conn: Connection, contact_ids: list[int]) -> dict[int, ContactRecord]:
+    """Map contact ids to contacts, reading only the ones missing from the cache."""
+    contacts, missing = contact_cache.get_many(contact_ids)
+    if missing:
+        loaded = [
+            _record(row)
+            for row in _execute(conn, "fetch_contacts", (json.dumps(missing),)).fetchall()
+        ]
+        contact_cache.put(loaded)
+        contacts.update((contact.id, contact) for contact in loaded)
+    return contacts
+
+
+def load_contact_index(conn: Connection) -> bool:
+    token = contact_index.begin_load()
+    rows = [tuple(row) for row in _execute(conn, "list_contacts").fetchall()]
+    return contact_index.replace(rows, token)
+
+
+def refresh_changed_contacts(conn: Connection, email_ids: list[int]) -> None:
+    """Re-read the contacts of emails another process changed.
+
+    Contacts are only written together with the emails that reference them.
+    """
+    token = contact_index.begin_load()
+    rows = [
+        tuple(row)
+        for row in _execute(conn, "contacts_of_emails", (json.dumps(email_ids),)).fetchall()
+    ]
+    contact_index.refresh(rows, token)
+    contact_cache.discard(row[0] for row in rows)
+
+
+def search_contacts(conn: Connection, prefix: str, limit: int) -> list[dict]:
+    matches = contact_index.search(prefix, limit)
+    if matches is None and load_contact_index(conn):
+        matches = contact_index.search(prefix, limit)
+    if matches is None:
+        # Only reached while a concurrent write keeps the index from loading.
+        escaped = prefix.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        rows = _execute(
+            conn, "search_contacts", (f"{escaped}%", f"{escaped}%", limit)
+        ).fetchall()
+        matches = [_record(row) for row in rows]
+    return [serialize_contact(contact) for contact in matches]
+
+
+mailbox_version.subscribe_changes(refresh_changed_contacts)
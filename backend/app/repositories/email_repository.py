@@ -1,144 +1,722 @@
 from __future__ import annotations
 
-from sqlite3 import Connection
+import heapq
+import json
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from sqlite3 import Connection, Cursor
+from typing import Iterator, NamedTuple
 
+from app.coherence import mailbox_version
+from app.database import attach_archive, get_db, on_commit
+from app.profiling import phase
+from app.repositories import contact_repository, statements, stats_repository, thread_repository
+from app.repositories.contact_index import ContactRecord, contact_index
+from app.repositories.inbox_index import inbox_index
 
-def fetch_attachments_for_ids(conn: Connection, email_ids: list[int]) -> dict[int, list[dict]]:
-    if not email_ids:
-        return {}
+EMAIL_COLUMNS = """
+            id,
+            sender_id,
+            recipient_id,
+            subject,
+            preview,
+            body,
+            date,
+            is_read,
+            is_archived,
+            scheduled_at,
+            thread_id
+"""
 
-    placeholders = ",".join("?" for _ in email_ids)
-    cursor = conn.cursor()
-    cursor.execute(
-        f"""
+
+class AttachmentRecord(NamedTuple):
+    filename: str
+    size: str
+    url: str
+
+
+class EmailRecord(NamedTuple):
+    """One email as the read path carries it, in ``EmailResponse`` field order.
+
+    Rows are fetched as plain tuples and every record of a listing shares the
+    ``ContactRecord`` objects of its sender and recipient, so a large list
+    costs one small tuple per email rather than a dict per email, sender,
+    recipient and attachment. ``serialize_email`` turns a record into the
+    API's dict shape where one is needed.
+    """
+
+    id: int
+    sender: ContactRecord
+    recipient: ContactRecord
+    subject: str
+    preview: str
+    body: str
+    date: str
+    is_read: bool
+    is_archived: bool
+    scheduled_at: str | None
+    thread_id: int | None
+    attachments: tuple[AttachmentRecord, ...]
+
+
+NO_ATTACHMENTS: tuple[AttachmentRecord, ...] = ()
+
+# Senders and recipients are matched through the (much smaller) contacts table.
+SEARCH_CONDITION = """
+            (
+                sender_id IN (SELECT id FROM main.contacts WHERE name LIKE ? OR email LIKE ?)
+                OR recipient_id IN (SELECT id FROM main.contacts WHERE name LIKE ? OR email LIKE ?)
+                OR subject LIKE ?
+                OR preview LIKE ?
+                OR body LIKE ?
+            )
+"""
+
+# Scheduled emails stay out of every listing until they are sent.
+FILTER_CONDITIONS = {
+    "all": "is_archived = 0 AND scheduled_at IS NULL",
+    "unread": "is_archived = 0 AND is_read = 0 AND scheduled_at IS NULL",
+    "archived": "is_archived = 1 AND scheduled_at IS NULL",
+}
+
+# Searches match with LIKE '%term%', which no index can answer, so they scan
+# every listable email. With more than one worker, a search of a mailbox whose
+# ids span at least PARALLEL_SEARCH_MIN_EMAILS is split into id ranges that are
+# scanned concurrently, each on its own pooled connection. sqlite3 releases
+# the GIL while SQLite runs a statement, so the ranges use separate cores.
+SEARCH_WORKERS = int(os.getenv("EMAIL_SEARCH_WORKERS", "1"))
+PARALLEL_SEARCH_MIN_EMAILS = int(os.getenv("EMAIL_SEARCH_PARALLEL_MIN_EMAILS", "20000"))
+
+# Columns update_email may change, in the order they are bound to UPDATE_EMAIL.
+UPDATABLE_COLUMNS = (
+    "is_read",
+    "is_archived",
+    "subject",
+    "body",
+    "preview",
+    "recipient_id",
+)
+
+
+def _list_statement(filter_value: str, with_search: bool) -> str:
+    where_clause = FILTER_CONDITIONS[filter_value]
+    if with_search:
+        where_clause = f"{where_clause} AND {SEARCH_CONDITION}"
+    return f"""
+        SELECT {EMAIL_COLUMNS}
+        FROM emails
+        WHERE {where_clause}
+        ORDER BY is_read ASC, date DESC, id ASC
+        """
+
+
+def _range_search_statement(filter_value: str) -> str:
+    # NOT INDEXED makes the scan walk the id range instead of the whole listing
+    # index; the few matches are then sorted.
+    return f"""
+        SELECT {EMAIL_COLUMNS}
+        FROM emails NOT INDEXED
+        WHERE id BETWEEN ? AND ? AND {FILTER_CONDITIONS[filter_value]} AND {SEARCH_CONDITION}
+        ORDER BY is_read ASC, date DESC, id ASC
+        """
+
+
+def _tiered_archive_statement(with_search: bool) -> str:
+    search_clause = f"AND {SEARCH_CONDITION}" if with_search else ""
+    return f"""
+        SELECT {EMAIL_COLUMNS}
+        FROM main.emails
+        WHERE {FILTER_CONDITIONS["archived"]} {search_clause}
+        UNION ALL
+        SELECT {EMAIL_COLUMNS}
+        FROM cold.emails
+        WHERE 1 = 1 {search_clause}
+        ORDER BY is_read ASC, date DESC, id ASC
+        """
+
+
+# Every statement the repository runs. The SQL text of each entry is fixed, so
+# the sqlite3 statement cache of a pooled connection prepares it only once.
+STATEMENTS: dict[str, str] = {
+    **{
+        f"list_{filter_value}{'_search' if with_search else ''}": _list_statement(
+            filter_value, with_search
+        )
+        for filter_value in FILTER_CONDITIONS
+        for with_search in (False, True)
+    },
+    **{
+        f"list_{filter_value}_search_range": _range_search_statement(filter_value)
+        for filter_value in FILTER_CONDITIONS
+    },
+    "list_archived_tiered": _tiered_archive_statement(False),
+    "list_archived_tiered_search": _tiered_archive_statement(True),
+    **{
+        f"list_{filter_value}_page": f"{_list_statement(filter_value, False)}LIMIT ? OFFSET ?"
+        for filter_value in FILTER_CONDITIONS
+    },
+    "list_archived_tiered_page": f"{_tiered_archive_statement(False)}LIMIT ? OFFSET ?",
+    "fetch_emails": f"""
+        SELECT {EMAIL_COLUMNS}
+        FROM emails
+        WHERE id IN (SELECT value FROM json_each(?))
+        """,
+    "fetch_emails_tiered": f"""
+        SELECT {EMAIL_COLUMNS}
+        FROM main.emails
+        WHERE id IN (SELECT value FROM json_each(?))
+        UNION ALL
+        SELECT {EMAIL_COLUMNS}
+        FROM cold.emails
+        WHERE id IN (SELECT value FROM json_each(?))
+        """,
+    "id_span": "SELECT MIN(id), MAX(id) FROM emails",
+    "index_state": "SELECT id, is_read, is_archived, date, scheduled_at FROM main.emails",
+    "index_state_cold": "SELECT id, is_read, is_archived, date, scheduled_at FROM cold.emails",
+    **{
+        f"index_state_for_ids{suffix}": f"""
+        SELECT id, is_read, is_archived, date, scheduled_at
+        FROM {schema}.emails
+        WHERE id IN (SELECT value FROM json_each(?))
+        """
+        for schema, suffix in (("main", ""), ("cold", "_cold"))
+    },
+    "fetch_email": f"""
+        SELECT {EMAIL_COLUMNS}
+        FROM emails
+        WHERE id = ?
+        """,
+    "fetch_email_cold": f"""
+        SELECT {EMAIL_COLUMNS}
+        FROM cold.emails
+        WHERE id = ?
+        """,
+    "fetch_attachments": """
         SELECT email_id, filename, size, url
         FROM attachments
-        WHERE email_id IN ({placeholders})
+        WHERE email_id IN (SELECT value FROM json_each(?))
         ORDER BY id
         """,
-        tuple(email_ids),
-    )
-    rows = cursor.fetchall()
-    attachment_map: dict[int, list[dict]] = {email_id: [] for email_id in email_ids}
-    for row in rows:
-        attachment_map[row["email_id"]].append(
-            {"filename": row["filename"], "size": row["size"], "url": row["url"]}
+    "fetch_attachments_tiered": """
+        SELECT id, email_id, filename, size, url
+        FROM main.attachments
+        WHERE email_id IN (SELECT value FROM json_each(?))
+        UNION ALL
+        SELECT id, email_id, filename, size, url
+        FROM cold.attachments
+        WHERE email_id IN (SELECT value FROM json_each(?))
+        ORDER BY id
+        """,
+    "insert_email": """
+        INSERT INTO emails (
+            sender_id,
+            recipient_id,
+            subject,
+            preview,
+            body,
+            date,
+            is_read,
+            is_archived,
+            scheduled_at,
+            thread_id
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+    "insert_attachment": """
+        INSERT INTO attachments (email_id, filename, size, url)
+        VALUES (?, ?, ?, ?)
+        """,
+    "update_email": f"""
+        UPDATE emails SET
+            {", ".join(f"{column} = COALESCE(?, {column})" for column in UPDATABLE_COLUMNS)}
+        WHERE id = ?
+        """,
+    "fetch_scheduled": """
+        SELECT id, scheduled_at
+        FROM emails
+        WHERE scheduled_at IS NOT NULL
+        ORDER BY scheduled_at
+        """,
+    "deliver_scheduled": """
+        UPDATE emails SET date = scheduled_at, scheduled_at = NULL
+        WHERE id = ? AND scheduled_at IS NOT NULL AND scheduled_at <= ?
+        RETURNING id
+        """,
+    "email_exists": "SELECT id FROM emails WHERE id = ?",
+    "email_exists_cold": "SELECT id FROM cold.emails WHERE id = ?",
+    "delete_attachments": "DELETE FROM attachments WHERE email_id = ?",
+    "delete_email": "DELETE FROM emails WHERE id = ?",
+    "delete_attachments_cold": "DELETE FROM cold.attachments WHERE email_id = ?",
+    "delete_email_cold": "DELETE FROM cold.emails WHERE id = ?",
+}
+
+# Reads on every request path, with parameters that match (almost) nothing.
+# Warmup runs them once on each pooled connection so they are prepared before
+# the first request. Unpaged and paged tiered listings are left out: they sort
+# the whole archive.
+WARM_STATEMENTS: dict[str, tuple] = {
+    "list_all": (),
+    "list_unread": (),
+    "list_archived": (),
+    "list_all_page": (1, 0),
+    "list_unread_page": (1, 0),
+    "list_archived_page": (1, 0),
+    "fetch_emails": ("[]",),
+    "fetch_email": (0,),
+    "fetch_attachments": ("[]",),
+    "email_exists": (0,),
+}
+WARM_COLD_STATEMENTS: dict[str, tuple] = {
+    "fetch_emails_tiered": ("[]", "[]"),
+    "fetch_email_cold": (0,),
+    "fetch_attachments_tiered": ("[]", "[]"),
+    "email_exists_cold": (0,),
+}
+
+# Indexes every listing or lookup walks, read end to end by warmup so their
+# pages are cached before the first request.
+HOT_INDEXES: dict[str, str] = {
+    "idx_emails_listing": (
+        "SELECT COUNT(*) FROM emails INDEXED BY idx_emails_listing "
+        "WHERE is_archived >= 0 AND scheduled_at IS NULL"
+    ),
+    "idx_attachments_email_id": (
+        "SELECT COUNT(*) FROM attachments INDEXED BY idx_attachments_email_id WHERE email_id >= 0"
+    ),
+}
+
+# Tables mirrored into the cold archive database.
+ARCHIVE_TABLES = ("emails", "attachments")
+# Columns replaced by sender_id/recipient_id (migration 008) that may still
+# exist in an archive created before it.
+DENORMALIZED_CONTACT_COLUMNS = (
+    "sender_name",
+    "sender_email",
+    "sender_avatar",
+    "recipient_name",
+    "recipient_email",
+)
+
+
+def _execute(conn: Connection, name: str, params: tuple | list = ()) -> Cursor:
+    return statements.execute(conn, STATEMENTS[name], params)
+
+
+def _executemany(conn: Connection, name: str, params: list) -> Cursor:
+    return statements.executemany(conn, STATEMENTS[name], params)
+
+
+def _fetch_tuples(conn: Connection, name: str, params: tuple | list = ()) -> list[tuple]:
+    """``fetchall`` with plain tuples instead of the pool's ``sqlite3.Row`` objects."""
+    cursor = _execute(conn, name, params)
+    cursor.row_factory = None
+    return cursor.fetchall()
+
+
+def _table_columns(conn: Connection, schema: str, table: str) -> list[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})").fetchall()]
+
+
+def _sync_cold_schema(conn: Connection) -> None:
+    if conn.execute("SELECT 1 FROM cold.sqlite_master LIMIT 1").fetchone() is None:
+        # A new archive can pick its vacuum mode without a full VACUUM.
+        conn.execute("PRAGMA cold.auto_vacuum = INCREMENTAL")
+    for table in ARCHIVE_TABLES:
+        ddl = conn.execute(
+            "SELECT sql FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()[0]
+        conn.execute(
+            re.sub(
+                r"^CREATE TABLE (IF NOT EXISTS )?[\"\w]+",
+                f"CREATE TABLE IF NOT EXISTS cold.{table}",
+                ddl.strip(),
+                count=1,
+            )
         )
-    return attachment_map
+        cold_columns = set(_table_columns(conn, "cold", table))
+        for row in conn.execute(f"PRAGMA main.table_info({table})").fetchall():
+            if row[1] not in cold_columns:
+                conn.execute(f"ALTER TABLE cold.{table} ADD COLUMN {row[1]} {row[2]}")
+    conn.execute("CREATE INDEX IF NOT EXISTS cold.idx_attachments_email_id ON attachments(email_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS cold.idx_emails_thread_id ON emails(thread_id)")
+    if "sender_name" in _table_columns(conn, "cold", "emails"):
+        _normalize_cold_contacts(conn)
+
+
+def _normalize_cold_contacts(conn: Connection) -> None:
+    """Link archived emails to contacts and drop their denormalized columns."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        for prefix in ("sender", "recipient"):
+            avatar = "sender_avatar" if prefix == "sender" else "NULL"
+            conn.execute(
+                f"""
+                INSERT INTO main.contacts (name, email, avatar, frequency, last_seen)
+                SELECT {prefix}_name, {prefix}_email, {avatar}, 0, MAX(date)
+                FROM cold.emails
+                WHERE {prefix}_id IS NULL
+                GROUP BY {prefix}_email, {prefix}_name
+                ON CONFLICT (email, name) DO NOTHING
+                """
+            )
+            conn.execute(
+                f"""
+                UPDATE cold.emails SET {prefix}_id = (
+                    SELECT id FROM main.contacts
+                    WHERE email = cold.emails.{prefix}_email AND name = cold.emails.{prefix}_name
+                )
+                WHERE {prefix}_id IS NULL
+                """
+            )
+        for column in DENORMALIZED_CONTACT_COLUMNS:
+            conn.execute(f"ALTER TABLE cold.emails DROP COLUMN {column}")
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    contact_index.invalidate()
+
+
+def cold_tier_available(conn: Connection, create: bool = False) -> bool:
+    """Attach the archive tier if it exists (or ``create``), keeping its schema in sync."""
+    newly_attached = "cold" not in getattr(conn, "attached", ())
+    if not attach_archive(conn, create=create):
+        return False
+    if newly_attached:
+        _sync_cold_schema(conn)
+    return True
 
 
-def serialize_email(row, attachments: list[dict]) -> dict:
+def prepare_statements(conn: Connection) -> int:
+    """Run ``WARM_STATEMENTS`` once so this connection's statement cache holds them."""
+    warm = dict(WARM_STATEMENTS)
+    if cold_tier_available(conn):
+        warm.update(WARM_COLD_STATEMENTS)
+    for name, params in warm.items():
+        cursor = _execute(conn, name, params)
+        cursor.fetchone()
+        cursor.close()
+    # Every listing resolves its senders and recipients through contacts.
+    return len(warm) + contact_repository.prepare_statements(conn)
+
+
+def touch_hot_indexes(conn: Connection) -> dict[str, int]:
+    """Read ``HOT_INDEXES`` end to end; returns the entries seen per index."""
+    return {name: conn.execute(sql).fetchone()[0] for name, sql in HOT_INDEXES.items()}
+
+
+def fetch_attachments_for_ids(
+    conn: Connection,
+    email_ids: list[int],
+    tiered: bool = False,
+) -> dict[int, tuple[AttachmentRecord, ...]]:
+    """Attachments of the given emails; emails without any are left out."""
+    if not email_ids:
+        return {}
+
+    ids = json.dumps(email_ids)
+    if tiered:
+        rows = _fetch_tuples(conn, "fetch_attachments_tiered", (ids, ids))
+    else:
+        rows = _fetch_tuples(conn, "fetch_attachments", (ids,))
+    attachment_map: dict[int, list[AttachmentRecord]] = {}
+    for row in rows:
+        # The tiered statement also selects the attachment id to order by.
+        email_id, filename, size, url = row[-4:]
+        attachment_map.setdefault(email_id, []).append(AttachmentRecord(filename, size, url))
+    return {email_id: tuple(records) for email_id, records in attachment_map.items()}
+
+
+def serialize_email(email: EmailRecord) -> dict:
+    sender = email.sender
+    recipient = email.recipient
     return {
-        "id": str(row["id"]),
+        "id": str(email.id),
         "sender": {
-            "name": row["sender_name"],
-            "email": row["sender_email"],
-            "avatar": row["sender_avatar"],
+            "name": sender.name,
+            "email": sender.email,
+            "avatar": sender.avatar,
         },
         "recipient": {
-            "name": row["recipient_name"],
-            "email": row["recipient_email"],
+            "name": recipient.name,
+            "email": recipient.email,
             "avatar": None,
         },
-        "subject": row["subject"],
-        "preview": row["preview"],
-        "body": row["body"],
-        "date": row["date"],
-        "is_read": bool(row["is_read"]),
-        "is_archived": bool(row["is_archived"]),
-        "attachments": attachments,
+        "subject": email.subject,
+        "preview": email.preview,
+        "body": email.body,
+        "date": email.date,
+        "is_read": email.is_read,
+        "is_archived": email.is_archived,
+        "scheduled_at": email.scheduled_at,
+        "thread_id": str(email.thread_id) if email.thread_id is not None else None,
+        "attachments": [attachment._asdict() for attachment in email.attachments],
     }
 
 
+def _build_records(conn: Connection, rows: list[tuple], tiered: bool) -> list[EmailRecord]:
+    """Turn ``EMAIL_COLUMNS`` tuples into records."""
+    with phase("sql"):
+        attachments = fetch_attachments_for_ids(conn, [row[0] for row in rows], tiered)
+        contacts = contact_repository.resolve_contacts(
+            conn, [contact_id for row in rows for contact_id in (row[1], row[2])]
+        )
+    with phase("serialize"):
+        return [
+            EmailRecord(
+                email_id,
+                contacts[sender_id],
+                contacts[recipient_id],
+                subject,
+                preview,
+                body,
+                date,
+                bool(is_read),
+                bool(is_archived),
+                scheduled_at,
+                thread_id,
+                attachments.get(email_id, NO_ATTACHMENTS),
+            )
+            for (
+                email_id,
+                sender_id,
+                recipient_id,
+                subject,
+                preview,
+                body,
+                date,
+                is_read,
+                is_archived,
+                scheduled_at,
+                thread_id,
+            ) in rows
+        ]
+
+
+def fetch_email_record(conn: Connection, email_id: int) -> EmailRecord | None:
+    rows = _fetch_tuples(conn, "fetch_email", (email_id,))
+    tiered = False
+    if not rows:
+        if not cold_tier_available(conn):
+            return None
+        rows = _fetch_tuples(conn, "fetch_email_cold", (email_id,))
+        if not rows:
+            return None
+        tiered = True
+
+    return _build_records(conn, rows, tiered)[0]
+
+
 def fetch_email_by_id(conn: Connection, email_id: int) -> dict | None:
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        SELECT
-            id,
-            sender_name,
-            sender_email,
-            sender_avatar,
-            recipient_name,
-            recipient_email,
-            subject,
-            preview,
-            body,
-            date,
-            is_read,
-            is_archived
-        FROM emails
-        WHERE id = ?
-        """,
-        (email_id,),
-    )
-    row = cursor.fetchone()
-    if row is None:
+    email = fetch_email_record(conn, email_id)
+    return serialize_email(email) if email is not None else None
+
+
+def _list_cursor(
+    conn: Connection,
+    filter_value: str,
+    search_value: str | None,
+) -> tuple[Cursor, bool]:
+    """Run the listing query; returns a tuple-row cursor and whether it spans both tiers."""
+    if filter_value not in FILTER_CONDITIONS:
+        filter_value = "all"
+
+    statement = f"list_{filter_value}"
+    tiered = filter_value == "archived" and cold_tier_available(conn)
+    if tiered:
+        statement = "list_archived_tiered"
+
+    if search_value:
+        like_value = f"%{search_value.strip()}%"
+        cursor = _execute(conn, f"{statement}_search", (like_value,) * (14 if tiered else 7))
+    else:
+        cursor = _execute(conn, statement)
+    cursor.row_factory = None
+    return cursor, tiered
+
+
+_search_executor: ThreadPoolExecutor | None = None
+_search_executor_lock = threading.Lock()
+
+
+def _search_pool() -> ThreadPoolExecutor:
+    """The search worker threads, started with ``SEARCH_WORKERS`` on first use."""
+    global _search_executor
+    with _search_executor_lock:
+        if _search_executor is None:
+            _search_executor = ThreadPoolExecutor(SEARCH_WORKERS, thread_name_prefix="email-search")
+        return _search_executor
+
+
+def _id_ranges(low: int, high: int, parts: int) -> list[tuple[int, int]]:
+    size = -(-(high - low + 1) // parts)
+    return [(start, min(start + size - 1, high)) for start in range(low, high + 1, size)]
+
+
+def _scan_range(name: str, params: tuple) -> list[tuple]:
+    with get_db() as conn:
+        return _fetch_tuples(conn, name, params)
+
+
+def _listing_key(row: tuple) -> tuple:
+    # Descending on this key is the listing order: unread first, newest first, then by id.
+    return (-row[7], row[6], -row[0])
+
+
+def _parallel_search_rows(
+    conn: Connection,
+    filter_value: str,
+    search_value: str | None,
+) -> list[tuple] | None:
+    """Listing rows of a search scanned in parallel id ranges; None where a single scan is used.
+
+    Only the hot tier is split, so archived searches that span the cold tier
+    keep the single scan. Each range reads its own snapshot, taken when its
+    scan starts.
+    """
+    if SEARCH_WORKERS < 2 or not search_value:
+        return None
+    if filter_value not in FILTER_CONDITIONS:
+        filter_value = "all"
+    if filter_value == "archived" and cold_tier_available(conn):
+        return None
+    low, high = _execute(conn, "id_span").fetchall()[0]
+    if low is None or high - low + 1 < PARALLEL_SEARCH_MIN_EMAILS:
         return None
 
-    attachments = fetch_attachments_for_ids(conn, [email_id]).get(email_id, [])
-    return serialize_email(row, attachments)
+    like_value = f"%{search_value.strip()}%"
+    futures = [
+        _search_pool().submit(
+            _scan_range, f"list_{filter_value}_search_range", (start, end) + (like_value,) * 7
+        )
+        for start, end in _id_ranges(low, high, SEARCH_WORKERS)
+    ]
+    parts = [future.result() for future in futures]
+    return list(heapq.merge(*parts, key=_listing_key, reverse=True))
 
 
 def list_emails(
     conn: Connection,
     filter_value: str,
     search_value: str | None,
-) -> list[dict]:
-    conditions: list[str] = []
-    params: list[object] = []
+) -> list[EmailRecord]:
+    with phase("sql"):
+        tiered = False
+        rows = _parallel_search_rows(conn, filter_value, search_value)
+        if rows is None:
+            cursor, tiered = _list_cursor(conn, filter_value, search_value)
+            rows = cursor.fetchall()
 
-    if filter_value == "archived":
-        conditions.append("is_archived = 1")
-    else:
-        conditions.append("is_archived = 0")
-        if filter_value == "unread":
-            conditions.append("is_read = 0")
+    return _build_records(conn, rows, tiered)
 
-    if search_value:
-        conditions.append(
-            """
-            (
-                sender_name LIKE ?
-                OR sender_email LIKE ?
-                OR recipient_name LIKE ?
-                OR recipient_email LIKE ?
-                OR subject LIKE ?
-                OR preview LIKE ?
-                OR body LIKE ?
-            )
-            """
+
+def iter_email_batches(
+    conn: Connection,
+    filter_value: str,
+    search_value: str | None,
+    batch_size: int,
+) -> Iterator[list[EmailRecord]]:
+    """``list_emails`` in batches of at most ``batch_size``, fetched as they are consumed.
+
+    The listing query stays open between batches, which keeps the connection's
+    read snapshot, so the attachments and contacts looked up for later batches
+    come from the same state of the database as the first one.
+    """
+    with phase("sql"):
+        cursor, tiered = _list_cursor(conn, filter_value, search_value)
+    try:
+        while True:
+            with phase("sql"):
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield _build_records(conn, rows, tiered)
+    finally:
+        # Resets the statement even when the consumer stops early, so the
+        # pooled connection does not keep an old snapshot open.
+        cursor.close()
+
+
+def list_email_page(
+    conn: Connection,
+    filter_value: str,
+    offset: int,
+    limit: int,
+) -> list[EmailRecord]:
+    """One page of a tab, ordered by the in-memory index when it is available."""
+    if filter_value not in FILTER_CONDITIONS:
+        filter_value = "all"
+    tiered = filter_value == "archived" and cold_tier_available(conn)
+
+    email_ids = inbox_index.page(filter_value, offset, limit)
+    if email_ids is None and inbox_index.enabled and not inbox_index.loaded:
+        if load_inbox_index(conn):
+            email_ids = inbox_index.page(filter_value, offset, limit)
+
+    with phase("sql"):
+        if email_ids is None:
+            statement = "list_archived_tiered" if tiered else f"list_{filter_value}"
+            rows = _fetch_tuples(conn, f"{statement}_page", (limit, offset))
+        else:
+            ids = json.dumps(email_ids)
+            if tiered:
+                fetched = _fetch_tuples(conn, "fetch_emails_tiered", (ids, ids))
+            else:
+                fetched = _fetch_tuples(conn, "fetch_emails", (ids,))
+            by_id = {row[0]: row for row in fetched}
+            rows = [by_id[email_id] for email_id in email_ids if email_id in by_id]
+
+    return _build_records(conn, rows, tiered)
+
+
+def load_inbox_index(conn: Connection) -> bool:
+    """(Re)build the in-memory inbox index; must run outside of a transaction."""
+    if not inbox_index.enabled:
+        return False
+    token = inbox_index.begin_load()
+    rows = [tuple(row) for row in _execute(conn, "index_state").fetchall()]
+    if cold_tier_available(conn):
+        rows.extend(tuple(row) for row in _execute(conn, "index_state_cold").fetchall())
+    return inbox_index.replace(rows, token)
+
+
+def refresh_inbox_index(conn: Connection, email_ids: list[int]) -> None:
+    """Re-index hot emails changed in the current transaction once it commits."""
+    if not email_ids:
+        return
+    rows = [
+        tuple(row)
+        for row in _execute(conn, "index_state_for_ids", (json.dumps(email_ids),)).fetchall()
+    ]
+    on_commit(conn, lambda: inbox_index.apply(rows))
+
+
+def refresh_changed_emails(conn: Connection, email_ids: list[int]) -> None:
+    """Re-index emails another process changed; ids found in neither tier were deleted."""
+    if not inbox_index.loaded:
+        return
+    token = inbox_index.begin_load()
+    ids = json.dumps(email_ids)
+    rows = [tuple(row) for row in _execute(conn, "index_state_for_ids", (ids,)).fetchall()]
+    if cold_tier_available(conn):
+        rows.extend(
+            tuple(row) for row in _execute(conn, "index_state_for_ids_cold", (ids,)).fetchall()
         )
-        like_value = f"%{search_value.strip()}%"
-        params.extend([like_value] * 7)
+    inbox_index.refresh(email_ids, rows, token)
 
-    where_clause = " AND ".join(conditions) if conditions else "1 = 1"
-    cursor = conn.cursor()
-    cursor.execute(
-        f"""
-        SELECT
-            id,
-            sender_name,
-            sender_email,
-            sender_avatar,
-            recipient_name,
-            recipient_email,
-            subject,
-            preview,
-            body,
-            date,
-            is_read,
-            is_archived
-        FROM emails
-        WHERE {where_clause}
-        ORDER BY is_read ASC, date DESC, id ASC
-        """,
-        tuple(params),
+
+def _insert_attachments(conn: Connection, email_id: int, attachments: list[dict]) -> None:
+    if not attachments:
+        return
+    _executemany(
+        conn,
+        "insert_attachment",
+        [
+            (email_id, attachment["filename"], attachment["size"], attachment["url"])
+            for attachment in attachments
+        ],
     )
-    rows = cursor.fetchall()
-    email_ids = [row["id"] for row in rows]
-    attachments = fetch_attachments_for_ids(conn, email_ids)
-    return [serialize_email(row, attachments.get(row["id"], [])) for row in rows]
 
 
 def create_email(
@@ -154,48 +732,41 @@ def create_email(
     body: str,
     date: str,
     attachments: list[dict],
+    scheduled_at: str | None = None,
+    in_reply_to: int | None = None,
 ) -> dict:
-    cursor = conn.cursor()
-    cursor.execute(
-        """
-        INSERT INTO emails (
-            sender_name,
-            sender_email,
-            sender_avatar,
-            recipient_name,
-            recipient_email,
-            subject,
-            preview,
-            body,
-            date,
-            is_read,
-            is_archived
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """,
+    # The replied-to email may already be archived.
+    tiered = in_reply_to is not None and cold_tier_available(conn)
+    sender_id, recipient_id = contact_repository.record_contacts(
+        conn,
+        [(sender_name, sender_email, sender_avatar), (recipient_name, recipient_email, None)],
+        date,
+    )
+    thread_id = thread_repository.assign_thread(
+        conn, sender_id, recipient_id, subject, date, in_reply_to, tiered
+    )
+    cursor = _execute(
+        conn,
+        "insert_email",
         (
-            sender_name,
-            sender_email,
-            sender_avatar,
-            recipient_name,
-            recipient_email,
+            sender_id,
+            recipient_id,
             subject,
             preview,
             body,
             date,
             1,
             0,
+            scheduled_at,
+            thread_id,
         ),
     )
     email_id = cursor.lastrowid
-
-    for attachment in attachments:
-        cursor.execute(
-            """
-            INSERT INTO attachments (email_id, filename, size, url)
-            VALUES (?, ?, ?, ?)
-            """,
-            (email_id, attachment["filename"], attachment["size"], attachment["url"]),
-        )
+    _insert_attachments(conn, email_id, attachments)
+    stats_repository.record(conn, [email_id])
+    thread_repository.record(conn, [email_id])
+    refresh_inbox_index(conn, [email_id])
+    mailbox_version.bump(conn, [email_id])
 
     created = fetch_email_by_id(conn, int(email_id))
     if created is None:
@@ -210,33 +781,147 @@ def update_email(
     updates: dict,
     attachments: list[dict] | None,
 ) -> dict | None:
+    tiered = cold_tier_available(conn)
+    if _execute(conn, "email_exists", (email_id,)).fetchone() is None:
+        if not restore_from_cold(conn, email_id):
+            return None
+
+    if "recipient_email" in updates:
+        updates = dict(updates)
+        updates["recipient_id"] = contact_repository.ensure_contact(
+            conn, updates.pop("recipient_name"), updates.pop("recipient_email")
+        )
+
+    unknown = set(updates) - set(UPDATABLE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unsupported email fields: {', '.join(sorted(unknown))}")
+    affects_stats = "is_read" in updates or attachments is not None
+    if affects_stats:
+        stats_repository.retract(conn, [email_id])
+    if "is_read" in updates:
+        thread_repository.retract(conn, [email_id], tiered=tiered)
+
     if updates:
-        update_fields = ", ".join(updates.keys())
-        params = list(updates.values()) + [email_id]
-        cursor = conn.cursor()
-        cursor.execute(f"UPDATE emails SET {update_fields} WHERE id = ?", tuple(params))
+        params = [updates.get(column) for column in UPDATABLE_COLUMNS] + [email_id]
+        _execute(conn, "update_email", params)
+        refresh_inbox_index(conn, [email_id])
 
     if attachments is not None:
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM attachments WHERE email_id = ?", (email_id,))
-        for attachment in attachments:
-            cursor.execute(
-                """
-                INSERT INTO attachments (email_id, filename, size, url)
-                VALUES (?, ?, ?, ?)
-                """,
-                (email_id, attachment["filename"], attachment["size"], attachment["url"]),
-            )
+        _execute(conn, "delete_attachments", (email_id,))
+        _insert_attachments(conn, email_id, attachments)
+
+    if affects_stats:
+        stats_repository.record(conn, [email_id])
+    if "is_read" in updates:
+        thread_repository.record(conn, [email_id])
+    if updates or attachments is not None:
+        mailbox_version.bump(conn, [email_id])
 
     return fetch_email_by_id(conn, email_id)
 
 
 def delete_email(conn: Connection, email_id: int) -> bool:
-    cursor = conn.cursor()
-    cursor.execute("SELECT id FROM emails WHERE id = ?", (email_id,))
-    if cursor.fetchone() is None:
+    tiered = cold_tier_available(conn)
+    if _execute(conn, "email_exists", (email_id,)).fetchone() is not None:
+        stats_repository.retract(conn, [email_id])
+        threads = thread_repository.retract(conn, [email_id], tiered=tiered)
+        _execute(conn, "delete_attachments", (email_id,))
+        _execute(conn, "delete_email", (email_id,))
+    elif tiered and _execute(conn, "email_exists_cold", (email_id,)).fetchone() is not None:
+        stats_repository.retract(conn, [email_id], cold=True)
+        threads = thread_repository.retract(conn, [email_id], cold=True, tiered=True)
+        _execute(conn, "delete_attachments_cold", (email_id,))
+        _execute(conn, "delete_email_cold", (email_id,))
+    else:
         return False
+    thread_repository.prune(conn, threads)
 
-    cursor.execute("DELETE FROM attachments WHERE email_id = ?", (email_id,))
-    cursor.execute("DELETE FROM emails WHERE id = ?", (email_id,))
+    on_commit(conn, lambda: inbox_index.remove([email_id]))
+    mailbox_version.bump(conn, [email_id])
     return True
+
+
+def fetch_scheduled(conn: Connection) -> list[tuple[int, str]]:
+    """Return ``(id, scheduled_at)`` for every email waiting to be sent, earliest first."""
+    return [(row[0], row[1]) for row in _execute(conn, "fetch_scheduled").fetchall()]
+
+
+def deliver_scheduled(conn: Connection, email_ids: list[int], now: str) -> int:
+    """Send scheduled emails that are due; emails deleted or already sent are skipped."""
+    if not email_ids:
+        return 0
+    delivered = [
+        email_id
+        for email_id in email_ids
+        if _execute(conn, "deliver_scheduled", (email_id, now)).fetchone() is not None
+    ]
+    if delivered:
+        stats_repository.record(conn, delivered)
+        thread_repository.record(conn, delivered)
+        refresh_inbox_index(conn, delivered)
+        mailbox_version.bump(conn, delivered)
+    return len(delivered)
+
+
+def move_to_cold(conn: Connection, email_ids: list[int]) -> int:
+    """Move archived emails and their attachments into the cold tier.
+
+    Rows are copied with INSERT OR REPLACE before being deleted from the hot
+    tier, so a run interrupted between the two databases can simply be
+    repeated. Emails that were unarchived in the meantime stay hot.
+    """
+    if not email_ids:
+        return 0
+    ids = json.dumps(email_ids)
+    email_columns = ", ".join(_table_columns(conn, "main", "emails"))
+    attachment_columns = ", ".join(_table_columns(conn, "main", "attachments"))
+    archived_ids = "SELECT id FROM main.emails WHERE id IN (SELECT value FROM json_each(?)) AND is_archived = 1"
+
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO cold.emails ({email_columns})
+        SELECT {email_columns} FROM main.emails WHERE id IN ({archived_ids})
+        """,
+        (ids,),
+    )
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO cold.attachments ({attachment_columns})
+        SELECT {attachment_columns} FROM main.attachments WHERE email_id IN ({archived_ids})
+        """,
+        (ids,),
+    )
+    conn.execute(f"DELETE FROM main.attachments WHERE email_id IN ({archived_ids})", (ids,))
+    cursor = conn.execute(f"DELETE FROM main.emails WHERE id IN ({archived_ids})", (ids,))
+    return cursor.rowcount
+
+
+def restore_from_cold(conn: Connection, email_id: int) -> bool:
+    """Move one email back into the hot tier so it can be modified in place."""
+    if not cold_tier_available(conn):
+        return False
+    if _execute(conn, "email_exists_cold", (email_id,)).fetchone() is None:
+        return False
+
+    email_columns = ", ".join(_table_columns(conn, "main", "emails"))
+    attachment_columns = ", ".join(_table_columns(conn, "main", "attachments"))
+    conn.execute(
+        f"""
+        INSERT INTO main.emails ({email_columns})
+        SELECT {email_columns} FROM cold.emails WHERE id = ?
+        """,
+        (email_id,),
+    )
+    conn.execute(
+        f"""
+        INSERT INTO main.attachments ({attachment_columns})
+        SELECT {attachment_columns} FROM cold.attachments WHERE email_id = ?
+        """,
+        (email_id,),
+    )
+    _execute(conn, "delete_attachments_cold", (email_id,))
+    _execute(conn, "delete_email_cold", (email_id,))
+    return True
+
+
+mailbox_version.subscribe_changes(refresh_changed_emails)
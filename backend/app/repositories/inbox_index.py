@@ -0,0 +1,218 @@
+"""In-memory sorted index of the mailbox tabs.
+
+For every list filter the index keeps a plain Python list of sort keys in the
+exact order of ``ORDER BY is_read ASC, date DESC, id ASC``, so a page of any
+tab is a slice found with ``bisect`` instead of a sort in SQLite. Keys are
+``(is_read, inverted date bytes, id)``: inverting the UTF-8 bytes of the date
+turns SQLite's descending BINARY order into ascending tuple order, and bytes
+keep each key small.
+
+The index is loaded once and then maintained incrementally by the repository
+writes, which apply changed rows after their transaction commits. Emails
+changed by other processes are re-read through ``mailbox_version``'s change
+log; the index is only dropped when that log cannot say which emails changed,
+or when a local write raced the re-read. A filter holding more
+than ``INBOX_INDEX_MAX_ENTRIES`` emails is not indexed, which bounds memory;
+callers then fall back to SQL.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from bisect import bisect_left, insort
+from typing import Iterable
+
+from app import database
+from app.coherence import mailbox_version
+
+ENABLED = os.getenv("INBOX_INDEX_ENABLED", "1") not in ("0", "false", "False")
+MAX_ENTRIES = int(os.getenv("INBOX_INDEX_MAX_ENTRIES", "100000"))
+
+FILTERS = ("all", "unread", "archived")
+_INVERT = bytes(range(255, -1, -1))
+
+SortKey = tuple[int, bytes, int]
+
+
+def _descending(text: str) -> bytes:
+    # 0xFF never occurs in UTF-8, so as a terminator it sorts a string after
+    # every longer string it is a prefix of, as DESC requires.
+    return text.encode().translate(_INVERT) + b"\xff"
+
+
+def _filters_for(is_read, is_archived, scheduled_at) -> tuple[str, ...]:
+    """Mirror of ``email_repository.FILTER_CONDITIONS``."""
+    if scheduled_at is not None:
+        return ()
+    if is_archived:
+        return ("archived",)
+    return ("all",) if is_read else ("all", "unread")
+
+
+class InboxIndex:
+    def __init__(self, enabled: bool = ENABLED, max_entries: int = MAX_ENTRIES) -> None:
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self._database: str | None = None
+        self._keys: dict[str, list[SortKey]] = {}
+        self._overflowed: set[str] = set()
+        self._entries: dict[int, tuple[SortKey, tuple[str, ...]]] = {}
+        self._changes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._database is not None and self._database == database.DATABASE_PATH
+
+    def begin_load(self) -> int:
+        """Return a token that ``replace`` uses to detect writes racing the load."""
+        with self._lock:
+            return self._changes
+
+    def replace(self, rows: Iterable, token: int) -> bool:
+        """Rebuild from ``(id, is_read, is_archived, date, scheduled_at)`` rows."""
+        entries: dict[int, tuple[SortKey, tuple[str, ...]]] = {}
+        for email_id, is_read, is_archived, date, scheduled_at in rows:
+            # An email caught mid-move between tiers shows up twice; keep one.
+            entries[email_id] = (
+                (int(is_read), _descending(date or ""), email_id),
+                _filters_for(is_read, is_archived, scheduled_at),
+            )
+        keys: dict[str, list[SortKey]] = {name: [] for name in FILTERS}
+        for key, filters in entries.values():
+            for name in filters:
+                keys[name].append(key)
+
+        overflowed = set()
+        for name, filter_keys in keys.items():
+            if len(filter_keys) > self.max_entries:
+                overflowed.add(name)
+                keys[name] = []
+            else:
+                filter_keys.sort()
+
+        with self._lock:
+            if token != self._changes:
+                return False
+            self._entries = entries
+            self._keys = keys
+            self._overflowed = overflowed
+            self._database = database.DATABASE_PATH
+            self.loads += 1
+        return True
+
+    def apply(self, rows: Iterable) -> None:
+        """Insert or move emails given their current ``(id, is_read, is_archived, date, scheduled_at)``."""
+        with self._lock:
+            self._changes += 1
+            if self.loaded:
+                self._apply(rows)
+
+    def _apply(self, rows: Iterable) -> None:
+        for email_id, is_read, is_archived, date, scheduled_at in rows:
+            self._discard(email_id)
+            key = (int(is_read), _descending(date or ""), email_id)
+            filters = _filters_for(is_read, is_archived, scheduled_at)
+            self._entries[email_id] = (key, filters)
+            for name in filters:
+                if name in self._overflowed:
+                    continue
+                filter_keys = self._keys[name]
+                if len(filter_keys) >= self.max_entries:
+                    self._overflowed.add(name)
+                    self._keys[name] = []
+                    continue
+                insort(filter_keys, key)
+
+    def remove(self, email_ids: Iterable[int]) -> None:
+        with self._lock:
+            self._changes += 1
+            if not self.loaded:
+                return
+            for email_id in email_ids:
+                self._discard(email_id)
+
+    def refresh(self, email_ids: list[int], rows: list, token: int) -> None:
+        """Apply rows re-read for emails changed elsewhere; ids without a row were deleted.
+
+        ``token`` comes from ``begin_load`` before the rows were read. If a
+        local write was applied since, the rows may be older than the index,
+        so the index is dropped and reloaded instead.
+        """
+        found = {row[0] for row in rows}
+        with self._lock:
+            if token != self._changes:
+                self._drop()
+                return
+            self._changes += 1
+            if not self.loaded:
+                return
+            for email_id in email_ids:
+                if email_id not in found:
+                    self._discard(email_id)
+            self._apply(rows)
+
+    def _discard(self, email_id: int) -> None:
+        entry = self._entries.pop(email_id, None)
+        if entry is None:
+            return
+        key, filters = entry
+        for name in filters:
+            if name in self._overflowed:
+                continue
+            filter_keys = self._keys[name]
+            position = bisect_left(filter_keys, key)
+            if position < len(filter_keys) and filter_keys[position] == key:
+                del filter_keys[position]
+
+    def page(self, filter_value: str, offset: int, limit: int) -> list[int] | None:
+        """Ids of one page of a tab, or None when the index cannot answer."""
+        with self._lock:
+            if not self.enabled or not self.loaded or filter_value in self._overflowed:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return [key[2] for key in self._keys[filter_value][offset:offset + limit]]
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._drop()
+
+    def _drop(self) -> None:
+        self._changes += 1
+        self._database = None
+        self._entries = {}
+        self._keys = {}
+        self._overflowed = set()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            filters = {}
+            for name in FILTERS:
+                filter_keys = self._keys.get(name, [])
+                filters[name] = {
+                    "entries": len(filter_keys),
+                    "bytes": sys.getsizeof(filter_keys)
+                    + sum(sys.getsizeof(key) + sys.getsizeof(key[1]) for key in filter_keys),
+                    "overflowed": name in self._overflowed,
+                }
+            return {
+                "enabled": self.enabled,
+                "loaded": self.loaded,
+                "max_entries": self.max_entries,
+                "filters": filters,
+                "bytes": sum(entry["bytes"] for entry in filters.values())
+                + sys.getsizeof(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "loads": self.loads,
+            }
+
+
+inbox_index = InboxIndex()
+mailbox_version.subscribe(inbox_index.invalidate)
@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import json
+from sqlite3 import Connection, Cursor
+
+from app.repositories import statements
+
+ITEM_COLUMNS = "id, name"
+
+STATEMENTS: dict[str, str] = {
+    "page_by_id": f"""
+        SELECT {ITEM_COLUMNS}
+        FROM items
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+        """,
+    # Keyset order for prefix filters follows idx_items_name; the lower bound
+    # comes from the cursor, which starts at (prefix, 0).
+    "page_by_name": f"""
+        SELECT {ITEM_COLUMNS}
+        FROM items
+        WHERE (name, id) > (?, ?) AND name < ?
+        ORDER BY name, id
+        LIMIT ?
+        """,
+    "page_by_name_unbounded": f"""
+        SELECT {ITEM_COLUMNS}
+        FROM items
+        WHERE (name, id) > (?, ?)
+        ORDER BY name, id
+        LIMIT ?
+        """,
+    "fetch_item": f"SELECT {ITEM_COLUMNS} FROM items WHERE id = ?",
+    "insert_item": f"INSERT INTO items (name) VALUES (?) RETURNING {ITEM_COLUMNS}",
+    "update_item": f"UPDATE items SET name = ? WHERE id = ? RETURNING {ITEM_COLUMNS}",
+    "delete_item": "DELETE FROM items WHERE id = ? RETURNING id",
+    # executemany discards RETURNING rows, so a batch of upserts is one
+    # statement over a JSON array instead. "WHERE true" keeps ON CONFLICT from
+    # being parsed as part of the SELECT.
+    "upsert_items": f"""
+        INSERT INTO items (id, name)
+        SELECT value ->> 'id', value ->> 'name' FROM json_each(?) WHERE true
+        ON CONFLICT (id) DO UPDATE SET name = excluded.name
+        RETURNING {ITEM_COLUMNS}
+        """,
+    "delete_items": "DELETE FROM items WHERE id = ?",
+}
+
+
+def _execute(conn: Connection, name: str, params: tuple | list = ()) -> Cursor:
+    return statements.execute(conn, STATEMENTS[name], params)
+
+
+def _prefix_upper_bound(prefix: str) -> str | None:
+    """The smallest string above every string starting with ``prefix``."""
+    while prefix:
+        code_point = ord(prefix[-1]) + 1
+        if 0xD800 <= code_point <= 0xDFFF:
+            code_point = 0xE000  # surrogates cannot be stored as UTF-8
+        if code_point <= 0x10FFFF:
+            return prefix[:-1] + chr(code_point)
+        prefix = prefix[:-1]
+    return None
+
+
+def _serialize(row) -> dict:
+    return {"id": row[0], "name": row[1]}
+
+
+def list_items(
+    conn: Connection,
+    limit: int,
+    after: tuple | None = None,
+    prefix: str | None = None,
+) -> list[dict]:
+    """Up to ``limit`` items after the keyset ``after``.
+
+    Without a prefix items are ordered by id and ``after`` is ``(id,)``. With
+    one, only names starting with it (case-sensitively) are returned, ordered
+    by name then id, and ``after`` is ``(name, id)``.
+    """
+    if not prefix:
+        (after_id,) = after or (0,)
+        rows = _execute(conn, "page_by_id", (after_id, limit)).fetchall()
+    else:
+        after_name, after_id = after or (prefix, 0)
+        upper = _prefix_upper_bound(prefix)
+        if upper is None:
+            rows = _execute(conn, "page_by_name_unbounded", (after_name, after_id, limit)).fetchall()
+        else:
+            rows = _execute(conn, "page_by_name", (after_name, after_id, upper, limit)).fetchall()
+    return [_serialize(row) for row in rows]
+
+
+def fetch_item(conn: Connection, item_id: int) -> dict | None:
+    row = _execute(conn, "fetch_item", (item_id,)).fetchone()
+    return _serialize(row) if row is not None else None
+
+
+def create_item(conn: Connection, name: str) -> dict:
+    return _serialize(_execute(conn, "insert_item", (name,)).fetchone())
+
+
+def update_item(conn: Connection, item_id: int, name: str) -> dict | None:
+    row = _execute(conn, "update_item", (name, item_id)).fetchone()
+    return _serialize(row) if row is not None else None
+
+
+def delete_item(conn: Connection, item_id: int) -> bool:
+    return _execute(conn, "delete_item", (item_id,)).fetchone() is not None
+
+
+def upsert_items(conn: Connection, items: list[dict]) -> list[dict]:
+    """Insert or rename ``{"id", "name"}`` items (``id`` may be None); returns them with ids."""
+    if not items:
+        return []
+    rows = _execute(conn, "upsert_items", (json.dumps(items),)).fetchall()
+    return [_serialize(row) for row in rows]
+
+
+def delete_items(conn: Connection, item_ids: list[int]) -> int:
+    if not item_ids:
+        return 0
+    cursor = statements.executemany(conn, STATEMENTS["delete_items"], [(item_id,) for item_id in item_ids])
+    return cursor.rowcount
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import threading
+from sqlite3 import Connection, Cursor
+
+from app import database
+
+
+class StatementStats:
+    """Counts statement preparations versus statement cache hits.
+
+    A statement counts as a hit when its SQL text has already been prepared
+    on the same pooled connection; the sqlite3 statement cache then reuses
+    the compiled statement instead of parsing it again.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.prepares = 0
+        self.cache_hits = 0
+
+    def record(self, conn: Connection, sql: str) -> None:
+        prepared = getattr(conn, "prepared_statements", None)
+        with self._lock:
+            if prepared is not None and sql in prepared:
+                self.cache_hits += 1
+                return
+            self.prepares += 1
+        if prepared is not None and len(prepared) < database.STATEMENT_CACHE_SIZE:
+            prepared.add(sql)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            total = self.prepares + self.cache_hits
+            return {
+                "cache_size": database.STATEMENT_CACHE_SIZE,
+                "prepares": self.prepares,
+                "cache_hits": self.cache_hits,
+                "hit_ratio": round(self.cache_hits / total, 4) if total else 0.0,
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.prepares = 0
+            self.cache_hits = 0
+
+
+statement_stats = StatementStats()
+
+
+def execute(conn: Connection, sql: str, params: tuple | list = ()) -> Cursor:
+    statement_stats.record(conn, sql)
+    return conn.execute(sql, params)
+
+
+def executemany(conn: Connection, sql: str, params: list) -> Cursor:
+    statement_stats.record(conn, sql)
+    return conn.executemany(sql, params)
@@ -0,0 +1,206 @@
+"""Incrementally maintained mailbox statistics.
+
+Every write path in ``email_repository`` calls ``retract`` for the emails it
+is about to change and ``record`` once they are changed, in the same
+transaction, so the rollup tables always agree with the committed emails
+without ever scanning them. Emails count once they are sent (scheduled emails
+join at delivery) and keep counting after they move to the archive tier.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from collections import defaultdict
+from datetime import datetime, timezone
+from sqlite3 import Connection, Cursor
+
+from app.repositories import statements
+
+SIZE_UNITS = {"b": 1, "kb": 1_000, "mb": 1_000_000, "gb": 1_000_000_000}
+_SIZE_PATTERN = re.compile(r"^\s*([\d.]+)\s*([kmg]?b)\s*$", re.IGNORECASE)
+REBUILD_BATCH_SIZE = 1000
+
+STATEMENTS: dict[str, str] = {
+    **{
+        f"stat_rows{suffix}": f"""
+        SELECT e.id, substr(e.date, 1, 10), e.sender_id, e.is_read,
+               (SELECT json_group_array(a.size) FROM {schema}.attachments a WHERE a.email_id = e.id)
+        FROM {schema}.emails e
+        WHERE e.id IN (SELECT value FROM json_each(?)) AND e.scheduled_at IS NULL
+        """
+        for schema, suffix in (("main", ""), ("cold", "_cold"))
+    },
+    **{
+        f"stat_ids{suffix}": f"""
+        SELECT id FROM {schema}.emails
+        WHERE id > ? AND scheduled_at IS NULL
+        ORDER BY id
+        LIMIT ?
+        """
+        for schema, suffix in (("main", ""), ("cold", "_cold"))
+    },
+    "add_daily": """
+        INSERT INTO email_stats_daily (day, messages, unread, attachments, attachment_bytes)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (day) DO UPDATE SET
+            messages = messages + excluded.messages,
+            unread = unread + excluded.unread,
+            attachments = attachments + excluded.attachments,
+            attachment_bytes = attachment_bytes + excluded.attachment_bytes
+        """,
+    "add_sender": """
+        INSERT INTO email_stats_senders (sender_id, messages, unread)
+        VALUES (?, ?, ?)
+        ON CONFLICT (sender_id) DO UPDATE SET
+            messages = messages + excluded.messages,
+            unread = unread + excluded.unread
+        """,
+    "prune_daily": "DELETE FROM email_stats_daily WHERE day = ? AND messages <= 0",
+    "prune_sender": "DELETE FROM email_stats_senders WHERE sender_id = ? AND messages <= 0",
+    "totals": """
+        SELECT COALESCE(SUM(messages), 0), COALESCE(SUM(unread), 0),
+               COALESCE(SUM(attachments), 0), COALESCE(SUM(attachment_bytes), 0),
+               MIN(CASE WHEN unread > 0 THEN day END)
+        FROM email_stats_daily
+        """,
+    "daily": """
+        SELECT day, messages, unread, attachments, attachment_bytes
+        FROM email_stats_daily
+        ORDER BY day DESC
+        LIMIT ?
+        """,
+    "top_senders": """
+        SELECT sender_id, messages, unread
+        FROM email_stats_senders
+        ORDER BY messages DESC, sender_id ASC
+        LIMIT ?
+        """,
+    "rebuilt_at": "SELECT rebuilt_at FROM email_stats_state WHERE id = 1",
+    "mark_rebuilt": "UPDATE email_stats_state SET rebuilt_at = ? WHERE id = 1",
+}
+
+
+def _execute(conn: Connection, name: str, params: tuple | list = ()) -> Cursor:
+    return statements.execute(conn, STATEMENTS[name], params)
+
+
+def _executemany(conn: Connection, name: str, params: list) -> Cursor:
+    return statements.executemany(conn, STATEMENTS[name], params)
+
+
+def parse_size(size: str) -> int:
+    """Best-effort byte count of a display size such as ``"1.5 MB"``."""
+    match = _SIZE_PATTERN.match(size or "")
+    if match is None:
+        return 0
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2).lower()])
+
+
+def _apply(conn: Connection, email_ids: list[int], sign: int, cold: bool) -> None:
+    if not email_ids:
+        return
+    statement = "stat_rows_cold" if cold else "stat_rows"
+    daily: dict[str, list[int]] = defaultdict(lambda: [0, 0, 0, 0])
+    senders: dict[int, list[int]] = defaultdict(lambda: [0, 0])
+    for _, day, sender_id, is_read, sizes in _execute(
+        conn, statement, (json.dumps(email_ids),)
+    ).fetchall():
+        sizes = json.loads(sizes)
+        unread = 0 if is_read else 1
+        totals = daily[day]
+        totals[0] += sign
+        totals[1] += sign * unread
+        totals[2] += sign * len(sizes)
+        totals[3] += sign * sum(parse_size(size) for size in sizes)
+        sender = senders[sender_id]
+        sender[0] += sign
+        sender[1] += sign * unread
+
+    if not daily:
+        return
+    _executemany(conn, "add_daily", [(day, *totals) for day, totals in daily.items()])
+    _executemany(conn, "add_sender", [(sender_id, *totals) for sender_id, totals in senders.items()])
+    if sign < 0:
+        _executemany(conn, "prune_daily", [(day,) for day in daily])
+        _executemany(conn, "prune_sender", [(sender_id,) for sender_id in senders])
+
+
+def record(conn: Connection, email_ids: list[int], cold: bool = False) -> None:
+    """Count emails in their current state (call after inserting or changing them)."""
+    _apply(conn, email_ids, 1, cold)
+
+
+def retract(conn: Connection, email_ids: list[int], cold: bool = False) -> None:
+    """Remove emails' current state from the rollups (call before changing or deleting them)."""
+    _apply(conn, email_ids, -1, cold)
+
+
+def is_built(conn: Connection) -> bool:
+    row = _execute(conn, "rebuilt_at").fetchone()
+    return row is not None and row[0] is not None
+
+
+def rebuild(conn: Connection, include_cold: bool) -> int:
+    """Recompute every rollup from the emails, within the caller's transaction."""
+    conn.execute("DELETE FROM email_stats_daily")
+    conn.execute("DELETE FROM email_stats_senders")
+    counted = 0
+    for cold in (False, True) if include_cold else (False,):
+        position = 0
+        while True:
+            email_ids = [
+                row[0]
+                for row in _execute(
+                    conn, "stat_ids_cold" if cold else "stat_ids", (position, REBUILD_BATCH_SIZE)
+                ).fetchall()
+            ]
+            if not email_ids:
+                break
+            record(conn, email_ids, cold)
+            counted += len(email_ids)
+            position = email_ids[-1]
+    _execute(conn, "mark_rebuilt", (datetime.now(timezone.utc).replace(microsecond=0).isoformat(),))
+    return counted
+
+
+def fetch_stats(conn: Connection, days: int, senders: int) -> dict:
+    messages, unread, attachments, attachment_bytes, oldest_unread_day = _execute(
+        conn, "totals"
+    ).fetchone()
+    backlog_age_days = None
+    if oldest_unread_day:
+        try:
+            oldest = datetime.fromisoformat(oldest_unread_day).replace(tzinfo=timezone.utc)
+            backlog_age_days = max(0, (datetime.now(timezone.utc) - oldest).days)
+        except ValueError:
+            backlog_age_days = None
+
+    return {
+        "totals": {
+            "messages": messages,
+            "unread": unread,
+            "attachments": attachments,
+            "attachment_bytes": attachment_bytes,
+        },
+        "unread_backlog": {
+            "count": unread,
+            "oldest_day": oldest_unread_day,
+            "oldest_age_days": backlog_age_days,
+        },
+        "daily": [
+            {
+                "day": row[0],
+                "messages": row[1],
+                "unread": row[2],
+                "attachments": row[3],
+                "attachment_bytes": row[4],
+            }
+            for row in _execute(conn, "daily", (days,)).fetchall()
+        ],
+        "top_senders": [
+            {"sender_id": row[0], "messages": row[1], "unread": row[2]}
+            for row in _execute(conn, "top_senders", (senders,)).fetchall()
+        ],
+        "rebuilt_at": _execute(conn, "rebuilt_at").fetchone()[0],
+    }
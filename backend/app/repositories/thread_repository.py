@@ -0,0 +1,245 @@
+"""Conversation threads, assigned at write time and maintained incrementally.
+
+``create_email`` gives every email a thread: the thread of the email it
+replies to (``in_reply_to``) or else the one keyed by its normalized subject
+and its two participants, created on first use. A thread keeps the email's
+subject and does not change when the email is later edited.
+
+The ``threads`` row carries the last-activity time and the message and unread
+counts of its sent emails. Like ``stats_repository``, every write path calls
+``retract`` for the emails it is about to change and ``record`` once they are
+changed, in the same transaction, so listing threads never scans emails.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from collections import defaultdict
+from sqlite3 import Connection, Cursor
+
+from app.repositories import statements
+
+# "Re:", "Fwd:", "FW:", "AW:", "SV:" and numbered variants such as "Re[2]:".
+_REPLY_PREFIX = re.compile(r"^\s*(?:re|fwd?|aw|sv)\s*(?:\[\d+\])?\s*:\s*", re.IGNORECASE)
+
+THREAD_COLUMNS = "id, subject, last_activity, messages, unread"
+
+STATEMENTS: dict[str, str] = {
+    **{
+        f"thread_rows{suffix}": f"""
+        SELECT thread_id, date, is_read, scheduled_at IS NOT NULL
+        FROM {schema}.emails
+        WHERE id IN (SELECT value FROM json_each(?)) AND thread_id IS NOT NULL
+        """
+        for schema, suffix in (("main", ""), ("cold", "_cold"))
+    },
+    **{
+        f"parent_thread{suffix}": f"SELECT thread_id FROM {schema}.emails WHERE id = ?"
+        for schema, suffix in (("main", ""), ("cold", "_cold"))
+    },
+    # The no-op update makes RETURNING produce the id of an existing thread too.
+    "claim_thread": """
+        INSERT INTO threads (thread_key, subject, last_activity)
+        VALUES (?, ?, ?)
+        ON CONFLICT (thread_key) DO UPDATE SET thread_key = excluded.thread_key
+        RETURNING id
+        """,
+    "add_counts": """
+        UPDATE threads SET
+            messages = messages + ?,
+            unread = unread + ?,
+            last_activity = MAX(last_activity, ?)
+        WHERE id = ?
+        """,
+    # Retracted emails no longer count towards the last activity; the others
+    # are found through idx_emails_thread_id.
+    "subtract_counts": """
+        UPDATE threads SET
+            messages = messages - ?,
+            unread = unread - ?,
+            last_activity = COALESCE(
+                (
+                    SELECT MAX(date) FROM main.emails
+                    WHERE thread_id = threads.id AND scheduled_at IS NULL
+                        AND id NOT IN (SELECT value FROM json_each(?))
+                ),
+                last_activity
+            )
+        WHERE id = ?
+        """,
+    "subtract_counts_tiered": """
+        UPDATE threads SET
+            messages = messages - ?,
+            unread = unread - ?,
+            last_activity = COALESCE(
+                (
+                    SELECT MAX(date) FROM (
+                        SELECT date FROM main.emails
+                        WHERE thread_id = threads.id AND scheduled_at IS NULL
+                            AND id NOT IN (SELECT value FROM json_each(?))
+                        UNION ALL
+                        SELECT date FROM cold.emails
+                        WHERE thread_id = threads.id AND scheduled_at IS NULL
+                            AND id NOT IN (SELECT value FROM json_each(?))
+                    )
+                ),
+                last_activity
+            )
+        WHERE id = ?
+        """,
+    # A thread may be empty only while its emails are scheduled.
+    "prune_thread": """
+        DELETE FROM threads
+        WHERE id = ? AND messages <= 0
+            AND NOT EXISTS (SELECT 1 FROM main.emails WHERE thread_id = threads.id)
+        """,
+    # Both pages walk idx_threads_activity backwards and stop after LIMIT rows.
+    # Threads whose only emails are still scheduled have no messages yet.
+    "page": f"""
+        SELECT {THREAD_COLUMNS}
+        FROM threads
+        WHERE messages > 0
+        ORDER BY last_activity DESC, id DESC
+        LIMIT ?
+        """,
+    "page_after": f"""
+        SELECT {THREAD_COLUMNS}
+        FROM threads
+        WHERE (last_activity, id) < (?, ?) AND messages > 0
+        ORDER BY last_activity DESC, id DESC
+        LIMIT ?
+        """,
+}
+
+
+def _execute(conn: Connection, name: str, params: tuple | list = ()) -> Cursor:
+    return statements.execute(conn, STATEMENTS[name], params)
+
+
+def _executemany(conn: Connection, name: str, params: list) -> Cursor:
+    return statements.executemany(conn, STATEMENTS[name], params)
+
+
+def base_subject(subject: str) -> str:
+    """``subject`` without reply and forward prefixes, whitespace collapsed."""
+    previous = None
+    while previous != subject:
+        previous = subject
+        subject = _REPLY_PREFIX.sub("", subject, count=1)
+    return " ".join(subject.split())
+
+
+def thread_key(sender_id: int, recipient_id: int, subject: str) -> str:
+    """Both directions of a conversation share a key; the subject is compared caselessly."""
+    low, high = sorted((sender_id, recipient_id))
+    return f"{low}:{high}:{base_subject(subject).casefold()}"
+
+
+def assign_thread(
+    conn: Connection,
+    sender_id: int,
+    recipient_id: int,
+    subject: str,
+    date: str,
+    in_reply_to: int | None = None,
+    tiered: bool = False,
+) -> int:
+    """Thread id for a new email; ``tiered`` also looks for the replied-to email in cold."""
+    if in_reply_to is not None:
+        row = _execute(conn, "parent_thread", (in_reply_to,)).fetchone()
+        if row is None and tiered:
+            row = _execute(conn, "parent_thread_cold", (in_reply_to,)).fetchone()
+        # An unknown or unthreaded parent falls back to the subject.
+        if row is not None and row[0] is not None:
+            return row[0]
+    return _execute(
+        conn,
+        "claim_thread",
+        (thread_key(sender_id, recipient_id, subject), base_subject(subject), date),
+    ).fetchone()[0]
+
+
+def _totals(conn: Connection, email_ids: list[int], cold: bool) -> dict[int, list]:
+    """``[messages, unread, last date]`` per thread; scheduled emails do not count yet."""
+    totals: dict[int, list] = defaultdict(lambda: [0, 0, ""])
+    for thread_id, date, is_read, scheduled in _execute(
+        conn, "thread_rows_cold" if cold else "thread_rows", (json.dumps(email_ids),)
+    ).fetchall():
+        thread = totals[thread_id]
+        if scheduled:
+            continue
+        thread[0] += 1
+        thread[1] += 0 if is_read else 1
+        thread[2] = max(thread[2], date)
+    return totals
+
+
+def record(conn: Connection, email_ids: list[int], cold: bool = False) -> None:
+    """Count emails in their current state (call after inserting or changing them)."""
+    if not email_ids:
+        return
+    totals = _totals(conn, email_ids, cold)
+    _executemany(
+        conn,
+        "add_counts",
+        [
+            (messages, unread, date, thread_id)
+            for thread_id, (messages, unread, date) in totals.items()
+            if messages
+        ],
+    )
+
+
+def retract(
+    conn: Connection,
+    email_ids: list[int],
+    cold: bool = False,
+    tiered: bool = False,
+) -> list[int]:
+    """Remove emails' current state from their threads (call before changing or deleting them).
+
+    ``tiered`` must be set when the archive is attached, so that the last
+    activity of a thread also considers its archived emails. Returns the
+    threads touched, for ``prune`` once the emails are deleted.
+    """
+    if not email_ids:
+        return []
+    totals = _totals(conn, email_ids, cold)
+    # The tiered statement excludes the retracted emails in both tiers.
+    excluded = (json.dumps(email_ids),) * (2 if tiered else 1)
+    _executemany(
+        conn,
+        "subtract_counts_tiered" if tiered else "subtract_counts",
+        [
+            (messages, unread, *excluded, thread_id)
+            for thread_id, (messages, unread, _) in totals.items()
+            if messages
+        ],
+    )
+    return list(totals)
+
+
+def prune(conn: Connection, thread_ids: list[int]) -> None:
+    """Drop threads left without emails (call after deleting emails)."""
+    if thread_ids:
+        _executemany(conn, "prune_thread", [(thread_id,) for thread_id in thread_ids])
+
+
+def _serialize(row) -> dict:
+    return {
+        "id": str(row[0]),
+        "subject": row[1],
+        "last_activity": row[2],
+        "messages": row[3],
+        "unread": row[4],
+    }
+
+
+def list_threads(conn: Connection, limit: int, after: tuple | None = None) -> list[dict]:
+    """Up to ``limit`` threads, most recently active first, after ``(last_activity, id)``."""
+    if after is None:
+        rows = _execute(conn, "page", (limit,)).fetchall()
+    else:
+        rows = _execute(conn, "page_after", (*after, limit)).fetchall()
+    return [_serialize(row) for row in rows]
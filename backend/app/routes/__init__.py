@@ -1,5 +1,15 @@
+from app.routes.admin import router as admin_router
+from app.routes.contacts import router as contacts_router
 from app.routes.emails import router as emails_router
 from app.routes.health import router as health_router
 from app.routes.items import router as items_router
+from app.routes.threads import router as threads_router
 
-__all__ = ["emails_router", "health_router", "items_router"]
+__all__ = [
+    "admin_router",
+    "contacts_router",
+    "emails_router",
+    "health_router",
+    "items_router",
+    "threads_router",
+]
@@ -0,0 +1,108 @@
+import hmac
+import os
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.coherence import mailbox_version
+from app.database import get_db
+from app.jobs import job_queue
+from app.middleware import admission_controller, compressed_body_cache
+from app.profiling import profile_store
+from app.repositories.contact_cache import contact_cache
+from app.repositories.contact_index import contact_index
+from app.repositories.inbox_index import inbox_index
+from app.repositories.statements import statement_stats
+from app.services import backup_service
+from app.services.maintenance_service import maintenance
+from app.services.send_scheduler import send_scheduler
+from app.services.single_flight import list_flights
+from app.services.write_coalescer import write_coalescer
+from app.warmup import warmup
+
+# Without a token the admin endpoints are turned off.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def require_admin(authorization: str | None = Header(default=None)) -> None:
+    """Admin endpoints take ``Authorization: Bearer <ADMIN_TOKEN>``."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled; set ADMIN_TOKEN")
+    if authorization is None or not hmac.compare_digest(
+        authorization.encode(), f"Bearer {ADMIN_TOKEN}".encode()
+    ):
+        raise HTTPException(
+            status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin)])
+
+
+@router.get("/stats")
+def get_stats():
+    """Runtime counters for the database layer, caches and background work."""
+    with get_db() as conn:
+        jobs = job_queue.stats(conn)
+    return {
+        "statements": statement_stats.snapshot(),
+        "compression_cache": compressed_body_cache.snapshot(),
+        "mailbox_version": mailbox_version.snapshot(),
+        "admission": admission_controller.snapshot(),
+        "jobs": jobs,
+        "scheduled_send": send_scheduler.snapshot(),
+        "list_coalescing": list_flights.snapshot(),
+        "write_coalescing": write_coalescer.snapshot(),
+        "inbox_index": inbox_index.snapshot(),
+        "contact_index": contact_index.snapshot(),
+        "contact_cache": contact_cache.snapshot(),
+        "profiling": profile_store.snapshot(),
+        "maintenance": maintenance.snapshot(),
+        "backup": backup_service.progress.snapshot(),
+        "warmup": warmup.snapshot(),
+    }
+
+
+@router.get("/profiles")
+def list_profiles():
+    """Most recent request profiles, newest first, without function tables."""
+    return profile_store.list()
+
+
+@router.get("/profiles/{profile_id}")
+def get_profile(profile_id: int):
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return profile
+
+
+def _backup_error(exc: backup_service.BackupError) -> HTTPException:
+    if isinstance(exc, backup_service.BackupNotFound):
+        return HTTPException(status_code=404, detail=str(exc))
+    if isinstance(exc, backup_service.BackupInProgress):
+        return HTTPException(status_code=409, detail=str(exc))
+    return HTTPException(status_code=400, detail=str(exc))
+
+
+@router.get("/backups")
+def list_backups():
+    """Manifests of the stored backups, newest first, and the current progress."""
+    return {"backups": backup_service.list_backups(), "progress": backup_service.progress.snapshot()}
+
+
+@router.post("/backups", status_code=201)
+def create_backup():
+    """Take an online snapshot of the database and its archive."""
+    try:
+        return backup_service.create_backup()
+    except backup_service.BackupError as exc:
+        raise _backup_error(exc)
+
+
+@router.post("/backups/{name}/verify")
+def verify_backup(name: str):
+    try:
+        return backup_service.verify_backup(name)
+    except backup_service.BackupError as exc:
+        raise _backup_error(exc)
+
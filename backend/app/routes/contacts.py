@@ -0,0 +1,20 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from app.database import get_db
+from app.profiling import ProfiledRoute
+from app.schemas.contact import ContactSuggestion
+from app.services import contact_service
+
+router = APIRouter(prefix="/contacts", tags=["contacts"], route_class=ProfiledRoute)
+
+
+@router.get("", response_model=list[ContactSuggestion])
+def search_contacts(
+    prefix: str = Query(default="", max_length=254),
+    limit: int = Query(default=10, ge=1, le=50),
+):
+    try:
+        with get_db() as conn:
+            return contact_service.search_contacts(conn, prefix, limit)
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(exc)}")
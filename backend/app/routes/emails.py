@@ -1,22 +1,54 @@
+from itertools import chain
 from typing import Literal
 
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 
 from app.database import get_db
+from app.profiling import ProfiledRoute
 from app.schemas.email import EmailCreate, EmailResponse, EmailUpdate
-from app.services import email_service
+from app.schemas.stats import MailboxStats
+from app.services import email_service, stats_service
 
-router = APIRouter(prefix="/emails", tags=["emails"])
+router = APIRouter(prefix="/emails", tags=["emails"], route_class=ProfiledRoute)
 
 
 @router.get("", response_model=list[EmailResponse])
 def list_emails(
     filter: Literal["all", "unread", "archived"] = Query(default="all"),
     search: str | None = Query(default=None),
+    limit: int | None = Query(default=None, ge=1, le=500),
+    offset: int = Query(default=0, ge=0),
 ):
     try:
+        if email_service.STREAM_LISTS and limit is None:
+            chunks = _stream_emails(filter, search)
+            # The first batch is produced here, so errors before any byte is
+            # sent still become a 500.
+            first = next(chunks)
+            return StreamingResponse(chain((first,), chunks), media_type="application/json")
         with get_db() as conn:
-            return email_service.list_emails(conn, filter, search)
+            body = email_service.list_emails_json(conn, filter, search, limit, offset)
+        return Response(content=body, media_type="application/json")
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(exc)}")
+
+
+def _stream_emails(filter_value: str, search_value: str | None):
+    # Holds a pooled connection until the last chunk has been sent.
+    with get_db() as conn:
+        yield from email_service.stream_email_list(conn, filter_value, search_value)
+
+
+# Declared before "/{email_id}" so "stats" is not parsed as an id.
+@router.get("/stats", response_model=MailboxStats)
+def get_stats(
+    days: int = Query(default=30, ge=1, le=366),
+    senders: int = Query(default=10, ge=1, le=100),
+):
+    try:
+        with get_db() as conn:
+            return stats_service.get_stats(conn, days, senders)
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Database error: {str(exc)}")
 
@@ -1,9 +1,20 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from app.warmup import warmup
 
 router = APIRouter()
 
 
 @router.get("/health")
 def health_check():
-    """Health check endpoint."""
+    """Liveness: the process is up."""
     return {"status": "healthy"}
+
+
+@router.get("/ready")
+def readiness_check():
+    """Readiness: 503 until startup warmup has finished."""
+    if not warmup.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
@@ -1,93 +1,90 @@
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Query
 
 from app.database import get_db
+from app.schemas.item import (
+    ItemBulkRequest,
+    ItemBulkResult,
+    ItemCreate,
+    ItemPage,
+    ItemResponse,
+    ItemUpdate,
+)
+from app.services import cursors, item_service
 
 router = APIRouter(prefix="/items", tags=["items"])
 
 
-class ItemCreate(BaseModel):
-    name: str
-
-
-class ItemUpdate(BaseModel):
-    name: str
-
-
-class ItemResponse(BaseModel):
-    id: int
-    name: str
+@router.get("", response_model=ItemPage)
+def list_items(
+    limit: int = Query(default=100, ge=1, le=1000),
+    cursor: str | None = Query(default=None, max_length=1024),
+    prefix: str | None = Query(default=None, max_length=255),
+):
+    """
+    List items a page at a time, optionally only names starting with ``prefix``.
+    Pass ``next_cursor`` back as ``cursor`` for the following page.
+    """
+    try:
+        with get_db() as conn:
+            return item_service.list_items(conn, limit, cursor, prefix)
+    except cursors.InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@router.get("")
-def list_items():
+@router.post("/bulk", response_model=ItemBulkResult)
+def bulk_items(payload: ItemBulkRequest):
     """
-    List all items from the database.
-    Uses raw SQL query (no ORM).
+    Upsert and delete many items in one transaction: upserts first, then deletes.
     """
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, name FROM items ORDER BY id")
-            rows = cursor.fetchall()
-            items = [{"id": row["id"], "name": row["name"]} for row in rows]
-            return {"items": items}
+            return item_service.apply_bulk(conn, payload)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@router.get("/{item_id}")
+@router.get("/{item_id}", response_model=ItemResponse)
 def get_item(item_id: int):
     """
     Get a single item by ID.
-    Uses raw SQL query (no ORM).
     """
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT id, name FROM items WHERE id = ?", (item_id,))
-            row = cursor.fetchone()
-            if row is None:
+            item = item_service.get_item(conn, item_id)
+            if item is None:
                 raise HTTPException(status_code=404, detail="Item not found")
-            return {"id": row["id"], "name": row["name"]}
+            return item
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@router.post("", status_code=201)
+@router.post("", status_code=201, response_model=ItemResponse)
 def create_item(item: ItemCreate):
     """
     Create a new item.
-    Uses raw SQL query (no ORM).
     """
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            cursor.execute("INSERT INTO items (name) VALUES (?)", (item.name,))
-            item_id = cursor.lastrowid
-            return {"id": item_id, "name": item.name}
+            return item_service.create_item(conn, item.name)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 
-@router.put("/{item_id}")
+@router.put("/{item_id}", response_model=ItemResponse)
 def update_item(item_id: int, item: ItemUpdate):
     """
     Update an existing item.
-    Uses raw SQL query (no ORM).
     """
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            # Check if item exists
-            cursor.execute("SELECT id FROM items WHERE id = ?", (item_id,))
-            if cursor.fetchone() is None:
+            updated = item_service.update_item(conn, item_id, item.name)
+            if updated is None:
                 raise HTTPException(status_code=404, detail="Item not found")
-            # Update the item
-            cursor.execute("UPDATE items SET name = ? WHERE id = ?", (item.name, item_id))
-            return {"id": item_id, "name": item.name}
+            return updated
     except HTTPException:
         raise
     except Exception as e:
@@ -98,17 +95,11 @@ def update_item(item_id: int, item: ItemUpdate):
 def delete_item(item_id: int):
     """
     Delete an item.
-    Uses raw SQL query (no ORM).
     """
     try:
         with get_db() as conn:
-            cursor = conn.cursor()
-            # Check if item exists
-            cursor.execute("SELECT id FROM items WHERE id = ?", (item_id,))
-            if cursor.fetchone() is None:
+            if not item_service.delete_item(conn, item_id):
                 raise HTTPException(status_code=404, detail="Item not found")
-            # Delete the item
-            cursor.execute("DELETE FROM items WHERE id = ?", (item_id,))
             return None
     except HTTPException:
         raise
@@ -0,0 +1,25 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from app.database import get_db
+from app.schemas.thread import ThreadPage
+from app.services import cursors, thread_service
+
+router = APIRouter(prefix="/threads", tags=["threads"])
+
+
+@router.get("", response_model=ThreadPage)
+def list_threads(
+    limit: int = Query(default=50, ge=1, le=500),
+    cursor: str | None = Query(default=None, max_length=1024),
+):
+    """
+    List conversation threads, most recently active first, a page at a time.
+    Pass ``next_cursor`` back as ``cursor`` for the following page.
+    """
+    try:
+        with get_db() as conn:
+            return thread_service.list_threads(conn, limit, cursor)
+    except cursors.InvalidCursor as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
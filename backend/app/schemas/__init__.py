@@ -1,3 +1,30 @@
+from app.schemas.contact import ContactSuggestion
 from app.schemas.email import Attachment, Contact, EmailCreate, EmailResponse, EmailUpdate
+from app.schemas.item import (
+    ItemBulkRequest,
+    ItemBulkResult,
+    ItemCreate,
+    ItemPage,
+    ItemResponse,
+    ItemUpdate,
+    ItemUpsert,
+)
+from app.schemas.thread import ThreadPage, ThreadResponse
 
-__all__ = ["Attachment", "Contact", "EmailCreate", "EmailResponse", "EmailUpdate"]
+__all__ = [
+    "Attachment",
+    "Contact",
+    "ContactSuggestion",
+    "EmailCreate",
+    "EmailResponse",
+    "EmailUpdate",
+    "ItemBulkRequest",
+    "ItemBulkResult",
+    "ItemCreate",
+    "ItemPage",
+    "ItemResponse",
+    "ItemUpdate",
+    "ItemUpsert",
+    "ThreadPage",
+    "ThreadResponse",
+]
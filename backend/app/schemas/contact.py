@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class ContactSuggestion(BaseModel):
+    name: str
+    email: str
+    avatar: str | None = None
+    frequency: int
+    last_seen: str | None = None
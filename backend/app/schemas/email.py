@@ -1,4 +1,9 @@
-from pydantic import BaseModel, Field
+from datetime import datetime, timedelta, timezone
+
+from pydantic import BaseModel, Field, field_validator
+
+# How far ahead an email may be scheduled.
+MAX_SCHEDULE_AHEAD = timedelta(days=365 * 10)
 
 
 class Contact(BaseModel):
@@ -23,6 +28,8 @@ class EmailResponse(BaseModel):
     date: str
     is_read: bool
     is_archived: bool
+    scheduled_at: str | None = None
+    thread_id: str | None = None
     attachments: list[Attachment]
 
 
@@ -31,6 +38,23 @@ class EmailCreate(BaseModel):
     subject: str = Field(min_length=1)
     body: str = Field(min_length=1)
     attachments: list[Attachment] = Field(default_factory=list)
+    scheduled_at: datetime | None = None
+    # Id of the email this one replies to; it joins that email's thread.
+    in_reply_to: int | None = None
+
+    @field_validator("scheduled_at")
+    @classmethod
+    def _within_schedule_range(cls, value: datetime | None) -> datetime | None:
+        if value is None:
+            return value
+        due = value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+        try:
+            too_far = due - datetime.now(timezone.utc) > MAX_SCHEDULE_AHEAD
+        except OverflowError:
+            too_far = True
+        if too_far:
+            raise ValueError(f"scheduled_at must be at most {MAX_SCHEDULE_AHEAD.days} days ahead")
+        return value
 
 
 class EmailUpdate(BaseModel):
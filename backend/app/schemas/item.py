@@ -0,0 +1,44 @@
+from typing import Annotated
+
+from pydantic import BaseModel, Field
+
+# Operations accepted by one bulk request; each list is applied in one statement.
+BULK_MAX_ITEMS = 10_000
+
+# SQLite rowids are positive 64-bit integers; keyset pages start after id 0.
+ItemId = Annotated[int, Field(ge=1, le=2**63 - 1)]
+
+
+class ItemCreate(BaseModel):
+    name: str
+
+
+class ItemUpdate(BaseModel):
+    name: str
+
+
+class ItemResponse(BaseModel):
+    id: int
+    name: str
+
+
+class ItemPage(BaseModel):
+    items: list[ItemResponse]
+    # Pass back as ``cursor`` for the next page; null on the last page.
+    next_cursor: str | None = None
+
+
+class ItemUpsert(BaseModel):
+    # Without an id the item is created; with one it is inserted or renamed.
+    id: ItemId | None = None
+    name: str
+
+
+class ItemBulkRequest(BaseModel):
+    upsert: list[ItemUpsert] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+    delete: list[ItemId] = Field(default_factory=list, max_length=BULK_MAX_ITEMS)
+
+
+class ItemBulkResult(BaseModel):
+    upserted: list[ItemResponse]
+    deleted: int
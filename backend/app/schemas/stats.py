@@ -0,0 +1,38 @@
+from pydantic import BaseModel
+
+from app.schemas.email import Contact
+
+
+class StatsTotals(BaseModel):
+    messages: int
+    unread: int
+    attachments: int
+    attachment_bytes: int
+
+
+class UnreadBacklog(BaseModel):
+    count: int
+    oldest_day: str | None = None
+    oldest_age_days: int | None = None
+
+
+class DailyVolume(BaseModel):
+    day: str
+    messages: int
+    unread: int
+    attachments: int
+    attachment_bytes: int
+
+
+class SenderVolume(BaseModel):
+    sender: Contact
+    messages: int
+    unread: int
+
+
+class MailboxStats(BaseModel):
+    totals: StatsTotals
+    unread_backlog: UnreadBacklog
+    daily: list[DailyVolume]
+    top_senders: list[SenderVolume]
+    rebuilt_at: str | None = None
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+
+
+class ThreadResponse(BaseModel):
+    id: str
+    subject: str
+    # Date of the most recent sent email in the thread.
+    last_activity: str
+    messages: int
+    unread: int
+
+
+class ThreadPage(BaseModel):
+    items: list[ThreadResponse]
+    # Pass back as ``cursor`` for the next page; null on the last page.
+    next_cursor: str | None = None
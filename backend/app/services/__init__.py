@@ -1,3 +1,4 @@
+from app.services import archive_service, maintenance_service
 from app.services.email_service import (
     build_preview,
     create_email,
@@ -8,6 +9,8 @@ from app.services.email_service import (
 )
 
 __all__ = [
+    "archive_service",
+    "maintenance_service",
     "build_preview",
     "create_email",
     "delete_email",
@@ -0,0 +1,71 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+from app.coherence import mailbox_version
+from app.jobs import job_queue
+from app.repositories import email_repository
+
+# Archived emails older than this many days (by email date) move to the cold tier.
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+# Read inbox emails older than this many days are archived automatically; 0 disables it.
+ARCHIVE_INBOX_AFTER_DAYS = int(os.getenv("ARCHIVE_INBOX_AFTER_DAYS", "0"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+
+
+def _cutoff(days: int, now: datetime) -> str:
+    return (now - timedelta(days=days)).replace(tzinfo=None, microsecond=0).isoformat()
+
+
+def run_retention_batch(
+    conn,
+    now: datetime | None = None,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+) -> dict:
+    """Apply the retention policy to at most ``batch_size`` emails of each kind.
+
+    Must be called outside of a transaction so the cold tier can be attached.
+    """
+    now = now or datetime.now(timezone.utc)
+    email_repository.cold_tier_available(conn, create=True)
+
+    auto_archived = 0
+    if ARCHIVE_INBOX_AFTER_DAYS > 0:
+        archived_ids = [
+            row[0]
+            for row in conn.execute(
+                """
+                UPDATE emails SET is_archived = 1
+                WHERE id IN (
+                    SELECT id FROM emails
+                    WHERE is_archived = 0 AND is_read = 1 AND date < ?
+                    LIMIT ?
+                )
+                RETURNING id
+                """,
+                (_cutoff(ARCHIVE_INBOX_AFTER_DAYS, now), batch_size),
+            ).fetchall()
+        ]
+        auto_archived = len(archived_ids)
+        if auto_archived:
+            email_repository.refresh_inbox_index(conn, archived_ids)
+            mailbox_version.bump(conn, archived_ids)
+
+    email_ids = [
+        row[0]
+        for row in conn.execute(
+            "SELECT id FROM main.emails WHERE is_archived = 1 AND date < ? ORDER BY date LIMIT ?",
+            (_cutoff(ARCHIVE_AFTER_DAYS, now), batch_size),
+        ).fetchall()
+    ]
+    moved = email_repository.move_to_cold(conn, email_ids)
+    return {"auto_archived": auto_archived, "moved": moved}
+
+
+@job_queue.register("archive.retention", every=ARCHIVE_INTERVAL_SECONDS)
+def retention_job(conn, payload: dict) -> float | None:
+    result = run_retention_batch(conn)
+    if result["moved"] >= ARCHIVE_BATCH_SIZE or result["auto_archived"] >= ARCHIVE_BATCH_SIZE:
+        # More to do: continue right away in a fresh transaction.
+        return 0.0
+    return None
@@ -0,0 +1,342 @@
+"""Online snapshots of the database and its cold archive.
+
+Snapshots are taken with SQLite's online backup API from a dedicated
+connection that first opens a read transaction on both databases. Under WAL
+that pins one consistent point in time for the main database and the archive
+together, while writers keep committing. Pages are copied
+``BACKUP_PAGES_PER_STEP`` at a time with a ``BACKUP_STEP_PAUSE`` between
+steps, so the copy never hogs the disk. Progress is readable while a backup
+runs.
+
+Each snapshot is a directory under ``BACKUP_DIR`` holding one self-contained
+database file per schema and a ``manifest.json`` with page counts, SHA-256
+digests and the result of ``PRAGMA integrity_check``. The directory appears
+only once complete, and only the ``BACKUP_KEEP`` newest are kept.
+``verify_backup`` repeats both checks, and ``restore_backup`` verifies a
+snapshot and its schema version before copying it back over the live
+databases through the same API.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+
+from app import database
+from app.coherence import mailbox_version
+from app.repositories import email_repository
+
+PAGES_PER_STEP = int(os.getenv("BACKUP_PAGES_PER_STEP", "256"))
+STEP_PAUSE_SECONDS = float(os.getenv("BACKUP_STEP_PAUSE", "0.005"))
+# Complete backups kept after each new one; 0 keeps all of them.
+KEEP = int(os.getenv("BACKUP_KEEP", "7"))
+BUSY_TIMEOUT_MS = 30000
+MANIFEST = "manifest.json"
+FILES = {"main": "main.db", "cold": "archive.db"}
+_NAME = re.compile(r"^\w[\w.-]*$")
+
+
+class BackupError(Exception):
+    """A backup cannot be created, verified or restored."""
+
+
+class BackupNotFound(BackupError):
+    pass
+
+
+class BackupInProgress(BackupError):
+    """Another backup or restore is running, or the backup already exists."""
+
+
+def backup_dir() -> str:
+    return os.getenv(
+        "BACKUP_DIR", os.path.join(os.path.dirname(database.DATABASE_PATH) or ".", "backups")
+    )
+
+
+class Progress:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._state: dict = {"running": False}
+
+    def start(self, operation: str, name: str) -> None:
+        with self._lock:
+            if self._state["running"]:
+                raise BackupInProgress(f"A {self._state['operation']} is already running")
+            self._state = {
+                "running": True,
+                "operation": operation,
+                "name": name,
+                "schema": None,
+                "copied_pages": 0,
+                "total_pages": 0,
+                "started_at": time.time(),
+            }
+
+    def update(self, schema: str, remaining: int, total: int) -> None:
+        with self._lock:
+            self._state.update(schema=schema, copied_pages=total - remaining, total_pages=total)
+
+    def finish(self, error: str | None = None) -> None:
+        with self._lock:
+            self._state["running"] = False
+            self._state["finished_at"] = time.time()
+            self._state["error"] = error
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = dict(self._state)
+        if state.get("total_pages"):
+            state["percent"] = round(100 * state["copied_pages"] / state["total_pages"], 1)
+        return state
+
+
+progress = Progress()
+
+
+def _copy(
+    source: sqlite3.Connection,
+    target: sqlite3.Connection,
+    schema: str,
+    source_schema: str | None = None,
+) -> None:
+    def step(status: int, remaining: int, total: int) -> None:
+        progress.update(schema, remaining, total)
+        if remaining and STEP_PAUSE_SECONDS:
+            time.sleep(STEP_PAUSE_SECONDS)
+
+    source.backup(target, pages=PAGES_PER_STEP, progress=step, name=source_schema or schema)
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _integrity(path: str) -> str:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute("PRAGMA integrity_check").fetchall()
+    finally:
+        conn.close()
+    return "; ".join(row[0] for row in rows)
+
+
+def _describe(path: str) -> dict:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "file": os.path.basename(path),
+        "pages": pages,
+        "bytes": os.path.getsize(path),
+        "page_size": page_size,
+        "sha256": _sha256(path),
+        "integrity": _integrity(path),
+    }
+
+
+def _snapshot_path(name: str) -> str:
+    if not _NAME.match(name):
+        raise BackupError(f"Invalid backup name {name!r}")
+    return os.path.join(backup_dir(), name)
+
+
+def create_backup(name: str | None = None) -> dict:
+    """Snapshot the live databases into a new backup; returns its manifest."""
+    created = datetime.now(timezone.utc)
+    name = name or created.strftime("%Y%m%dT%H%M%S.%fZ")
+    path = _snapshot_path(name)
+    if os.path.exists(path):
+        raise BackupInProgress(f"Backup {name!r} already exists")
+    progress.start("backup", name)
+    staging = f"{path}.partial"
+    try:
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        started = time.monotonic()
+        source = _open_live(database.DATABASE_PATH)
+        try:
+            schemas = ["main"]
+            if database.attach_archive(source):
+                schemas.append("cold")
+            # One read transaction across both schemas pins a single snapshot.
+            source.execute("BEGIN")
+            for schema in schemas:
+                source.execute(f"SELECT COUNT(*) FROM {schema}.sqlite_master").fetchone()
+            schema_version = source.execute("PRAGMA user_version").fetchone()[0]
+            for schema in schemas:
+                target = sqlite3.connect(os.path.join(staging, FILES[schema]))
+                try:
+                    _copy(source, target, schema)
+                    # A standalone file: no WAL to carry around.
+                    target.execute("PRAGMA journal_mode = DELETE")
+                finally:
+                    target.close()
+            source.execute("COMMIT")
+        finally:
+            source.close()
+        elapsed = time.monotonic() - started
+
+        files = {schema: _describe(os.path.join(staging, FILES[schema])) for schema in schemas}
+        failed = [schema for schema, info in files.items() if info["integrity"] != "ok"]
+        if failed:
+            raise BackupError(f"Snapshot failed integrity_check: {', '.join(failed)}")
+        total_bytes = sum(info["bytes"] for info in files.values())
+        manifest = {
+            "name": name,
+            "created_at": created.replace(microsecond=0).isoformat(),
+            "schema_version": schema_version,
+            "duration_seconds": round(elapsed, 6),
+            "bytes": total_bytes,
+            "throughput_mb_per_second": round(total_bytes / 1e6 / elapsed, 3) if elapsed else None,
+            "files": files,
+        }
+        with open(os.path.join(staging, MANIFEST), "w") as handle:
+            json.dump(manifest, handle, indent=2)
+        os.replace(staging, path)
+    except Exception as exc:
+        shutil.rmtree(staging, ignore_errors=True)
+        progress.finish(str(exc))
+        raise
+    progress.finish()
+    prune_backups()
+    return manifest
+
+
+def prune_backups(keep: int | None = None) -> list[str]:
+    """Delete all but the ``keep`` newest backups; returns the deleted names."""
+    keep = KEEP if keep is None else keep
+    if keep <= 0:
+        return []
+    pruned = [manifest["name"] for manifest in list_backups()[keep:]]
+    for name in pruned:
+        shutil.rmtree(_snapshot_path(name), ignore_errors=True)
+    return pruned
+
+
+def list_backups() -> list[dict]:
+    """Manifests of the complete backups, newest first."""
+    directory = backup_dir()
+    if not os.path.isdir(directory):
+        return []
+    manifests = []
+    for name in os.listdir(directory):
+        manifest_path = os.path.join(directory, name, MANIFEST)
+        if os.path.isfile(manifest_path):
+            with open(manifest_path) as handle:
+                manifests.append(json.load(handle))
+    return sorted(manifests, key=lambda manifest: manifest["created_at"], reverse=True)
+
+
+def load_manifest(name: str) -> dict:
+    manifest_path = os.path.join(_snapshot_path(name), MANIFEST)
+    if not os.path.isfile(manifest_path):
+        raise BackupNotFound(f"Backup {name!r} not found")
+    with open(manifest_path) as handle:
+        return json.load(handle)
+
+
+def verify_backup(name: str) -> dict:
+    """Re-check the digests and integrity of every file of a backup."""
+    manifest = load_manifest(name)
+    path = _snapshot_path(name)
+    files = {}
+    for schema, expected in manifest["files"].items():
+        file_path = os.path.join(path, expected["file"])
+        if not os.path.isfile(file_path):
+            files[schema] = {"ok": False, "error": "missing"}
+            continue
+        digest = _sha256(file_path)
+        integrity = _integrity(file_path) if digest == expected["sha256"] else "not checked"
+        files[schema] = {
+            "ok": digest == expected["sha256"] and integrity == "ok",
+            "sha256_matches": digest == expected["sha256"],
+            "integrity": integrity,
+        }
+    return {"name": name, "ok": all(info["ok"] for info in files.values()), "files": files}
+
+
+def _open_live(path: str) -> sqlite3.Connection:
+    conn = database.connect(path, isolation_level=None, check_same_thread=False)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    return conn
+
+
+def _empty_archive(conn: sqlite3.Connection) -> None:
+    conn.execute("BEGIN IMMEDIATE")
+    for table in email_repository.ARCHIVE_TABLES:
+        conn.execute(f"DELETE FROM cold.{table}")
+    conn.execute("COMMIT")
+
+
+def restore_backup(name: str) -> dict:
+    """Replace the live databases with a verified backup.
+
+    Writers wait while pages are copied back. The mailbox version is moved past
+    both the live and the restored value, so every worker drops its caches.
+    A backup taken at another schema version is refused: the running code
+    expects the live one.
+    """
+    manifest = load_manifest(name)
+    verification = verify_backup(name)
+    if not verification["ok"]:
+        raise BackupError(f"Backup {name!r} failed verification")
+    progress.start("restore", name)
+    try:
+        started = time.monotonic()
+        target = _open_live(database.DATABASE_PATH)
+        try:
+            live_schema = target.execute("PRAGMA user_version").fetchone()[0]
+            if manifest.get("schema_version") != live_schema:
+                raise BackupError(
+                    f"Backup {name!r} has schema version {manifest.get('schema_version')}, "
+                    f"the live database {live_schema}"
+                )
+            live_version = target.execute(
+                "SELECT version FROM mailbox_state WHERE id = 1"
+            ).fetchone()[0]
+            for schema, info in manifest["files"].items():
+                snapshot = os.path.join(_snapshot_path(name), info["file"])
+                source = sqlite3.connect(f"file:{snapshot}?mode=ro", uri=True)
+                # The backup API always writes into "main" of its target.
+                schema_target = target if schema == "main" else _open_live(database.ARCHIVE_DATABASE_PATH)
+                try:
+                    _copy(source, schema_target, schema, source_schema="main")
+                finally:
+                    source.close()
+                    if schema_target is not target:
+                        schema_target.close()
+            if "cold" not in manifest["files"] and email_repository.cold_tier_available(target):
+                # There was no cold tier at snapshot time; whatever has been
+                # archived since is in the restored main database again.
+                _empty_archive(target)
+            target.execute(
+                "UPDATE mailbox_state SET version = MAX(version, ?) + 1 WHERE id = 1",
+                (live_version,),
+            )
+        finally:
+            target.close()
+    except Exception as exc:
+        progress.finish(str(exc))
+        raise
+    progress.finish()
+    mailbox_version.invalidate()
+    return {
+        "name": name,
+        "schemas": sorted(manifest["files"]),
+        "duration_seconds": round(time.monotonic() - started, 6),
+    }
@@ -0,0 +1,11 @@
+from app.coherence import mailbox_version
+from app.repositories import contact_repository
+
+
+def search_contacts(conn, prefix: str, limit: int) -> list[dict]:
+    mailbox_version.check(conn)
+    return contact_repository.search_contacts(conn, prefix, limit)
+
+
+def load_contact_index(conn) -> bool:
+    return contact_repository.load_contact_index(conn)
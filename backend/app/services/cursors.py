@@ -0,0 +1,26 @@
+"""Opaque pagination cursors shared by the keyset listings.
+
+A cursor is the URL-safe base64 of a JSON array holding the sort key of the
+last row of a page. Each listing checks the decoded value against its own
+ordering.
+"""
+
+import base64
+import binascii
+import json
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(key: tuple) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def load_cursor(cursor: str):
+    """The JSON value in an opaque cursor made by ``encode_cursor``."""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor("Malformed cursor") from None
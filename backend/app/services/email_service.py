@@ -1,7 +1,17 @@
+import json
+import os
+import time
+from collections.abc import Callable, Iterator
 from datetime import datetime, timezone
 
+from app.coherence import mailbox_version
+from app.profiling import phase
 from app.repositories import email_repository
+from app.repositories.email_repository import EmailRecord
 from app.schemas.email import Attachment, EmailCreate, EmailUpdate
+from app.services.send_scheduler import send_scheduler
+from app.services.single_flight import list_flights
+from app.services.write_coalescer import write_coalescer
 
 CURRENT_USER = {
     "name": "Richard Brown",
@@ -9,6 +19,16 @@ CURRENT_USER = {
     "avatar": "/avatars/richard.jpg",
 }
 
+# Unpaged listings are streamed as a JSON array, STREAM_BATCH_SIZE emails at a time.
+STREAM_LISTS = os.getenv("EMAIL_LIST_STREAMING", "0") not in ("0", "false", "False", "")
+STREAM_BATCH_SIZE = int(os.getenv("EMAIL_LIST_STREAM_BATCH_SIZE", "500"))
+# A stream holds its read snapshot, and so blocks WAL checkpoints from
+# resetting the log, until the last batch is read; past this it is cut off.
+STREAM_MAX_SECONDS = float(os.getenv("EMAIL_LIST_STREAM_MAX_SECONDS", "60"))
+
+# Quotes and escapes a string exactly like Pydantic's JSON serializer.
+_json_string = json.JSONEncoder(ensure_ascii=False).encode
+
 
 def build_preview(text: str, limit: int = 64) -> str:
     normalized = " ".join(text.split())
@@ -18,19 +38,138 @@ def build_preview(text: str, limit: int = 64) -> str:
 
 
 def list_emails(conn, filter_value: str, search_value: str | None) -> list[dict]:
-    return email_repository.list_emails(conn, filter_value, search_value)
+    mailbox_version.check(conn)
+    emails = email_repository.list_emails(conn, filter_value, search_value)
+    return [email_repository.serialize_email(email) for email in emails]
+
+
+def _contact_json(contact, with_avatar: bool) -> str:
+    avatar = _json_string(contact.avatar) if with_avatar and contact.avatar is not None else "null"
+    return (
+        f'{{"name":{_json_string(contact.name)},"email":{_json_string(contact.email)},'
+        f'"avatar":{avatar}}}'
+    )
+
+
+def _email_encoder() -> Callable[[EmailRecord], str]:
+    """JSON for one ``EmailResponse``; each contact is encoded once per encoder."""
+    senders: dict[int, str] = {}
+    recipients: dict[int, str] = {}
+
+    def encode(email: EmailRecord) -> str:
+        sender = senders.get(email.sender.id)
+        if sender is None:
+            sender = senders[email.sender.id] = _contact_json(email.sender, True)
+        recipient = recipients.get(email.recipient.id)
+        if recipient is None:
+            recipient = recipients[email.recipient.id] = _contact_json(email.recipient, False)
+        attachments = ",".join(
+            f'{{"filename":{_json_string(attachment.filename)},'
+            f'"size":{_json_string(attachment.size)},"url":{_json_string(attachment.url)}}}'
+            for attachment in email.attachments
+        )
+        scheduled_at = "null" if email.scheduled_at is None else _json_string(email.scheduled_at)
+        thread_id = "null" if email.thread_id is None else f'"{email.thread_id}"'
+        return (
+            f'{{"id":"{email.id}","sender":{sender},"recipient":{recipient},'
+            f'"subject":{_json_string(email.subject)},"preview":{_json_string(email.preview)},'
+            f'"body":{_json_string(email.body)},"date":{_json_string(email.date)},'
+            f'"is_read":{"true" if email.is_read else "false"},'
+            f'"is_archived":{"true" if email.is_archived else "false"},'
+            f'"scheduled_at":{scheduled_at},"thread_id":{thread_id},'
+            f'"attachments":[{attachments}]}}'
+        )
+
+    return encode
+
+
+def encode_email_list(emails: list[EmailRecord]) -> bytes:
+    """JSON for ``list[EmailResponse]``, byte-identical to Pydantic's ``dump_json``.
+
+    Records come straight from the repository and already have the response
+    shape, so they are written out directly instead of being validated into
+    models first. Each contact is encoded once per list.
+    """
+    return f"[{','.join(map(_email_encoder(), emails))}]".encode()
+
+
+def stream_email_list(
+    conn,
+    filter_value: str,
+    search_value: str | None,
+    batch_size: int | None = None,
+) -> Iterator[bytes]:
+    """``list_emails_json`` as chunks, one per batch of rows; joined, the bytes are the same.
+
+    Only one batch of records is held at a time, so memory does not grow with
+    the mailbox and the first chunk is ready after the first batch. A batch
+    read more than ``STREAM_MAX_SECONDS`` after the first raises TimeoutError,
+    which aborts the response instead of pinning the snapshot any longer.
+    """
+    mailbox_version.check(conn)
+    encode = _email_encoder()
+    separator = "["
+    deadline = time.monotonic() + STREAM_MAX_SECONDS
+    for emails in email_repository.iter_email_batches(
+        conn, filter_value, search_value, batch_size or STREAM_BATCH_SIZE
+    ):
+        if separator != "[" and time.monotonic() > deadline:
+            raise TimeoutError(f"Streamed listing took longer than {STREAM_MAX_SECONDS:g}s")
+        with phase("encode"):
+            chunk = separator + ",".join(map(encode, emails))
+        separator = ","
+        yield chunk.encode()
+    yield b"[]" if separator == "[" else b"]"
+
+
+def list_emails_json(
+    conn,
+    filter_value: str,
+    search_value: str | None,
+    limit: int | None = None,
+    offset: int = 0,
+) -> bytes:
+    """Serialized ``list_emails`` result, shared by identical concurrent requests."""
+    version = mailbox_version.check(conn)
+    key = (filter_value, search_value.strip() if search_value else None, limit, offset, version)
+
+    def run() -> bytes:
+        if limit is not None and not search_value:
+            emails = email_repository.list_email_page(conn, filter_value, offset, limit)
+        else:
+            emails = email_repository.list_emails(conn, filter_value, search_value)
+            if limit is not None:
+                emails = emails[offset:offset + limit]
+        with phase("encode"):
+            return encode_email_list(emails)
+
+    return list_flights.do(key, run)
+
+
+def load_inbox_index(conn) -> bool:
+    return email_repository.load_inbox_index(conn)
 
 
 def get_email(conn, email_id: int) -> dict | None:
+    mailbox_version.check(conn)
     return email_repository.fetch_email_by_id(conn, email_id)
 
 
 def create_email(conn, payload: EmailCreate) -> dict:
-    date_iso = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+    now = datetime.now(timezone.utc).replace(microsecond=0)
+    date_iso = now.isoformat()
+    scheduled_at = None
+    if payload.scheduled_at is not None:
+        due = payload.scheduled_at
+        if due.tzinfo is None:
+            due = due.replace(tzinfo=timezone.utc)
+        due = due.astimezone(timezone.utc).replace(microsecond=0)
+        if due > now:
+            date_iso = scheduled_at = due.isoformat()
     preview = build_preview(payload.body)
     attachments = [attachment.model_dump() for attachment in payload.attachments]
 
-    return email_repository.create_email(
+    created = email_repository.create_email(
         conn,
         sender_name=CURRENT_USER["name"],
         sender_email=CURRENT_USER["email"],
@@ -42,10 +181,16 @@ def create_email(conn, payload: EmailCreate) -> dict:
         body=payload.body.strip(),
         date=date_iso,
         attachments=attachments,
+        scheduled_at=scheduled_at,
+        in_reply_to=payload.in_reply_to,
     )
+    if scheduled_at is not None:
+        send_scheduler.schedule(conn, int(created["id"]), scheduled_at)
+    return created
 
 
 def update_email(conn, email_id: int, payload: EmailUpdate) -> dict | None:
+    """Apply a partial update; with write coalescing on, ``conn`` is left untouched."""
     updates: dict[str, object] = {}
 
     if payload.is_read is not None:
@@ -67,13 +212,23 @@ def update_email(conn, email_id: int, payload: EmailUpdate) -> dict | None:
         [attachment.model_dump() for attachment in attachments] if attachments is not None else None
     )
 
-    return email_repository.update_email(
-        conn,
-        email_id,
-        updates=updates,
-        attachments=attachment_payload,
-    )
+    def write(conn):
+        return email_repository.update_email(
+            conn,
+            email_id,
+            updates=updates,
+            attachments=attachment_payload,
+        )
+
+    if write_coalescer.enabled:
+        return write_coalescer.submit(write)
+    return write(conn)
 
 
 def delete_email(conn, email_id: int) -> bool:
+    """Delete an email; with write coalescing on, ``conn`` is left untouched."""
+    if write_coalescer.enabled:
+        return write_coalescer.submit(
+            lambda batch_conn: email_repository.delete_email(batch_conn, email_id)
+        )
     return email_repository.delete_email(conn, email_id)
@@ -0,0 +1,56 @@
+from app.repositories import item_repository
+from app.schemas.item import ItemBulkRequest
+from app.services.cursors import InvalidCursor, encode_cursor, load_cursor
+
+
+def decode_cursor(cursor: str, prefixed: bool) -> tuple:
+    """The keyset in an opaque cursor; it must match the ordering of the request."""
+    key = load_cursor(cursor)
+    if prefixed:
+        valid = (
+            isinstance(key, list) and len(key) == 2
+            and isinstance(key[0], str) and type(key[1]) is int
+        )
+    else:
+        valid = isinstance(key, list) and len(key) == 1 and type(key[0]) is int
+    if not valid:
+        raise InvalidCursor("Cursor does not match this listing")
+    return tuple(key)
+
+
+def list_items(conn, limit: int, cursor: str | None = None, prefix: str | None = None) -> dict:
+    """One keyset page of items; ``next_cursor`` is None on the last page."""
+    after = decode_cursor(cursor, bool(prefix)) if cursor else None
+    # One extra row tells whether another page follows.
+    items = item_repository.list_items(conn, limit + 1, after, prefix)
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor((last["name"], last["id"]) if prefix else (last["id"],))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+def get_item(conn, item_id: int) -> dict | None:
+    return item_repository.fetch_item(conn, item_id)
+
+
+def create_item(conn, name: str) -> dict:
+    return item_repository.create_item(conn, name)
+
+
+def update_item(conn, item_id: int, name: str) -> dict | None:
+    return item_repository.update_item(conn, item_id, name)
+
+
+def delete_item(conn, item_id: int) -> bool:
+    return item_repository.delete_item(conn, item_id)
+
+
+def apply_bulk(conn, payload: ItemBulkRequest) -> dict:
+    """Upserts, then deletes, in the caller's transaction."""
+    upserted = item_repository.upsert_items(
+        conn, [item.model_dump() for item in payload.upsert]
+    )
+    deleted = item_repository.delete_items(conn, payload.delete)
+    return {"upserted": upserted, "deleted": deleted}
@@ -0,0 +1,189 @@
+"""Periodic database maintenance.
+
+A periodic job refreshes planner statistics (a bounded ``ANALYZE`` the first
+time, ``PRAGMA optimize`` afterwards), returns free pages to the file system
+with ``PRAGMA incremental_vacuum`` (migration 010 enables incremental
+auto-vacuum) and checkpoints the WAL, truncating it once it has grown past
+``MAINTENANCE_TRUNCATE_WAL_PAGES``. It only runs while this process is quiet:
+with more than ``MAINTENANCE_MAX_IN_FLIGHT`` requests in flight, or more than
+``MAINTENANCE_MAX_REQUEST_RATE`` requests per second since the last attempt,
+the job is retried ``MAINTENANCE_BUSY_RETRY`` seconds later. Each run stops
+starting new work once its ``MAINTENANCE_BUDGET_SECONDS`` are spent and
+reports what it did and what it skipped.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from sqlite3 import Connection
+
+from app.jobs import job_queue
+from app.middleware import admission_controller
+from app.repositories import email_repository
+
+logger = logging.getLogger(__name__)
+
+INTERVAL_SECONDS = float(os.getenv("MAINTENANCE_INTERVAL", "3600"))
+BUSY_RETRY_SECONDS = float(os.getenv("MAINTENANCE_BUSY_RETRY", "60"))
+BUDGET_SECONDS = float(os.getenv("MAINTENANCE_BUDGET_SECONDS", "2"))
+MAX_IN_FLIGHT = int(os.getenv("MAINTENANCE_MAX_IN_FLIGHT", "0"))
+MAX_REQUEST_RATE = float(os.getenv("MAINTENANCE_MAX_REQUEST_RATE", "2"))
+TRUNCATE_WAL_PAGES = int(os.getenv("MAINTENANCE_TRUNCATE_WAL_PAGES", "1000"))
+# Rows sampled per index by ANALYZE, which keeps it fast on large tables.
+ANALYSIS_LIMIT = 1000
+VACUUM_STEP_PAGES = 256
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+class Maintenance:
+    def __init__(self, budget: float = BUDGET_SECONDS) -> None:
+        self.budget = budget
+        self.runs = 0
+        self.deferred = 0
+        self.last_report: dict | None = None
+        self._last_check: tuple[float, int] | None = None
+        self._lock = threading.Lock()
+
+    def low_load(self) -> bool:
+        """Whether this process is quiet enough to run maintenance now."""
+        now = time.monotonic()
+        admitted = admission_controller.admitted
+        with self._lock:
+            previous, self._last_check = self._last_check, (now, admitted)
+        if admission_controller.in_flight > MAX_IN_FLIGHT:
+            return False
+        if previous is None or now <= previous[0]:
+            return True
+        return (admitted - previous[1]) / (now - previous[0]) <= MAX_REQUEST_RATE
+
+    def defer(self) -> None:
+        with self._lock:
+            self.deferred += 1
+
+    def run(self, conn: Connection, budget: float | None = None) -> dict:
+        """Run one maintenance pass; must be called outside of a transaction."""
+        if conn.in_transaction:
+            raise RuntimeError("Database maintenance cannot run inside a transaction")
+        budget = self.budget if budget is None else budget
+        started = time.monotonic()
+        deadline = started + budget
+        report: dict = {
+            "started_at": datetime.now(timezone.utc).replace(microsecond=0).isoformat(),
+            "budget_seconds": budget,
+            "statistics": None,
+            "vacuum": {},
+            "checkpoint": None,
+            # Steps not started because the budget was spent.
+            "skipped": [],
+        }
+
+        report["statistics"] = _refresh_statistics(conn)
+
+        schemas = ["main"]
+        if email_repository.cold_tier_available(conn):
+            schemas.append("cold")
+        for schema in schemas:
+            if time.monotonic() >= deadline:
+                report["skipped"].append(f"vacuum:{schema}")
+                continue
+            report["vacuum"][schema] = _incremental_vacuum(conn, schema, deadline)
+
+        # Without WAL (e.g. memory mode) there is nothing to checkpoint.
+        if conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+            if time.monotonic() >= deadline:
+                report["skipped"].append("checkpoint")
+            else:
+                report["checkpoint"] = _checkpoint(conn, deadline)
+
+        report["duration_seconds"] = round(time.monotonic() - started, 6)
+        report["completed"] = not report["skipped"] and all(
+            vacuum["remaining_pages"] == 0 or not vacuum["enabled"]
+            for vacuum in report["vacuum"].values()
+        )
+        with self._lock:
+            self.runs += 1
+            self.last_report = report
+        logger.info("Database maintenance: %s", report)
+        return report
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "deferred": self.deferred,
+                "budget_seconds": self.budget,
+                "last_run": self.last_report,
+            }
+
+
+def _refresh_statistics(conn: Connection) -> dict:
+    started = time.monotonic()
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+    has_statistics = conn.execute(
+        "SELECT 1 FROM main.sqlite_master WHERE name = 'sqlite_stat1'"
+    ).fetchone()
+    if has_statistics is None:
+        # PRAGMA optimize only re-analyzes tables that already have statistics.
+        conn.execute("ANALYZE main")
+        action = "analyze"
+    else:
+        conn.execute("PRAGMA optimize")
+        action = "optimize"
+    return {"action": action, "seconds": round(time.monotonic() - started, 6)}
+
+
+def _incremental_vacuum(conn: Connection, schema: str, deadline: float) -> dict:
+    started = time.monotonic()
+    enabled = conn.execute(f"PRAGMA {schema}.auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL
+    free_pages = conn.execute(f"PRAGMA {schema}.freelist_count").fetchone()[0]
+    freed = 0
+    while enabled and free_pages and time.monotonic() < deadline:
+        conn.execute(f"PRAGMA {schema}.incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+        remaining = conn.execute(f"PRAGMA {schema}.freelist_count").fetchone()[0]
+        if remaining >= free_pages:
+            break
+        freed += free_pages - remaining
+        free_pages = remaining
+    return {
+        "enabled": enabled,
+        "freed_pages": freed,
+        "remaining_pages": free_pages,
+        "seconds": round(time.monotonic() - started, 6),
+    }
+
+
+def _checkpoint(conn: Connection, deadline: float) -> dict:
+    started = time.monotonic()
+    busy, wal_pages, checkpointed = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+    mode = "passive"
+    # Truncating resets a grown WAL file; it is only worth it (and only cheap)
+    # once every frame is already in the database.
+    if not busy and wal_pages >= TRUNCATE_WAL_PAGES and checkpointed == wal_pages:
+        if time.monotonic() < deadline:
+            busy, wal_pages, checkpointed = conn.execute(
+                "PRAGMA wal_checkpoint(TRUNCATE)"
+            ).fetchone()
+            mode = "truncate"
+    return {
+        "mode": mode,
+        "busy": bool(busy),
+        "wal_pages": wal_pages,
+        "checkpointed_pages": checkpointed,
+        "seconds": round(time.monotonic() - started, 6),
+    }
+
+
+maintenance = Maintenance()
+
+
+@job_queue.register("database.maintenance", every=INTERVAL_SECONDS)
+def maintenance_job(conn, payload: dict) -> float | None:
+    if not maintenance.low_load():
+        maintenance.defer()
+        return BUSY_RETRY_SECONDS
+    maintenance.run(conn)
+    return None
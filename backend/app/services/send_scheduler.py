@@ -0,0 +1,139 @@
+"""In-process scheduler that sends scheduled emails when they become due.
+
+Pending emails are loaded once at start-up through the partial
+``idx_emails_scheduled_at`` index and kept in a binary heap keyed by due time,
+so scheduling and popping are O(log n) and the scheduler thread sleeps until
+the earliest due time instead of polling the table. Because the heap is
+rebuilt from the database on start, scheduled emails survive restarts.
+Delivery is a conditional UPDATE, so emails deleted (or already delivered by
+another worker) in the meantime are skipped.
+"""
+
+from __future__ import annotations
+
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+from app import database
+from app.repositories import email_repository
+
+logger = logging.getLogger(__name__)
+
+DELIVERY_BATCH_SIZE = 500
+RETRY_DELAY_SECONDS = 5.0
+
+
+def _timestamp(value: str) -> float:
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+class SendScheduler:
+    def __init__(self) -> None:
+        self.delivered = 0
+        self.wakeups = 0
+        self._heap: list[tuple[float, int]] = []
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        with database.get_db() as conn:
+            pending = email_repository.fetch_scheduled(conn)
+        with self._condition:
+            # Rows arrive ordered by due time, which is already a valid heap.
+            self._heap = [(_timestamp(scheduled_at), email_id) for email_id, scheduled_at in pending]
+            heapq.heapify(self._heap)
+            self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="send-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def schedule(self, conn, email_id: int, scheduled_at: str) -> None:
+        """Track a newly scheduled email once the transaction that created it commits."""
+        due = _timestamp(scheduled_at)
+        database.on_commit(conn, lambda: self._push(due, email_id))
+
+    def _push(self, due: float, email_id: int) -> None:
+        with self._condition:
+            heapq.heappush(self._heap, (due, email_id))
+            if self._heap[0] == (due, email_id):
+                self._condition.notify()
+
+    def _run(self) -> None:
+        while True:
+            try:
+                if not self._run_once():
+                    return
+            except Exception:
+                # The heap is rebuilt from the database on every start, so a
+                # dead thread would stay dead; log and keep scheduling.
+                logger.exception("Send scheduler iteration failed; continuing")
+                with self._condition:
+                    if self._stopping:
+                        return
+                    self._condition.wait(RETRY_DELAY_SECONDS)
+
+    def _run_once(self) -> bool:
+        """Wait for the next due batch and deliver it; False once stopping."""
+        with self._condition:
+            while not self._stopping:
+                if not self._heap:
+                    self._condition.wait()
+                    continue
+                delay = self._heap[0][0] - time.time()
+                if delay <= 0:
+                    break
+                # Longer timeouts overflow the platform's time_t.
+                self._condition.wait(min(delay, threading.TIMEOUT_MAX))
+            if self._stopping:
+                return False
+            now = time.time()
+            due_ids: list[int] = []
+            while self._heap and self._heap[0][0] <= now and len(due_ids) < DELIVERY_BATCH_SIZE:
+                due_ids.append(heapq.heappop(self._heap)[1])
+
+        self.wakeups += 1
+        try:
+            self.deliver(due_ids)
+        except Exception:
+            logger.exception("Failed to deliver %d scheduled email(s); retrying", len(due_ids))
+            retry_at = time.time() + RETRY_DELAY_SECONDS
+            for email_id in due_ids:
+                self._push(retry_at, email_id)
+        return True
+
+    def deliver(self, email_ids: list[int]) -> int:
+        now = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+        with database.get_db() as conn:
+            delivered = email_repository.deliver_scheduled(conn, email_ids, now)
+        self.delivered += delivered
+        return delivered
+
+    def snapshot(self) -> dict:
+        with self._condition:
+            pending = len(self._heap)
+            next_due = self._heap[0][0] if self._heap else None
+        return {
+            "pending": pending,
+            "next_due_in_seconds": round(max(0.0, next_due - time.time()), 3) if next_due else None,
+            "delivered": self.delivered,
+            "wakeups": self.wakeups,
+        }
+
+
+send_scheduler = SendScheduler()
@@ -0,0 +1,38 @@
+from app.repositories import contact_repository, email_repository, stats_repository
+
+
+def get_stats(conn, days: int, senders: int) -> dict:
+    stats = stats_repository.fetch_stats(conn, days, senders)
+    contacts = contact_repository.resolve_contacts(
+        conn, [sender["sender_id"] for sender in stats["top_senders"]]
+    )
+    stats["top_senders"] = [
+        {
+            "sender": contact_repository.serialize_contact(contacts[sender["sender_id"]]),
+            "messages": sender["messages"],
+            "unread": sender["unread"],
+        }
+        for sender in stats["top_senders"]
+        if sender["sender_id"] in contacts
+    ]
+    return stats
+
+
+def rebuild_stats(conn, force: bool = True) -> int | None:
+    """Recompute the rollups from scratch; returns the number of emails counted.
+
+    Without ``force`` nothing happens once the rollups have been built. Must be
+    called outside of a transaction so the archive tier can be attached.
+    """
+    include_cold = email_repository.cold_tier_available(conn)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if not force and stats_repository.is_built(conn):
+            conn.execute("COMMIT")
+            return None
+        counted = stats_repository.rebuild(conn, include_cold)
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    return counted
@@ -0,0 +1,26 @@
+from app.repositories import thread_repository
+from app.services.cursors import InvalidCursor, encode_cursor, load_cursor
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """The ``(last_activity, id)`` keyset in an opaque cursor."""
+    key = load_cursor(cursor)
+    if not (
+        isinstance(key, list) and len(key) == 2
+        and isinstance(key[0], str) and type(key[1]) is int
+    ):
+        raise InvalidCursor("Cursor does not match this listing")
+    return tuple(key)
+
+
+def list_threads(conn, limit: int, cursor: str | None = None) -> dict:
+    """One keyset page of threads, most recently active first."""
+    after = decode_cursor(cursor) if cursor else None
+    # One extra row tells whether another page follows.
+    threads = thread_repository.list_threads(conn, limit + 1, after)
+    next_cursor = None
+    if len(threads) > limit:
+        threads = threads[:limit]
+        last = threads[-1]
+        next_cursor = encode_cursor((last["last_activity"], int(last["id"])))
+    return {"items": threads, "next_cursor": next_cursor}
@@ -0,0 +1,156 @@
+"""Group commit for small concurrent email writes.
+
+With coalescing enabled, each write is queued instead of committing its own
+transaction. The first writer to find no open batch becomes its leader: it
+waits up to ``WRITE_COALESCING_WINDOW_MS`` for others to join (or until
+``WRITE_COALESCING_MAX_BATCH`` writes are queued), then runs the whole batch
+in one ``BEGIN IMMEDIATE`` transaction and a single COMMIT, so a burst of
+clicks costs one fsync instead of one per click.
+
+Every write runs inside its own SAVEPOINT. A write that raises is rolled
+back to its savepoint, together with the commit callbacks it registered, and
+its caller gets the exception while the rest of the batch still commits.
+Results are handed out only after the COMMIT; if the COMMIT itself fails,
+every write of the batch fails with that error. The window is the most
+latency coalescing adds to a write.
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from concurrent.futures import Future
+from sqlite3 import Connection
+from typing import Callable, TypeVar
+
+from app import database
+from app.repositories import email_repository
+
+T = TypeVar("T")
+
+ENABLED = os.getenv("WRITE_COALESCING_ENABLED", "0") not in ("0", "false", "False", "")
+WINDOW_SECONDS = float(os.getenv("WRITE_COALESCING_WINDOW_MS", "2")) / 1000
+MAX_BATCH = int(os.getenv("WRITE_COALESCING_MAX_BATCH", "64"))
+
+
+class _Write:
+    __slots__ = ("fn", "future", "taken")
+
+    def __init__(self, fn: Callable[[Connection], object]) -> None:
+        self.fn = fn
+        self.future: Future = Future()
+        self.taken = False
+
+
+class WriteCoalescer:
+    def __init__(
+        self,
+        enabled: bool = ENABLED,
+        window: float = WINDOW_SECONDS,
+        max_batch: int = MAX_BATCH,
+    ) -> None:
+        self.enabled = enabled
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.writes = 0
+        self.failed_writes = 0
+        self.largest_batch = 0
+        self._pending: list[_Write] = []
+        self._collecting = False
+        self._condition = threading.Condition()
+
+    def submit(self, fn: Callable[[Connection], T]) -> T:
+        """Run ``fn(conn)`` in a shared transaction and return its result once committed."""
+        if not self.enabled:
+            with database.get_db() as conn:
+                return fn(conn)
+
+        write = _Write(fn)
+        with self._condition:
+            self._pending.append(write)
+            if len(self._pending) >= self.max_batch:
+                self._condition.notify_all()
+
+        # Batches are taken oldest first, so a leader may commit writes queued
+        # before its own; it keeps leading until its own write is taken.
+        while True:
+            with self._condition:
+                # Writes left over from a full batch promote one of their own to leader.
+                while not write.taken and self._collecting:
+                    self._condition.wait()
+                if write.taken:
+                    break
+                self._collecting = True
+                self._condition.wait_for(
+                    lambda: len(self._pending) >= self.max_batch, timeout=self.window
+                )
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                for queued in batch:
+                    queued.taken = True
+                self._collecting = False
+                self._condition.notify_all()
+            self._commit(batch)
+        return write.future.result()
+
+    def _commit(self, batch: list[_Write]) -> None:
+        results: list[tuple[_Write, object]] = []
+        failed = 0
+        try:
+            with database.get_db() as conn:
+                # ATTACH is not allowed inside the transaction a write may need the
+                # archive in. Once BEGIN holds the write lock no archive can appear,
+                # so one created in between is attached on a second try.
+                while True:
+                    tiered = email_repository.cold_tier_available(conn)
+                    conn.execute("BEGIN IMMEDIATE")
+                    if tiered or not database.archive_exists():
+                        break
+                    conn.execute("ROLLBACK")
+                for write in batch:
+                    callbacks = len(conn.commit_callbacks)
+                    conn.execute("SAVEPOINT coalesced_write")
+                    try:
+                        result = write.fn(conn)
+                    except Exception as exc:
+                        conn.execute("ROLLBACK TO coalesced_write")
+                        conn.execute("RELEASE coalesced_write")
+                        del conn.commit_callbacks[callbacks:]
+                        failed += 1
+                        write.future.set_exception(exc)
+                    else:
+                        conn.execute("RELEASE coalesced_write")
+                        results.append((write, result))
+        except Exception as exc:
+            # The COMMIT (or BEGIN) failed: nothing in the batch was written.
+            for write in batch:
+                if not write.future.done():
+                    write.future.set_exception(exc)
+        else:
+            for write, result in results:
+                write.future.set_result(result)
+        finally:
+            with self._condition:
+                self.batches += 1
+                self.writes += len(batch)
+                self.failed_writes += failed
+                self.largest_batch = max(self.largest_batch, len(batch))
+
+    def snapshot(self) -> dict:
+        with self._condition:
+            pending = len(self._pending)
+        return {
+            "enabled": self.enabled,
+            "window_ms": round(self.window * 1000, 3),
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "writes": self.writes,
+            "failed_writes": self.failed_writes,
+            "largest_batch": self.largest_batch,
+            "avg_batch": round(self.writes / self.batches, 2) if self.batches else 0.0,
+            "pending": pending,
+        }
+
+
+write_coalescer = WriteCoalescer()
@@ -0,0 +1,115 @@
+"""Startup warmup and readiness.
+
+The lifespan starts a background warmup once the in-memory indexes are loaded.
+It fills the connection pool and prepares the hot ``email_repository``
+statements on every pooled connection. Then it reads the hot indexes end to
+end, so their pages are cached, and imports ``WARMUP_MODULES``. ``/health``
+answers as soon as the process is up. ``/ready`` answers 503 until warmup has
+finished, so a load balancer only routes traffic to warm instances.
+"""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import os
+import threading
+import time
+
+from app import database
+from app.repositories import email_repository
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.getenv("WARMUP_ENABLED", "1") not in ("0", "false", "False")
+# Heavy modules that are otherwise only imported on first use. A module that is
+# not installed is skipped.
+MODULES = tuple(
+    name.strip()
+    for name in os.getenv("WARMUP_MODULES", "brotli,cProfile,pstats").split(",")
+    if name.strip()
+)
+
+
+class Warmup:
+    def __init__(self, enabled: bool = ENABLED) -> None:
+        self.enabled = enabled
+        self.report: dict | None = None
+        self._ready = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def start(self) -> None:
+        """Begin warming up in the background; ``ready`` flips when done."""
+        self.stop()
+        self._ready.clear()
+        self.report = None
+        if not self.enabled:
+            self._ready.set()
+            return
+        self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 30.0) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wait(self, timeout: float | None = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def run(self) -> dict:
+        started = time.monotonic()
+        report: dict = {"steps": {}, "error": None}
+        try:
+            step = time.monotonic()
+            prepared: list[int] = []
+            connections = database.warm_pool(
+                lambda conn: prepared.append(email_repository.prepare_statements(conn))
+            )
+            report["steps"]["connections"] = {
+                "opened": connections,
+                "statements_prepared": sum(prepared),
+                "seconds": round(time.monotonic() - step, 6),
+            }
+
+            step = time.monotonic()
+            with database.get_db() as conn:
+                entries = email_repository.touch_hot_indexes(conn)
+            report["steps"]["indexes"] = {
+                "entries": entries,
+                "seconds": round(time.monotonic() - step, 6),
+            }
+
+            step = time.monotonic()
+            imported, missing = [], []
+            for name in MODULES:
+                try:
+                    importlib.import_module(name)
+                    imported.append(name)
+                except ImportError:
+                    missing.append(name)
+            report["steps"]["modules"] = {
+                "imported": imported,
+                "missing": missing,
+                "seconds": round(time.monotonic() - step, 6),
+            }
+        except Exception as exc:
+            # The instance stays unready: it cannot serve from this database.
+            logger.exception("Warmup failed")
+            report["error"] = str(exc)
+        report["duration_seconds"] = round(time.monotonic() - started, 6)
+        self.report = report
+        if report["error"] is None:
+            logger.info("Warmup finished in %.3fs", report["duration_seconds"])
+            self._ready.set()
+        return report
+
+    def snapshot(self) -> dict:
+        return {"enabled": self.enabled, "ready": self.ready, "report": self.report}
+
+
+warmup = Warmup()
@@ -0,0 +1,152 @@
+"""
+Benchmark: denormalized vs normalized sender/recipient storage
+
+Builds a synthetic mailbox with the schema as of migration 007 (contact names,
+addresses and avatars repeated on every email), copies it, upgrades the copy
+through migration 008 (emails reference contacts by id), and compares file
+size and the time of the inbox search query on both.
+
+Usage:
+    python benchmarks/contacts_normalization.py --emails 100000 --contacts 500
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrate  # noqa: E402
+from app.repositories.email_repository import STATEMENTS  # noqa: E402
+
+WORDS = (
+    "meeting proposal invoice schedule update review budget launch quarterly report "
+    "feedback design roadmap contract renewal onboarding deadline summary agenda"
+).split()
+
+DENORMALIZED_SEARCH = """
+    SELECT id, sender_name, sender_email, sender_avatar, recipient_name, recipient_email,
+           subject, preview, body, date, is_read, is_archived, scheduled_at
+    FROM emails
+    WHERE is_archived = 0 AND scheduled_at IS NULL AND (
+        sender_name LIKE ? OR sender_email LIKE ? OR recipient_name LIKE ?
+        OR recipient_email LIKE ? OR subject LIKE ? OR preview LIKE ? OR body LIKE ?
+    )
+    ORDER BY is_read ASC, date DESC, id ASC
+"""
+
+
+def build_denormalized(path, email_count, contact_count):
+    migrations_dir = tempfile.mkdtemp()
+    for filepath in migrate.get_migration_files():
+        if migrate.migration_version(filepath) <= 7:
+            shutil.copy(filepath, migrations_dir)
+    migrate.DATABASE_PATH = path
+    migrate.run_migrations("upgrade", migrations_dir)
+    shutil.rmtree(migrations_dir)
+
+    rng = random.Random(42)
+    contacts = [
+        (
+            f"Contact Person {i}",
+            f"contact.person{i}@example-company-{i % 37}.com",
+            f"/avatars/contact-{i}.jpg",
+        )
+        for i in range(contact_count)
+    ]
+    rows = []
+    for i in range(email_count):
+        sender = rng.choice(contacts)
+        recipient = rng.choice(contacts)
+        body = f"Hello {recipient[0]},\n\n" + " ".join(rng.choice(WORDS) for _ in range(40))
+        rows.append(
+            (
+                sender[0], sender[1], sender[2], recipient[0], recipient[1],
+                f"Subject {i} {rng.choice(WORDS)}", body[:64], body,
+                f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:00:00", i % 2, 0,
+            )
+        )
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        """
+        INSERT INTO emails (sender_name, sender_email, sender_avatar, recipient_name, recipient_email,
+                            subject, preview, body, date, is_read, is_archived)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    conn.commit()
+    conn.close()
+
+
+def normalize(path):
+    migrate.DATABASE_PATH = path
+    migrate.BACKFILL_BATCH_SIZE = 5000
+    migrate.BACKFILL_PAUSE_SECONDS = 0
+    migrate.run_migrations("upgrade")
+
+
+def size_of(path):
+    conn = sqlite3.connect(path)
+    conn.execute("VACUUM")
+    pages = conn.execute("PRAGMA page_count").fetchone()[0]
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    conn.close()
+    return pages * page_size
+
+
+def time_query(path, sql, params, repeat):
+    conn = sqlite3.connect(path)
+    conn.execute(sql, params).fetchall()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        timings.append(time.perf_counter() - started)
+    conn.close()
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--emails", type=int, default=100_000)
+    parser.add_argument("--contacts", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    before = os.path.join(workdir, "denormalized.db")
+    after = os.path.join(workdir, "normalized.db")
+    try:
+        build_denormalized(before, args.emails, args.contacts)
+        shutil.copy(before, after)
+        started = time.perf_counter()
+        normalize(after)
+        migration_seconds = time.perf_counter() - started
+
+        size_before, size_after = size_of(before), size_of(after)
+        print(f"{args.emails} emails, {args.contacts} contacts (migration took {migration_seconds:.1f}s)")
+        print(
+            f"database size: {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB "
+            f"({100 * (1 - size_after / size_before):.1f}% smaller)"
+        )
+
+        for term in ("person12", "quarterly", "no-such-term"):
+            like = f"%{term}%"
+            seconds_before = time_query(before, DENORMALIZED_SEARCH, (like,) * 7, args.repeat)
+            seconds_after = time_query(after, STATEMENTS["list_all_search"], (like,) * 7, args.repeat)
+            print(f"search {term!r}: {seconds_before * 1e3:.1f} ms -> {seconds_after * 1e3:.1f} ms")
+    finally:
+        shutil.rmtree(workdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Benchmark: dict-per-email listing vs compact email records
+
+Builds a synthetic mailbox and serves the full inbox (``GET /emails`` without
+paging) two ways:
+
+- dicts: ``sqlite3.Row`` rows, a nested dict per email, sender, recipient and
+  attachment, then Pydantic validation and ``dump_json`` (the previous path);
+- records: tuple rows, one ``EmailRecord`` per email sharing cached contact
+  objects, written out by ``encode_email_list`` (the current path).
+
+For each it reports the median time, the tracemalloc peak and the number of
+memory blocks held by the intermediate list of emails. Both produce the same
+bytes.
+
+Usage:
+    python benchmarks/email_records.py --emails 100000 --contacts 500
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORKDIR = tempfile.mkdtemp()
+os.environ["DATABASE_PATH"] = os.path.join(WORKDIR, "records.db")
+os.environ["DATABASE_MODE"] = "file"
+
+import migrate  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app import database  # noqa: E402
+from app.repositories import contact_repository, email_repository  # noqa: E402
+from app.schemas.email import EmailResponse  # noqa: E402
+from app.services import email_service  # noqa: E402
+
+WORDS = (
+    "meeting proposal invoice schedule update review budget launch quarterly report "
+    "feedback design roadmap contract renewal onboarding deadline summary agenda"
+).split()
+
+adapter = TypeAdapter(list[EmailResponse])
+
+
+def build(email_count, contact_count):
+    migrate.run_migrations("upgrade")
+    rng = random.Random(42)
+    conn = sqlite3.connect(database.DATABASE_PATH)
+    conn.execute("DELETE FROM attachments")
+    conn.execute("DELETE FROM emails")
+    conn.executemany(
+        "INSERT OR IGNORE INTO contacts (name, email, avatar, frequency, last_seen) VALUES (?, ?, ?, 1, '')",
+        [
+            (f"Contact Person {i}", f"contact.person{i}@example-company-{i % 37}.com", f"/avatars/{i}.jpg")
+            for i in range(contact_count)
+        ],
+    )
+    contact_ids = [row[0] for row in conn.execute("SELECT id FROM contacts")]
+    rows = []
+    for i in range(email_count):
+        body = "Hello,\n\n" + " ".join(rng.choice(WORDS) for _ in range(40))
+        rows.append(
+            (
+                rng.choice(contact_ids), rng.choice(contact_ids), f"Subject {i} {rng.choice(WORDS)}",
+                body[:64], body, f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T{i % 24:02d}:00:00", i % 2,
+            )
+        )
+    conn.executemany(
+        """
+        INSERT INTO emails (sender_id, recipient_id, subject, preview, body, date, is_read, is_archived)
+        VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+        """,
+        rows,
+    )
+    conn.execute(
+        """
+        INSERT INTO attachments (email_id, filename, size, url)
+        SELECT id, 'report-' || id || '.pdf', '1.2 MB', '/files/' || id || '.pdf'
+        FROM emails WHERE id % 10 = 0
+        """
+    )
+    conn.commit()
+    conn.close()
+
+
+def dict_emails(conn):
+    """The listing as it was built before email records."""
+    rows = conn.execute(email_repository.STATEMENTS["list_all"]).fetchall()
+    ids = [row["id"] for row in rows]
+    attachments = {email_id: [] for email_id in ids}
+    for row in conn.execute(email_repository.STATEMENTS["fetch_attachments"], (json_ids(ids),)):
+        attachments[row["email_id"]].append(
+            {"filename": row["filename"], "size": row["size"], "url": row["url"]}
+        )
+    contacts = contact_repository.resolve_contacts(
+        conn, [row[column] for row in rows for column in ("sender_id", "recipient_id")]
+    )
+    emails = []
+    for row in rows:
+        sender, recipient = contacts[row["sender_id"]], contacts[row["recipient_id"]]
+        emails.append(
+            {
+                "id": str(row["id"]),
+                "sender": {"name": sender.name, "email": sender.email, "avatar": sender.avatar},
+                "recipient": {"name": recipient.name, "email": recipient.email, "avatar": None},
+                "subject": row["subject"],
+                "preview": row["preview"],
+                "body": row["body"],
+                "date": row["date"],
+                "is_read": bool(row["is_read"]),
+                "is_archived": bool(row["is_archived"]),
+                "scheduled_at": row["scheduled_at"],
+                "thread_id": None if row["thread_id"] is None else str(row["thread_id"]),
+                "attachments": attachments[row["id"]],
+            }
+        )
+    return emails
+
+
+def json_ids(ids):
+    return "[" + ",".join(map(str, ids)) + "]"
+
+
+def encode_dicts(emails):
+    return adapter.dump_json(adapter.validate_python(emails))
+
+
+def record_emails(conn):
+    return email_repository.list_emails(conn, "all", None)
+
+
+PATHS = {
+    "dicts": (dict_emails, encode_dicts),
+    "records": (record_emails, email_service.encode_email_list),
+}
+
+
+def measure(conn, build_list, encode, repeat):
+    encode(build_list(conn))  # warm the contact cache and statement cache
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = encode(build_list(conn))
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    emails = build_list(conn)
+    retained = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    encode(emails)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del emails
+    return statistics.median(timings), peak, retained, body
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--emails", type=int, default=100_000)
+    parser.add_argument("--contacts", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        build(args.emails, args.contacts)
+        print(f"{args.emails} emails, {args.contacts} contacts")
+        bodies = []
+        with database.get_db() as conn:
+            for name, (build_list, encode) in PATHS.items():
+                seconds, peak, retained, body = measure(conn, build_list, encode, args.repeat)
+                bodies.append(body)
+                print(
+                    f"{name:>8}: {seconds * 1e3:7.0f} ms, peak {peak / 1e6:6.1f} MB, "
+                    f"{retained:>9,} blocks held by the list, {len(body) / 1e6:.1f} MB of JSON"
+                )
+        print("identical output:", bodies[0] == bodies[1])
+    finally:
+        shutil.rmtree(WORKDIR)
+
+
+if __name__ == "__main__":
+    main()
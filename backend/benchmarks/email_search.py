@@ -0,0 +1,72 @@
+"""
+Benchmark: single-scan vs parallel substring search
+
+Builds a synthetic mailbox (with the mailbox generator of ``email_records.py``)
+and runs ``list_emails`` with a search term once per worker count. One worker
+is the single ``LIKE`` scan. More workers split the id range across that many
+threads, each on its own pooled connection.
+
+For each worker count it reports the median time, the speedup over one worker
+and the number of matches. Every worker count must return the same emails in
+the same order. The speedup is bounded by the number of cores: SQLite runs the
+scans concurrently, but the merge and the record building stay on one thread.
+
+Usage:
+    python benchmarks/email_search.py --emails 200000 --workers 1 2 4 8 --term "contract renewal"
+"""
+
+import argparse
+import os
+import shutil
+import statistics
+import time
+
+# Importing email_records points DATABASE_PATH at a temporary directory.
+from email_records import WORKDIR, build, database, email_repository
+
+
+def run(term, workers, repeat):
+    email_repository.SEARCH_WORKERS = workers
+    email_repository.PARALLEL_SEARCH_MIN_EMAILS = 1
+    # The pool is sized on first use; start one for this worker count.
+    email_repository._search_executor = None
+    with database.get_db() as conn:
+        ids = [email.id for email in email_repository.list_emails(conn, "all", term)]
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            email_repository.list_emails(conn, "all", term)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings), ids
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--emails", type=int, default=200_000)
+    parser.add_argument("--contacts", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--term", default="contract renewal")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        build(args.emails, args.contacts)
+        print(f"{args.emails} emails, searching {args.term!r} on {os.cpu_count()} CPU(s)")
+        baseline = expected = None
+        for workers in args.workers:
+            median, ids = run(args.term, workers, args.repeat)
+            if expected is None:
+                baseline, expected = median, ids
+            assert ids == expected, f"{workers} workers returned different results"
+            print(
+                f"{workers:>3} worker(s): {median * 1e3:8.1f} ms, "
+                f"x{baseline / median:4.2f}, {len(ids)} matches"
+            )
+    finally:
+        shutil.rmtree(WORKDIR)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Benchmark: buffered vs streamed ``GET /emails``
+
+Builds synthetic mailboxes of growing size (with the mailbox generator of
+``email_records.py``) and serves the full inbox two ways:
+
+- buffered: ``list_emails`` then ``encode_email_list``, one body at the end;
+- streamed: ``stream_email_list``, one chunk per ``--batch`` rows.
+
+For each it reports the time to the first byte, the total time and the
+tracemalloc peak. The concatenated chunks are checked against the buffered body.
+
+Usage:
+    python benchmarks/email_streaming.py --sizes 10000 50000 100000 --batch 500
+"""
+
+import argparse
+import shutil
+import time
+import tracemalloc
+
+# Importing email_records points DATABASE_PATH at a temporary directory.
+from email_records import WORKDIR, build, database, email_repository, email_service
+
+
+def buffered(conn, batch):
+    yield email_service.encode_email_list(email_repository.list_emails(conn, "all", None))
+
+
+def streamed(conn, batch):
+    return email_service.stream_email_list(conn, "all", None, batch)
+
+
+def measure(conn, produce, batch):
+    tracemalloc.start()
+    started = time.perf_counter()
+    first_byte = None
+    length = 0
+    # Like a response, each chunk is dropped once it has been "sent".
+    for chunk in produce(conn, batch):
+        if first_byte is None:
+            first_byte = time.perf_counter() - started
+        length += len(chunk)
+    total = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_byte, total, peak, length
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000, 100_000])
+    parser.add_argument("--contacts", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    try:
+        for size in args.sizes:
+            build(size, args.contacts)
+            print(f"{size} emails")
+            with database.get_db() as conn:
+                # Warm the contact cache and the statement cache.
+                b"".join(streamed(conn, args.batch))
+                expected = b"".join(buffered(conn, args.batch))
+                assert b"".join(streamed(conn, args.batch)) == expected
+                for name, produce in (("buffered", buffered), ("streamed", streamed)):
+                    first_byte, total, peak, length = measure(conn, produce, args.batch)
+                    print(
+                        f"{name:>9}: first byte {first_byte * 1e3:7.1f} ms, total {total * 1e3:7.0f} ms, "
+                        f"peak {peak / 1e6:6.1f} MB, {length / 1e6:.1f} MB of JSON"
+                    )
+    finally:
+        shutil.rmtree(WORKDIR)
+
+
+if __name__ == "__main__":
+    main()
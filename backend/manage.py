@@ -0,0 +1,106 @@
+"""
+Maintenance Commands
+
+Operational tasks that run against the configured database outside of the API.
+"""
+
+import argparse
+
+from app.database import get_db
+
+
+def archive():
+    """Apply the archival retention policy until nothing is left to move."""
+    from app.services import archive_service
+
+    total_moved = 0
+    total_archived = 0
+    while True:
+        with get_db() as conn:
+            result = archive_service.run_retention_batch(conn)
+        total_moved += result["moved"]
+        total_archived += result["auto_archived"]
+        if not result["moved"] and not result["auto_archived"]:
+            break
+    print(f"Archived {total_archived} email(s); moved {total_moved} email(s) to the cold tier.")
+
+
+def rebuild_stats():
+    """Recompute the mailbox statistics rollups from all stored emails."""
+    from app.services import stats_service
+
+    with get_db() as conn:
+        counted = stats_service.rebuild_stats(conn)
+    print(f"Rebuilt mailbox statistics from {counted} email(s).")
+
+
+def maintenance():
+    """Run one database maintenance pass (statistics, incremental vacuum, checkpoint)."""
+    import json
+
+    from app.services.maintenance_service import maintenance as database_maintenance
+
+    with get_db() as conn:
+        report = database_maintenance.run(conn)
+    print(json.dumps(report, indent=2))
+
+
+def backup(name=None):
+    """Take an online snapshot of the database and its archive."""
+    import json
+
+    from app.services import backup_service
+
+    manifest = backup_service.create_backup(name)
+    print(json.dumps(manifest, indent=2))
+
+
+def verify_backup(name):
+    """Check a backup's digests and run integrity_check on its files."""
+    import json
+
+    from app.services import backup_service
+
+    report = backup_service.verify_backup(name)
+    print(json.dumps(report, indent=2))
+    if not report["ok"]:
+        raise SystemExit(1)
+
+
+def restore(name):
+    """Replace the live databases with a verified backup."""
+    from app.services import backup_service
+
+    try:
+        result = backup_service.restore_backup(name)
+    except backup_service.BackupError as exc:
+        raise SystemExit(f"Restore failed: {exc}")
+    print(f"Restored backup {result['name']} ({', '.join(result['schemas'])}).")
+
+
+COMMANDS = {
+    "archive": archive,
+    "backup": backup,
+    "maintenance": maintenance,
+    "rebuild-stats": rebuild_stats,
+    "restore": restore,
+    "verify-backup": verify_backup,
+}
+# Commands that take the name of a backup, and whether it is required.
+NAMED = {"backup": False, "restore": True, "verify-backup": True}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintenance commands")
+    parser.add_argument("command", choices=sorted(COMMANDS), help="Command to run")
+    parser.add_argument("name", nargs="?", help="Backup name (backup, restore, verify-backup)")
+
+    args = parser.parse_args()
+    if args.name and args.command not in NAMED:
+        parser.error(f"{args.command} takes no name")
+    if NAMED.get(args.command) and not args.name:
+        parser.error(f"{args.command} needs the name of a backup")
+    if args.name:
+        COMMANDS[args.command](args.name)
+    else:
+        COMMANDS[args.command]()
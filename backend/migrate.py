@@ -2,6 +2,32 @@
 Database Migration Runner
 
 This script runs all pending migrations in order or reverts them.
+
+Every migration module exposes ``upgrade(conn)`` and ``downgrade(conn)``. The
+runner owns the connection and wraps each call in a single ``BEGIN IMMEDIATE``
+transaction, so a migration is either fully applied or not applied at all.
+
+A module may also define ``backfill(conn, position, batch_size)`` for data
+migrations that are too large for one transaction. It is called repeatedly,
+one short transaction per batch, with the position returned by the previous
+call (``None`` the first time) and must return ``None`` once it is done.
+Progress is persisted in ``_backfills`` so an interrupted backfill resumes
+where it stopped, and the write lock is released between batches so the API
+keeps serving writes. An optional ``finalize(conn)`` runs once the backfill
+completes (e.g. to drop columns that were migrated away from).
+
+Statements that SQLite refuses to run inside a transaction, such as VACUUM,
+need ``TRANSACTIONAL = False`` in the module: ``upgrade``/``downgrade`` then
+run in autocommit mode and must be safe to repeat, since only the bookkeeping
+that follows is transactional.
+
+``PRAGMA user_version`` holds the highest fully applied migration version, so
+a start-up with nothing pending costs a single query.
+
+With a template configured (``DATABASE_MODE=template``, or ``memory`` with
+``DATABASE_TEMPLATE_PATH``), the migrations run once against the template and
+every new, empty database is a page copy of it made with SQLite's online
+backup API, which is much faster than replaying migrations and backfills.
 """
 
 import os
@@ -9,74 +35,323 @@ import glob
 import importlib.util
 import argparse
 import sqlite3
+import time
 
+from app import database
 from app.database import DATABASE_PATH
 
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+BACKFILL_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "500"))
+BACKFILL_PAUSE_SECONDS = float(os.getenv("MIGRATION_BATCH_PAUSE", "0.005"))
+BUSY_TIMEOUT_MS = 30000
 
-def get_migration_files():
+
+def get_migration_files(migrations_dir=None):
     """Get all migration files sorted by version number."""
-    migrations_dir = os.path.join(os.path.dirname(__file__), "migrations")
-    pattern = os.path.join(migrations_dir, "[0-9][0-9][0-9]_*.py")
+    pattern = os.path.join(migrations_dir or MIGRATIONS_DIR, "[0-9][0-9][0-9]_*.py")
     files = glob.glob(pattern)
     return sorted(files)
 
 
+def migration_name(filepath):
+    """Return the migration name (file name without extension)."""
+    return os.path.basename(filepath).replace(".py", "")
+
+
+def migration_version(filepath):
+    """Return the numeric version prefix of a migration file."""
+    return int(os.path.basename(filepath)[:3])
+
+
 def load_migration_module(filepath):
     """Dynamically load a migration module."""
-    module_name = os.path.basename(filepath).replace(".py", "")
+    module_name = migration_name(filepath)
     spec = importlib.util.spec_from_file_location(module_name, filepath)
     module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(module)
     return module
 
 
-def run_migrations(action="upgrade"):
-    """Run all migrations."""
-    migration_files = get_migration_files()
-    
-    if action == "downgrade":
-        migration_files = reversed(migration_files)
-    
-    for filepath in migration_files:
-        module = load_migration_module(filepath)
-        if action == "upgrade":
-            module.upgrade()
-        elif action == "downgrade":
-            module.downgrade()
+def connect(path=None):
+    """Open the runner connection with explicit transaction control."""
+    if path is None:
+        conn = database.connect(DATABASE_PATH, isolation_level=None)
+    else:
+        conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    # WAL lets readers keep going while a migration or backfill holds the write lock.
+    # In memory mode SQLite keeps the journal in memory and reports "memory".
+    conn.execute("PRAGMA journal_mode = WAL")
+    return conn
 
 
-def list_migrations():
-    """List all migrations and their status."""
-    conn = sqlite3.connect(DATABASE_PATH)
-    cursor = conn.cursor()
-    
-    # Ensure migrations table exists
-    cursor.execute("""
+def get_schema_version(conn):
+    """Return the highest fully applied migration version."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def _set_schema_version(conn, version):
+    conn.execute(f"PRAGMA user_version = {int(version)}")
+
+
+def _ensure_bookkeeping_tables(conn):
+    conn.execute(
+        """
         CREATE TABLE IF NOT EXISTS _migrations (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL UNIQUE,
             applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         )
-    """)
-    
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS _backfills (
+            name TEXT PRIMARY KEY,
+            position INTEGER,
+            completed_at TIMESTAMP
+        )
+        """
+    )
+
+
+def _applied_migrations(conn):
+    rows = conn.execute("SELECT name FROM _migrations").fetchall()
+    return {row[0] for row in rows}
+
+
+def _backfill_state(conn, name):
+    row = conn.execute(
+        "SELECT position, completed_at FROM _backfills WHERE name = ?", (name,)
+    ).fetchone()
+    if row is None:
+        return None, False
+    return row[0], row[1] is not None
+
+
+def _transaction(conn, callback):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = callback()
+        conn.execute("COMMIT")
+        return result
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def run_backfill(conn, name, module, batch_size=None, pause=None):
+    """Run a resumable backfill, committing and yielding the lock after every batch."""
+    batch_size = batch_size or BACKFILL_BATCH_SIZE
+    pause = BACKFILL_PAUSE_SECONDS if pause is None else pause
+
+    position, completed = _backfill_state(conn, name)
+    if completed:
+        return 0
+
+    batches = 0
+    while True:
+        def step():
+            new_position = module.backfill(conn, position, batch_size)
+            if new_position is None:
+                conn.execute(
+                    """
+                    INSERT INTO _backfills (name, position, completed_at)
+                    VALUES (?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(name) DO UPDATE SET completed_at = CURRENT_TIMESTAMP
+                    """,
+                    (name, position),
+                )
+            else:
+                conn.execute(
+                    """
+                    INSERT INTO _backfills (name, position) VALUES (?, ?)
+                    ON CONFLICT(name) DO UPDATE SET position = excluded.position
+                    """,
+                    (name, new_position),
+                )
+            return new_position
+
+        position = _transaction(conn, step)
+        batches += 1
+        if position is None:
+            return batches
+        if pause:
+            time.sleep(pause)
+
+
+def _upgrade(conn, migration_files):
+    applied = _applied_migrations(conn)
+    version = 0
+
+    for filepath in migration_files:
+        name = migration_name(filepath)
+        module = None
+
+        if name not in applied:
+            module = load_migration_module(filepath)
+            transactional = getattr(module, "TRANSACTIONAL", True)
+            if not transactional:
+                module.upgrade(conn)
+
+            def apply():
+                if transactional:
+                    module.upgrade(conn)
+                conn.execute("INSERT INTO _migrations (name) VALUES (?)", (name,))
+                if not hasattr(module, "backfill"):
+                    _set_schema_version(conn, migration_version(filepath))
+
+            _transaction(conn, apply)
+            print(f"Migration {name} applied successfully.")
+        elif get_schema_version(conn) >= migration_version(filepath):
+            version = migration_version(filepath)
+            continue
+
+        module = module or load_migration_module(filepath)
+        if hasattr(module, "backfill"):
+            batches = run_backfill(conn, name, module)
+            if batches:
+                print(f"Backfill for {name} completed in {batches} batch(es).")
+
+            def complete():
+                if hasattr(module, "finalize"):
+                    module.finalize(conn)
+                _set_schema_version(conn, migration_version(filepath))
+
+            _transaction(conn, complete)
+        elif name in applied:
+            _transaction(conn, lambda: _set_schema_version(conn, migration_version(filepath)))
+        version = migration_version(filepath)
+
+    return version
+
+
+def _is_empty(conn):
+    row = conn.execute("SELECT 1 FROM sqlite_master LIMIT 1").fetchone()
+    return row is None and get_schema_version(conn) == 0
+
+
+def build_template(migration_files, template_path=None):
+    """Bring the template database up to date; return its path.
+
+    The template is built next to its final path and renamed into place, so
+    concurrent processes never clone a half-migrated template.
+    """
+    template_path = template_path or database.DATABASE_TEMPLATE_PATH
+    latest = migration_version(migration_files[-1]) if migration_files else 0
+    if os.path.exists(template_path):
+        conn = sqlite3.connect(template_path)
+        try:
+            if get_schema_version(conn) >= latest:
+                return template_path
+        finally:
+            conn.close()
+
+    template_dir = os.path.dirname(template_path)
+    if template_dir:
+        os.makedirs(template_dir, exist_ok=True)
+    staging_path = f"{template_path}.{os.getpid()}.tmp"
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+    conn = connect(staging_path)
+    try:
+        _ensure_bookkeeping_tables(conn)
+        _upgrade(conn, migration_files)
+        # A single self-contained file: fold the WAL back in before renaming.
+        conn.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        conn.close()
+    os.replace(staging_path, template_path)
+    return template_path
+
+
+def clone_template(conn, template_path):
+    """Copy the template into the (empty) database behind ``conn``."""
+    source = sqlite3.connect(template_path)
+    try:
+        source.backup(conn)
+    finally:
+        source.close()
+    conn.execute("PRAGMA journal_mode = WAL")
+
+
+def _downgrade(conn, migration_files):
+    applied = _applied_migrations(conn)
+    versions = [0] + [migration_version(filepath) for filepath in migration_files]
+
+    for index in range(len(migration_files) - 1, -1, -1):
+        filepath = migration_files[index]
+        name = migration_name(filepath)
+        if name not in applied:
+            continue
+        module = load_migration_module(filepath)
+        transactional = getattr(module, "TRANSACTIONAL", True)
+        if not transactional:
+            module.downgrade(conn)
+
+        def revert():
+            if transactional:
+                module.downgrade(conn)
+            conn.execute("DELETE FROM _migrations WHERE name = ?", (name,))
+            conn.execute("DELETE FROM _backfills WHERE name = ?", (name,))
+            _set_schema_version(conn, versions[index])
+
+        _transaction(conn, revert)
+        print(f"Migration {name} reverted successfully.")
+
+
+def run_migrations(action="upgrade", migrations_dir=None):
+    """Run all migrations."""
+    migration_files = get_migration_files(migrations_dir)
+    conn = connect()
+    try:
+        if action == "upgrade":
+            latest = migration_version(migration_files[-1]) if migration_files else 0
+            if get_schema_version(conn) >= latest:
+                return
+            # Custom migration sets (tests, tools) never share the template.
+            if migrations_dir is None and database.DATABASE_TEMPLATE_PATH and _is_empty(conn):
+                clone_template(conn, build_template(migration_files))
+                print(f"Database cloned from template {database.DATABASE_TEMPLATE_PATH}.")
+                return
+            _ensure_bookkeeping_tables(conn)
+            _upgrade(conn, migration_files)
+        elif action == "downgrade":
+            _ensure_bookkeeping_tables(conn)
+            _downgrade(conn, migration_files)
+    finally:
+        conn.close()
+
+
+def list_migrations(migrations_dir=None):
+    """List all migrations and their status."""
+    conn = connect()
+    _ensure_bookkeeping_tables(conn)
+
     # Get applied migrations
-    cursor.execute("SELECT name, applied_at FROM _migrations ORDER BY id")
+    cursor = conn.execute("SELECT name, applied_at FROM _migrations ORDER BY id")
     applied = {row[0]: row[1] for row in cursor.fetchall()}
+    cursor = conn.execute("SELECT name, completed_at FROM _backfills")
+    backfills = {row[0]: row[1] for row in cursor.fetchall()}
+    schema_version = get_schema_version(conn)
     conn.close()
-    
+
     # Get all migration files
-    migration_files = get_migration_files()
-    
-    print("\nMigrations Status:")
+    migration_files = get_migration_files(migrations_dir)
+
+    print(f"\nMigrations Status (schema version {schema_version}):")
     print("-" * 60)
-    
+
     for filepath in migration_files:
-        name = os.path.basename(filepath).replace(".py", "")
+        name = migration_name(filepath)
         if name in applied:
-            print(f"[APPLIED] {name} (at {applied[name]})")
+            if name in backfills and backfills[name] is None:
+                print(f"[BACKFILLING] {name} (at {applied[name]})")
+            else:
+                print(f"[APPLIED] {name} (at {applied[name]})")
         else:
             print(f"[PENDING] {name}")
-    
+
     print("-" * 60)
 
 
@@ -87,9 +362,9 @@ if __name__ == "__main__":
         choices=["upgrade", "downgrade", "list"],
         help="Migration action: upgrade (apply all), downgrade (revert all), list (show status)"
     )
-    
+
     args = parser.parse_args()
-    
+
     if args.action == "list":
         list_migrations()
     else:
@@ -4,16 +4,6 @@ Version: 002
 Description: Adds email client schema and seed records used by the frontend.
 """
 
-import os
-import sqlite3
-import sys
-
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from app.database import DATABASE_PATH
-
-MIGRATION_NAME = "002_create_emails_tables"
-
 SEED_EMAILS = [
     {
         "sender_name": "Michael Lee",
@@ -169,29 +159,9 @@ SEED_EMAILS = [
 ]
 
 
-def _ensure_migrations_table(cursor):
-    cursor.execute(
-        """
-        CREATE TABLE IF NOT EXISTS _migrations (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL UNIQUE,
-            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
-    )
-
-
-def upgrade():
-    conn = sqlite3.connect(DATABASE_PATH)
+def upgrade(conn):
     cursor = conn.cursor()
 
-    _ensure_migrations_table(cursor)
-    cursor.execute("SELECT 1 FROM _migrations WHERE name = ?", (MIGRATION_NAME,))
-    if cursor.fetchone():
-        print(f"Migration {MIGRATION_NAME} already applied. Skipping.")
-        conn.close()
-        return
-
     cursor.execute(
         """
         CREATE TABLE IF NOT EXISTS emails (
@@ -268,20 +238,9 @@ def upgrade():
                     (email_id, attachment["filename"], attachment["size"], attachment["url"]),
                 )
 
-    cursor.execute("INSERT INTO _migrations (name) VALUES (?)", (MIGRATION_NAME,))
-    conn.commit()
-    conn.close()
-    print(f"Migration {MIGRATION_NAME} applied successfully.")
-
 
-def downgrade():
-    conn = sqlite3.connect(DATABASE_PATH)
+def downgrade(conn):
     cursor = conn.cursor()
 
     cursor.execute("DROP TABLE IF EXISTS attachments")
     cursor.execute("DROP TABLE IF EXISTS emails")
-    cursor.execute("DELETE FROM _migrations WHERE name = ?", (MIGRATION_NAME,))
-
-    conn.commit()
-    conn.close()
-    print(f"Migration {MIGRATION_NAME} reverted successfully.")
@@ -0,0 +1,26 @@
+"""
+Migration: Create mailbox state table
+Version: 003
+Description: Adds a single-row generation counter bumped by every mailbox write,
+used by worker processes to detect writes made by other workers.
+"""
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mailbox_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cursor.execute("INSERT OR IGNORE INTO mailbox_state (id, version) VALUES (1, 0)")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("DROP TABLE IF EXISTS mailbox_state")
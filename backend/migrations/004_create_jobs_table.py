@@ -0,0 +1,44 @@
+"""
+Migration: Create jobs table
+Version: 004
+Description: Adds the durable background job queue used for deferred write-side work.
+"""
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL DEFAULT '{}',
+            dedup_key TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            max_attempts INTEGER NOT NULL DEFAULT 5,
+            run_at REAL NOT NULL,
+            locked_until REAL,
+            created_at REAL NOT NULL,
+            started_at REAL,
+            finished_at REAL,
+            last_error TEXT
+        )
+        """
+    )
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_run_at ON jobs(status, run_at)")
+    # At most one queued or running job per deduplication key.
+    cursor.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_dedup_key
+        ON jobs(dedup_key)
+        WHERE dedup_key IS NOT NULL AND status IN ('pending', 'running')
+        """
+    )
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("DROP TABLE IF EXISTS jobs")
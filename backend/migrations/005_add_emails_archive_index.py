@@ -0,0 +1,20 @@
+"""
+Migration: Add archive index on emails
+Version: 005
+Description: Indexes emails by archive flag and date so the archival retention
+policy can find emails to move into the cold tier without a full scan.
+"""
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_emails_archived_date ON emails(is_archived, date)"
+    )
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("DROP INDEX IF EXISTS idx_emails_archived_date")
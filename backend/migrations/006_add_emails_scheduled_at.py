@@ -0,0 +1,26 @@
+"""
+Migration: Add scheduled send support
+Version: 006
+Description: Adds emails.scheduled_at, set while a message waits to be sent, and a
+partial index over pending scheduled messages ordered by due time.
+"""
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("ALTER TABLE emails ADD COLUMN scheduled_at TEXT")
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_emails_scheduled_at
+        ON emails(scheduled_at)
+        WHERE scheduled_at IS NOT NULL
+        """
+    )
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("DROP INDEX IF EXISTS idx_emails_scheduled_at")
+    cursor.execute("ALTER TABLE emails DROP COLUMN scheduled_at")
@@ -0,0 +1,73 @@
+"""
+Migration: Create contacts table
+Version: 007
+Description: Adds a deduplicated contacts table (one row per name and address)
+ranked by how often and how recently each contact appears in mail, and
+backfills it in batches from the senders and recipients of existing emails.
+"""
+
+UPSERT_CONTACT = """
+    INSERT INTO contacts (name, email, avatar, frequency, last_seen)
+    VALUES (?, ?, ?, 1, ?)
+    ON CONFLICT (email, name) DO UPDATE SET
+        avatar = COALESCE(excluded.avatar, contacts.avatar),
+        frequency = contacts.frequency + 1,
+        last_seen = MAX(COALESCE(contacts.last_seen, ''), excluded.last_seen)
+"""
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS contacts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT NOT NULL,
+            avatar TEXT,
+            frequency INTEGER NOT NULL DEFAULT 0,
+            last_seen TEXT,
+            UNIQUE (email, name)
+        )
+        """
+    )
+    # Emails created after this point record their own contacts, so the
+    # backfill stops at the last email that already exists.
+    cursor.execute(
+        "CREATE TABLE _contacts_backfill AS SELECT COALESCE(MAX(id), 0) AS bound FROM emails"
+    )
+
+
+def backfill(conn, position, batch_size):
+    bound = conn.execute("SELECT bound FROM _contacts_backfill").fetchone()[0]
+    rows = conn.execute(
+        """
+        SELECT id, sender_name, sender_email, sender_avatar, recipient_name, recipient_email, date
+        FROM emails
+        WHERE id > ? AND id <= ?
+        ORDER BY id
+        LIMIT ?
+        """,
+        (position or 0, bound, batch_size),
+    ).fetchall()
+    if not rows:
+        return None
+
+    contacts = []
+    for _, sender_name, sender_email, sender_avatar, recipient_name, recipient_email, date in rows:
+        contacts.append((sender_name, sender_email, sender_avatar, date))
+        contacts.append((recipient_name, recipient_email, None, date))
+    conn.executemany(UPSERT_CONTACT, contacts)
+    return rows[-1][0]
+
+
+def finalize(conn):
+    conn.execute("DROP TABLE IF EXISTS _contacts_backfill")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("DROP TABLE IF EXISTS _contacts_backfill")
+    cursor.execute("DROP TABLE IF EXISTS contacts")
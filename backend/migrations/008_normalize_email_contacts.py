@@ -0,0 +1,146 @@
+"""
+Migration: Normalize email senders and recipients
+Version: 008
+Description: Replaces the denormalized sender_* and recipient_* columns on
+emails with sender_id and recipient_id referencing contacts. Existing rows are
+linked in batches; once every row has its ids the old columns are dropped.
+Emails already moved to the cold archive are converted the next time the
+archive is attached (see ``email_repository._sync_cold_schema``).
+
+Only the previous release may serve while this migration runs: it writes the
+denormalized columns, which ``finalize`` links again for every row the
+backfill missed or that changed after it passed. The current release writes
+ids only and cannot insert until the old NOT NULL columns are gone, so it
+must not start before the migration has finished.
+"""
+
+import json
+
+DENORMALIZED_COLUMNS = (
+    "sender_name",
+    "sender_email",
+    "sender_avatar",
+    "recipient_name",
+    "recipient_email",
+)
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("ALTER TABLE emails ADD COLUMN sender_id INTEGER REFERENCES contacts(id)")
+    cursor.execute("ALTER TABLE emails ADD COLUMN recipient_id INTEGER REFERENCES contacts(id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_emails_sender_id ON emails(sender_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_emails_recipient_id ON emails(recipient_id)")
+
+
+def backfill(conn, position, batch_size):
+    rows = conn.execute(
+        """
+        SELECT id, sender_name, sender_email, sender_avatar, recipient_name, recipient_email, date
+        FROM emails
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+        """,
+        (position or 0, batch_size),
+    ).fetchall()
+    if not rows:
+        return None
+
+    # Contacts were counted by migration 007; only add the ones it could not see.
+    contacts = []
+    for _, sender_name, sender_email, sender_avatar, recipient_name, recipient_email, date in rows:
+        contacts.append((sender_name, sender_email, sender_avatar, date))
+        contacts.append((recipient_name, recipient_email, None, date))
+    conn.executemany(
+        """
+        INSERT INTO contacts (name, email, avatar, frequency, last_seen)
+        VALUES (?, ?, ?, 0, ?)
+        ON CONFLICT (email, name) DO NOTHING
+        """,
+        contacts,
+    )
+    ids = json.dumps([row[0] for row in rows])
+    _link(conn, "id IN (SELECT value FROM json_each(?))", (ids,))
+    return rows[-1][0]
+
+
+def _link(conn, where, params=()):
+    conn.execute(
+        f"""
+        UPDATE emails SET
+            sender_id = (
+                SELECT id FROM contacts
+                WHERE contacts.email = emails.sender_email AND contacts.name = emails.sender_name
+            ),
+            recipient_id = (
+                SELECT id FROM contacts
+                WHERE contacts.email = emails.recipient_email AND contacts.name = emails.recipient_name
+            )
+        WHERE {where}
+        """,
+        params,
+    )
+
+
+def finalize(conn):
+    # Emails written after the backfill passed their id have no ids, and emails
+    # edited since may point at their previous contacts.
+    unlinked = """
+        sender_id IS NULL OR recipient_id IS NULL
+        OR NOT EXISTS (
+            SELECT 1 FROM contacts
+            WHERE id = emails.sender_id AND email = emails.sender_email AND name = emails.sender_name
+        )
+        OR NOT EXISTS (
+            SELECT 1 FROM contacts
+            WHERE id = emails.recipient_id AND email = emails.recipient_email
+                AND name = emails.recipient_name
+        )
+    """
+    conn.execute(
+        f"""
+        INSERT INTO contacts (name, email, avatar, frequency, last_seen)
+        SELECT sender_name, sender_email, sender_avatar, 0, date FROM emails WHERE {unlinked}
+        UNION ALL
+        SELECT recipient_name, recipient_email, NULL, 0, date FROM emails WHERE {unlinked}
+        ON CONFLICT (email, name) DO NOTHING
+        """
+    )
+    _link(conn, unlinked)
+    missing = conn.execute(
+        "SELECT COUNT(*) FROM emails WHERE sender_id IS NULL OR recipient_id IS NULL"
+    ).fetchone()[0]
+    if missing:
+        # Rolls back; the columns stay until every email is linked.
+        raise RuntimeError(f"{missing} email(s) could not be linked to contacts")
+    for column in DENORMALIZED_COLUMNS:
+        conn.execute(f"ALTER TABLE emails DROP COLUMN {column}")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(emails)").fetchall()}
+    # The old columns are still there if the backfill never finished.
+    if "sender_name" not in columns:
+        cursor.execute("ALTER TABLE emails ADD COLUMN sender_name TEXT NOT NULL DEFAULT ''")
+        cursor.execute("ALTER TABLE emails ADD COLUMN sender_email TEXT NOT NULL DEFAULT ''")
+        cursor.execute("ALTER TABLE emails ADD COLUMN sender_avatar TEXT")
+        cursor.execute("ALTER TABLE emails ADD COLUMN recipient_name TEXT NOT NULL DEFAULT ''")
+        cursor.execute("ALTER TABLE emails ADD COLUMN recipient_email TEXT NOT NULL DEFAULT ''")
+        cursor.execute(
+            """
+            UPDATE emails SET
+                sender_name = COALESCE((SELECT name FROM contacts WHERE id = emails.sender_id), ''),
+                sender_email = COALESCE((SELECT email FROM contacts WHERE id = emails.sender_id), ''),
+                sender_avatar = (SELECT avatar FROM contacts WHERE id = emails.sender_id),
+                recipient_name = COALESCE((SELECT name FROM contacts WHERE id = emails.recipient_id), ''),
+                recipient_email = COALESCE((SELECT email FROM contacts WHERE id = emails.recipient_id), '')
+            """
+        )
+    cursor.execute("DROP INDEX IF EXISTS idx_emails_recipient_id")
+    cursor.execute("DROP INDEX IF EXISTS idx_emails_sender_id")
+    cursor.execute("ALTER TABLE emails DROP COLUMN recipient_id")
+    cursor.execute("ALTER TABLE emails DROP COLUMN sender_id")
@@ -0,0 +1,58 @@
+"""
+Migration: Create email statistics rollup tables
+Version: 009
+Description: Adds per-day and per-sender rollups of message, unread and
+attachment counts, kept current by the email write paths. The tables start
+empty and unbuilt; the API fills them on start-up (or run
+``python manage.py rebuild-stats``) because archived mail lives in a separate
+database that migrations do not attach. Also indexes attachments by email,
+which the rollup updates look up for every changed email.
+"""
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS email_stats_daily (
+            day TEXT PRIMARY KEY,
+            messages INTEGER NOT NULL DEFAULT 0,
+            unread INTEGER NOT NULL DEFAULT 0,
+            attachments INTEGER NOT NULL DEFAULT 0,
+            attachment_bytes INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS email_stats_senders (
+            sender_id INTEGER PRIMARY KEY,
+            messages INTEGER NOT NULL DEFAULT 0,
+            unread INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_email_stats_senders_messages ON email_stats_senders(messages)"
+    )
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS email_stats_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            rebuilt_at TEXT
+        )
+        """
+    )
+    cursor.execute("INSERT OR IGNORE INTO email_stats_state (id, rebuilt_at) VALUES (1, NULL)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attachments_email_id ON attachments(email_id)")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("DROP INDEX IF EXISTS idx_attachments_email_id")
+    cursor.execute("DROP TABLE IF EXISTS email_stats_state")
+    cursor.execute("DROP INDEX IF EXISTS idx_email_stats_senders_messages")
+    cursor.execute("DROP TABLE IF EXISTS email_stats_senders")
+    cursor.execute("DROP TABLE IF EXISTS email_stats_daily")
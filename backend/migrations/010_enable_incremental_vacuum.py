@@ -0,0 +1,27 @@
+"""
+Migration: Enable incremental auto-vacuum
+Version: 010
+Description: Switches the database to auto_vacuum = INCREMENTAL so pages freed
+by deleted emails and replaced attachments can be returned to the file system
+a few at a time by the maintenance job (PRAGMA incremental_vacuum) instead of
+needing a blocking full VACUUM. Changing the mode of an existing database
+takes one VACUUM, which cannot run inside a transaction.
+"""
+
+TRANSACTIONAL = False
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def upgrade(conn):
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == AUTO_VACUUM_INCREMENTAL:
+        return
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+
+
+def downgrade(conn):
+    if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 0:
+        return
+    conn.execute("PRAGMA auto_vacuum = NONE")
+    conn.execute("VACUUM")
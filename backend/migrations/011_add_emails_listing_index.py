@@ -0,0 +1,25 @@
+"""
+Migration: Add listing index on emails
+Version: 011
+Description: Indexes listable emails in listing order (unread first, newest
+first) so the listing queries walk the index instead of sorting every row
+before returning the first one. Streamed listings start after one batch.
+"""
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_emails_listing
+        ON emails(is_archived, is_read, date DESC, id)
+        WHERE scheduled_at IS NULL
+        """
+    )
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("DROP INDEX IF EXISTS idx_emails_listing")
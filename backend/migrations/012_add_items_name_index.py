@@ -0,0 +1,18 @@
+"""
+Migration: Add name index on items
+Version: 012
+Description: Indexes items by name (then id) so prefix filters are a range
+scan and filtered pages can be read in keyset order without sorting.
+"""
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_items_name ON items(name, id)")
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("DROP INDEX IF EXISTS idx_items_name")
@@ -0,0 +1,95 @@
+"""
+Migration: Create conversation threads
+Version: 013
+Description: Adds a threads table (one row per conversation, with its
+last-activity time and message and unread counts) and emails.thread_id. New
+emails are threaded at write time by the app; existing ones are threaded in
+batches by their normalized subject and participants. Emails already moved to
+the cold archive stay unthreaded.
+"""
+
+import re
+
+# Keep in step with app.repositories.thread_repository.
+_REPLY_PREFIX = re.compile(r"^\s*(?:re|fwd?|aw|sv)\s*(?:\[\d+\])?\s*:\s*", re.IGNORECASE)
+
+CLAIM_THREAD = """
+    INSERT INTO threads (thread_key, subject, last_activity)
+    VALUES (?, ?, ?)
+    ON CONFLICT (thread_key) DO UPDATE SET thread_key = excluded.thread_key
+    RETURNING id
+"""
+
+
+def _base_subject(subject):
+    previous = None
+    while previous != subject:
+        previous = subject
+        subject = _REPLY_PREFIX.sub("", subject, count=1)
+    return " ".join(subject.split())
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS threads (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            thread_key TEXT NOT NULL UNIQUE,
+            subject TEXT NOT NULL,
+            last_activity TEXT NOT NULL,
+            messages INTEGER NOT NULL DEFAULT 0,
+            unread INTEGER NOT NULL DEFAULT 0
+        )
+        """
+    )
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_threads_activity ON threads(last_activity, id)"
+    )
+    cursor.execute("ALTER TABLE emails ADD COLUMN thread_id INTEGER REFERENCES threads(id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_emails_thread_id ON emails(thread_id)")
+
+
+def backfill(conn, position, batch_size):
+    # Emails written after the upgrade already have a thread.
+    rows = conn.execute(
+        """
+        SELECT id, sender_id, recipient_id, subject, date, is_read, scheduled_at
+        FROM emails
+        WHERE id > ? AND thread_id IS NULL
+        ORDER BY id
+        LIMIT ?
+        """,
+        (position or 0, batch_size),
+    ).fetchall()
+    if not rows:
+        return None
+
+    for email_id, sender_id, recipient_id, subject, date, is_read, scheduled_at in rows:
+        base = _base_subject(subject)
+        low, high = sorted((sender_id or 0, recipient_id or 0))
+        thread_id = conn.execute(
+            CLAIM_THREAD, (f"{low}:{high}:{base.casefold()}", base, date)
+        ).fetchone()[0]
+        conn.execute("UPDATE emails SET thread_id = ? WHERE id = ?", (thread_id, email_id))
+        if scheduled_at is None:
+            conn.execute(
+                """
+                UPDATE threads SET
+                    messages = messages + 1,
+                    unread = unread + ?,
+                    last_activity = MAX(last_activity, ?)
+                WHERE id = ?
+                """,
+                (0 if is_read else 1, date, thread_id),
+            )
+    return rows[-1][0]
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("DROP INDEX IF EXISTS idx_emails_thread_id")
+    cursor.execute("ALTER TABLE emails DROP COLUMN thread_id")
+    cursor.execute("DROP TABLE IF EXISTS threads")
@@ -0,0 +1,25 @@
+"""
+Migration: Create mailbox change log
+Version: 014
+Description: Records the emails changed by each mailbox version, so other
+workers can update their in-process caches per email instead of dropping them.
+"""
+
+
+def upgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute(
+        """
+        CREATE TABLE IF NOT EXISTS mailbox_changes (
+            version INTEGER PRIMARY KEY,
+            emails TEXT NOT NULL DEFAULT '[]'
+        )
+        """
+    )
+
+
+def downgrade(conn):
+    cursor = conn.cursor()
+
+    cursor.execute("DROP TABLE IF EXISTS mailbox_changes")
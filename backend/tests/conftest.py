@@ -5,11 +5,21 @@ import sys
 import pytest
 from fastapi.testclient import TestClient
 
+ADMIN_TOKEN = "test-admin-token"
+
+
+@pytest.fixture(scope="session")
+def template_path(tmp_path_factory):
+    """Migrated once per session; every test database is cloned from it."""
+    return tmp_path_factory.mktemp("template") / "template.db"
+
 
 @pytest.fixture()
-def client(tmp_path, monkeypatch):
+def client(tmp_path, monkeypatch, template_path):
     db_path = tmp_path / "test.db"
     monkeypatch.setenv("DATABASE_PATH", str(db_path))
+    monkeypatch.setenv("DATABASE_MODE", "template")
+    monkeypatch.setenv("DATABASE_TEMPLATE_PATH", str(template_path))
 
     if "app.database" in sys.modules:
         importlib.reload(sys.modules["app.database"])
@@ -29,8 +39,13 @@ def client(tmp_path, monkeypatch):
         importlib.reload(sys.modules["app.main"])
 
     from app.main import app
+    from app.routes import admin
+    from app.warmup import warmup
 
-    with TestClient(app) as test_client:
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", ADMIN_TOKEN)
+    with TestClient(app, headers={"Authorization": f"Bearer {ADMIN_TOKEN}"}) as test_client:
+        # Tests run against a ready instance, without warmup racing for the pool.
+        warmup.wait(10)
         yield test_client
 
     if os.path.exists(db_path):
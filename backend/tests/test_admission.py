@@ -0,0 +1,101 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.middleware.admission import AdmissionController, AdmissionMiddleware, classify
+
+
+def make_client(controller):
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+
+    @app.get("/emails")
+    def list_emails():
+        return []
+
+    @app.post("/emails")
+    def create_email():
+        return {}
+
+    @app.get("/health")
+    def health():
+        return {"status": "healthy"}
+
+    return TestClient(app)
+
+
+def test_classify_routes():
+    def scope(method, path, query=b""):
+        return {"method": method, "path": path, "query_string": query}
+
+    assert classify(scope("GET", "/emails", b"search=jane")) == "search"
+    assert classify(scope("GET", "/emails", b"search=")) == "list"
+    assert classify(scope("GET", "/emails/3")) == "list"
+    assert classify(scope("PUT", "/emails/3")) == "write"
+    assert classify(scope("GET", "/items")) is None
+
+
+def test_search_budget_is_separate_from_list_budget():
+    controller = AdmissionController(
+        budgets={"search": (0.001, 2), "list": (0.001, 5), "write": (0.001, 1)}
+    )
+    client = make_client(controller)
+
+    assert client.get("/emails?search=a").status_code == 200
+    assert client.get("/emails?search=b").status_code == 200
+    limited = client.get("/emails?search=c")
+    assert limited.status_code == 429
+    assert int(limited.headers["retry-after"]) >= 1
+
+    assert client.get("/emails").status_code == 200
+    assert client.post("/emails").status_code == 200
+    assert client.post("/emails").status_code == 429
+    assert controller.snapshot()["rate_limited"] == 2
+
+
+def test_buckets_refill_and_idle_buckets_are_swept():
+    controller = AdmissionController(budgets={"list": (10, 2)})
+    assert controller.try_acquire("a", "list", now=0.0) == 0
+    assert controller.try_acquire("a", "list", now=0.0) == 0
+    assert controller.try_acquire("a", "list", now=0.0) > 0
+    assert controller.try_acquire("a", "list", now=0.1) == 0
+
+    controller.try_acquire("b", "list", now=0.1)
+    controller.sweep(now=100.0)
+    assert controller.snapshot()["active_buckets"] == 0
+
+
+def test_load_is_shed_above_max_concurrency():
+    controller = AdmissionController(max_concurrency=1)
+    app = FastAPI()
+    app.add_middleware(AdmissionMiddleware, controller=controller)
+    release = asyncio.Event()
+
+    @app.get("/items")
+    async def slow():
+        await release.wait()
+        return {}
+
+    @app.get("/health")
+    def health():
+        return {"status": "healthy"}
+
+    async def scenario():
+        import httpx
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            first = asyncio.create_task(http.get("/items"))
+            while controller.in_flight == 0:
+                await asyncio.sleep(0)
+            shed = await http.get("/items")
+            healthy = await http.get("/health")
+            release.set()
+            return (await first).status_code, shed, healthy.status_code
+
+    first_status, shed, health_status = asyncio.run(scenario())
+    assert first_status == 200
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "1"
+    assert health_status == 200
@@ -0,0 +1,109 @@
+import sqlite3
+
+import pytest
+
+from app import database
+from app.jobs import job_queue
+from app.repositories import email_repository
+from app.services import archive_service
+
+
+@pytest.fixture()
+def archived_client(client):
+    job_queue.stop()
+    with database.get_db() as conn:
+        archive_service.run_retention_batch(conn)
+    return client
+
+
+def hot_ids():
+    with database.get_db() as conn:
+        return {row[0] for row in conn.execute("SELECT id FROM main.emails").fetchall()}
+
+
+def test_retention_moves_archived_emails_to_cold_tier(archived_client):
+    assert 8 not in hot_ids()
+
+    archived = archived_client.get("/emails?filter=archived").json()
+    assert [email["id"] for email in archived] == ["8"]
+    assert archived_client.get("/emails/8").json()["is_archived"] is True
+    assert archived_client.get("/emails?filter=archived&search=attendance").json()[0]["id"] == "8"
+    assert "8" not in [email["id"] for email in archived_client.get("/emails").json()]
+
+
+def test_unarchiving_restores_email_to_hot_tier(archived_client):
+    resp = archived_client.put("/emails/8", json={"is_archived": False})
+    assert resp.status_code == 200
+    assert resp.json()["is_archived"] is False
+
+    assert 8 in hot_ids()
+    assert "8" in [email["id"] for email in archived_client.get("/emails").json()]
+    assert archived_client.get("/emails?filter=archived").json() == []
+
+
+def test_cold_emails_can_be_deleted(archived_client):
+    assert archived_client.delete("/emails/8").status_code == 204
+    assert archived_client.get("/emails/8").status_code == 404
+
+
+def test_attachments_follow_email_into_cold_tier(client):
+    job_queue.stop()
+    client.put("/emails/2", json={"is_archived": True})
+    with database.get_db() as conn:
+        archive_service.run_retention_batch(conn)
+
+    assert 2 not in hot_ids()
+    email = client.get("/emails/2").json()
+    assert email["attachments"][0]["filename"] == "Proposal Partnership.pdf"
+    listed = {email["id"]: email for email in client.get("/emails?filter=archived").json()}
+    assert listed["2"]["attachments"] == email["attachments"]
+
+
+def test_archive_created_before_contact_normalization_is_converted(client, tmp_path, monkeypatch):
+    legacy_path = tmp_path / "legacy-archive.db"
+    legacy = sqlite3.connect(legacy_path)
+    legacy.execute(
+        """
+        CREATE TABLE emails (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_name TEXT NOT NULL,
+            sender_email TEXT NOT NULL,
+            sender_avatar TEXT,
+            recipient_name TEXT NOT NULL,
+            recipient_email TEXT NOT NULL,
+            subject TEXT NOT NULL,
+            preview TEXT NOT NULL,
+            body TEXT NOT NULL,
+            date TEXT NOT NULL,
+            is_read INTEGER NOT NULL DEFAULT 0,
+            is_archived INTEGER NOT NULL DEFAULT 0,
+            scheduled_at TEXT
+        )
+        """
+    )
+    legacy.execute(
+        """
+        INSERT INTO emails VALUES (
+            100, 'Old Sender', 'old@example.com', '/avatars/old.jpg', 'Richard Brown',
+            'richard@example.com', 'Old news', 'Old preview', 'Old body', '2020-01-01T00:00:00', 1, 1, NULL
+        )
+        """
+    )
+    legacy.commit()
+    legacy.close()
+    monkeypatch.setattr(database, "ARCHIVE_DATABASE_PATH", str(legacy_path))
+
+    conn = database.get_connection()
+    try:
+        assert email_repository.cold_tier_available(conn)
+        archived = [
+            email_repository.serialize_email(email)
+            for email in email_repository.list_emails(conn, "archived", None)
+        ]
+        assert "sender_name" not in email_repository._table_columns(conn, "cold", "emails")
+    finally:
+        conn.close()
+
+    old = next(email for email in archived if email["id"] == "100")
+    assert old["sender"] == {"name": "Old Sender", "email": "old@example.com", "avatar": "/avatars/old.jpg"}
+    assert old["recipient"]["email"] == "richard@example.com"
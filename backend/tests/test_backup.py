@@ -0,0 +1,183 @@
+import json
+import os
+import sqlite3
+import threading
+
+import pytest
+
+from app import database
+from app.jobs import job_queue
+from app.services import archive_service, backup_service
+
+
+@pytest.fixture()
+def backup_client(client, monkeypatch):
+    job_queue.stop()
+    monkeypatch.setattr(backup_service, "STEP_PAUSE_SECONDS", 0)
+    return client
+
+
+def test_backup_is_consistent_under_concurrent_writes(backup_client, monkeypatch):
+    monkeypatch.setattr(backup_service, "PAGES_PER_STEP", 1)
+    monkeypatch.setattr(backup_service, "STEP_PAUSE_SECONDS", 0.001)
+    with database.get_db() as conn:
+        archive_service.run_retention_batch(conn)
+        emails_before = conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0]
+
+    stop = threading.Event()
+    writes = []
+
+    def write():
+        while not stop.is_set():
+            with database.get_db() as conn:
+                conn.execute(
+                    "INSERT INTO emails (sender_id, recipient_id, subject, preview, body, date) "
+                    "SELECT sender_id, recipient_id, 'During backup', '', '', date FROM emails LIMIT 1"
+                )
+            writes.append(1)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+    try:
+        manifest = backup_service.create_backup("during-writes")
+    finally:
+        stop.set()
+        writer.join()
+
+    assert writes
+    assert set(manifest["files"]) == {"main", "cold"}
+    assert all(info["integrity"] == "ok" for info in manifest["files"].values())
+    assert manifest["files"]["main"]["pages"] > 1
+    assert backup_service.progress.snapshot()["percent"] == 100.0
+    assert backup_service.verify_backup("during-writes")["ok"]
+
+    snapshot = os.path.join(backup_service.backup_dir(), "during-writes", "main.db")
+    conn = sqlite3.connect(snapshot)
+    try:
+        copied = conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0]
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    finally:
+        conn.close()
+    assert emails_before <= copied < emails_before + len(writes)
+
+
+def test_restore_returns_to_the_snapshot(backup_client):
+    created = backup_client.post("/admin/backups")
+    assert created.status_code == 201
+    name = created.json()["name"]
+    assert [backup["name"] for backup in backup_client.get("/admin/backups").json()["backups"]] == [name]
+
+    assert backup_client.get("/emails/1").status_code == 200
+    assert backup_client.delete("/emails/1").status_code == 204
+    assert backup_client.get("/emails/1").status_code == 404
+    inbox = backup_client.get("/emails").json()
+
+    assert backup_service.restore_backup(name)["name"] == name
+    assert backup_client.get("/emails/1").status_code == 200
+    assert len(backup_client.get("/emails").json()) == len(inbox) + 1
+    with database.get_db() as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    assert backup_client.get("/admin/stats").json()["backup"]["operation"] == "restore"
+
+
+def test_restore_reverts_archival(backup_client):
+    with database.get_db() as conn:
+        archive_service.run_retention_batch(conn)
+    name = backup_client.post("/admin/backups").json()["name"]
+    with database.get_db() as conn:
+        conn.execute("UPDATE emails SET is_archived = 1 WHERE id = 1")
+    with database.get_db() as conn:
+        archive_service.run_retention_batch(conn)
+    assert [email["id"] for email in backup_client.get("/emails?filter=archived").json()] == ["1", "8"]
+
+    backup_service.restore_backup(name)
+
+    assert [email["id"] for email in backup_client.get("/emails?filter=archived").json()] == ["8"]
+    assert backup_client.get("/emails/1").json()["is_archived"] is False
+
+
+def test_restoring_a_backup_without_archive_empties_the_cold_tier(backup_client):
+    with database.get_db() as conn:
+        archive_service.run_retention_batch(conn)
+    name = backup_client.post("/admin/backups").json()["name"]
+    # As if the backup had been taken before anything was archived.
+    path = backup_service._snapshot_path(name)
+    manifest = backup_service.load_manifest(name)
+    del manifest["files"]["cold"]
+    with open(os.path.join(path, backup_service.MANIFEST), "w") as handle:
+        json.dump(manifest, handle)
+
+    backup_service.restore_backup(name)
+
+    with database.get_db() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM cold.emails").fetchone()[0] == 0
+
+
+def test_corrupted_backup_fails_verification(backup_client):
+    name = backup_client.post("/admin/backups").json()["name"]
+    path = os.path.join(backup_service.backup_dir(), name, "main.db")
+    with open(path, "r+b") as handle:
+        handle.seek(4096 + 100)
+        handle.write(b"\xff" * 64)
+
+    report = backup_client.post(f"/admin/backups/{name}/verify").json()
+    assert report["ok"] is False
+    assert report["files"]["main"]["sha256_matches"] is False
+    with pytest.raises(backup_service.BackupError):
+        backup_service.restore_backup(name)
+    assert backup_client.get("/emails/1").status_code == 200
+
+
+def test_unknown_and_invalid_backup_names(backup_client):
+    assert backup_client.post("/admin/backups/missing/verify").status_code == 404
+    assert backup_client.post("/admin/backups/..bad/verify").status_code == 400
+    backup_service.create_backup("twice")
+    with pytest.raises(backup_service.BackupInProgress):
+        backup_service.create_backup("twice")
+
+
+def test_restore_refuses_another_schema_version(backup_client):
+    name = backup_client.post("/admin/backups").json()["name"]
+    path = os.path.join(backup_service._snapshot_path(name), backup_service.MANIFEST)
+    manifest = backup_service.load_manifest(name)
+    manifest["schema_version"] -= 1
+    with open(path, "w") as handle:
+        json.dump(manifest, handle)
+    assert backup_client.delete("/emails/1").status_code == 204
+
+    with pytest.raises(backup_service.BackupError, match="schema version"):
+        backup_service.restore_backup(name)
+    assert backup_client.get("/emails/1").status_code == 404
+    assert backup_service.progress.snapshot()["running"] is False
+
+
+def test_restore_is_not_exposed_over_http(backup_client):
+    name = backup_client.post("/admin/backups").json()["name"]
+    assert backup_client.post(f"/admin/backups/{name}/restore").status_code in (404, 405)
+
+
+def test_admin_endpoints_need_the_admin_token(backup_client, monkeypatch):
+    from app.routes import admin
+
+    wrong = {"Authorization": "Bearer nope"}
+    assert backup_client.post("/admin/backups", headers=wrong).status_code == 401
+    assert backup_client.get("/admin/stats", headers={"Authorization": ""}).status_code == 401
+    monkeypatch.setattr(admin, "ADMIN_TOKEN", "")
+    assert backup_client.get("/admin/backups").status_code == 403
+    assert backup_service.list_backups() == []
+
+
+def test_only_the_newest_backups_are_kept(backup_client, monkeypatch):
+    monkeypatch.setattr(backup_service, "KEEP", 2)
+    # Backups taken within one second; date the older two apart.
+    for day, name in enumerate(("first", "second"), start=1):
+        backup_service.create_backup(name)
+        path = os.path.join(backup_service._snapshot_path(name), backup_service.MANIFEST)
+        manifest = backup_service.load_manifest(name)
+        manifest["created_at"] = f"2024-01-0{day}T00:00:00+00:00"
+        with open(path, "w") as handle:
+            json.dump(manifest, handle)
+
+    backup_service.create_backup("third")
+    assert [backup["name"] for backup in backup_service.list_backups()] == ["third", "second"]
+    assert not os.path.exists(os.path.join(backup_service.backup_dir(), "first"))
@@ -0,0 +1,85 @@
+import sqlite3
+
+from app import database
+from app.coherence import MailboxVersion
+
+
+def commit(version_tracker, email_ids=()):
+    with database.get_db() as conn:
+        version_tracker.bump(conn, email_ids)
+
+
+def test_remote_writes_are_applied_from_the_change_log(client):
+    local = MailboxVersion(interval=0)
+    remote = MailboxVersion(interval=0)
+    invalidations, changes = [], []
+    local.subscribe(lambda: invalidations.append(True))
+    local.subscribe_changes(lambda conn, email_ids: changes.append(email_ids))
+
+    with database.get_db() as conn:
+        start = local.check(conn)
+
+    commit(remote, [2])
+    commit(remote, [1, 2])
+
+    with database.get_db() as conn:
+        assert local.check(conn) == start + 2
+    assert changes == [[1, 2]]
+    assert invalidations == []
+
+
+def test_remote_write_missing_from_the_log_invalidates(client):
+    local = MailboxVersion(interval=0)
+    changes, invalidations = [], []
+    local.subscribe(lambda: invalidations.append(True))
+    local.subscribe_changes(lambda conn, email_ids: changes.append(email_ids))
+
+    with database.get_db() as conn:
+        start = local.check(conn)
+        # As a restore does: the version moves without a change log entry.
+        conn.execute("UPDATE mailbox_state SET version = version + 1")
+
+    with database.get_db() as conn:
+        assert local.check(conn) == start + 1
+    assert invalidations == [True]
+    assert changes == []
+
+
+def test_local_writes_are_acknowledged_without_invalidation(client):
+    tracker = MailboxVersion(interval=0)
+    invalidations = []
+    tracker.subscribe(lambda: invalidations.append(True))
+
+    with database.get_db() as conn:
+        start = tracker.check(conn)
+
+    commit(tracker)
+    commit(tracker)
+    assert tracker.version == start + 2
+
+    with database.get_db() as conn:
+        assert tracker.check(conn) == start + 2
+    assert invalidations == []
+
+
+def test_rolled_back_write_is_not_acknowledged(client):
+    tracker = MailboxVersion(interval=0)
+    with database.get_db() as conn:
+        start = tracker.check(conn)
+
+    try:
+        with database.get_db() as conn:
+            tracker.bump(conn)
+            raise sqlite3.OperationalError("abort")
+    except sqlite3.OperationalError:
+        pass
+
+    assert tracker.version == start
+
+
+def test_api_writes_bump_mailbox_version(client):
+    client.get("/emails")
+    before = client.get("/admin/stats").json()["mailbox_version"]["version"]
+    client.put("/emails/1", json={"is_read": True})
+    after = client.get("/admin/stats").json()["mailbox_version"]["version"]
+    assert after == before + 1
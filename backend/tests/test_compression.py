@@ -0,0 +1,89 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.compression import (
+    CompressedBodyCache,
+    CompressionMiddleware,
+    negotiate_encoding,
+    supported_encodings,
+)
+
+LARGE_BODY = "x" * 4096
+
+
+@pytest.fixture()
+def cache():
+    return CompressedBodyCache(max_bytes=1024 * 1024)
+
+
+@pytest.fixture()
+def compressed_client(cache):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024, cache=cache)
+
+    @app.get("/large")
+    def large():
+        return PlainTextResponse(LARGE_BODY)
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("tiny")
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter([LARGE_BODY, LARGE_BODY]), media_type="text/plain")
+
+    return TestClient(app)
+
+
+def test_negotiate_encoding_respects_quality():
+    assert negotiate_encoding("br;q=0, gzip") == "gzip"
+    assert negotiate_encoding("gzip;q=0.5, deflate") == "gzip"
+    assert negotiate_encoding("identity") is None
+    assert negotiate_encoding("*") == supported_encodings()[0]
+
+
+def test_small_responses_are_not_compressed(compressed_client):
+    resp = compressed_client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in resp.headers
+    assert resp.text == "tiny"
+
+
+def test_large_responses_are_compressed_and_memoized(compressed_client, cache):
+    for _ in range(3):
+        resp = compressed_client.get("/large", headers={"Accept-Encoding": "gzip"})
+        assert resp.headers["content-encoding"] == "gzip"
+        assert resp.headers["vary"] == "Accept-Encoding"
+        assert int(resp.headers["content-length"]) < len(LARGE_BODY)
+        assert resp.text == LARGE_BODY
+
+    assert cache.snapshot()["misses"] == 1
+    assert cache.snapshot()["hits"] == 2
+
+
+def test_brotli_is_preferred(compressed_client):
+    pytest.importorskip("brotli")
+    resp = compressed_client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+    assert resp.headers["content-encoding"] == "br"
+    assert resp.text == LARGE_BODY
+
+
+def test_streaming_responses_are_compressed_incrementally(compressed_client, cache):
+    with compressed_client.stream("GET", "/stream", headers={"Accept-Encoding": "gzip"}) as resp:
+        assert resp.headers["content-encoding"] == "gzip"
+        assert "content-length" not in resp.headers
+        raw = b"".join(resp.iter_raw())
+
+    assert gzip.decompress(raw).decode() == LARGE_BODY * 2
+    assert cache.snapshot()["entries"] == 0
+
+
+def test_email_list_is_compressed(client):
+    resp = client.get("/emails", headers={"Accept-Encoding": "gzip"})
+    assert resp.status_code == 200
+    assert resp.headers["content-encoding"] == "gzip"
+    assert isinstance(resp.json(), list)
@@ -0,0 +1,107 @@
+import time
+
+from app import database
+from app.coherence import MailboxVersion, mailbox_version
+from app.repositories.contact_index import ContactIndex, contact_index
+
+
+def test_contacts_are_backfilled_from_existing_mail(client):
+    resp = client.get("/contacts?prefix=jane")
+    assert resp.status_code == 200
+    assert [contact["email"] for contact in resp.json()] == ["jane.doe@business.com"]
+    assert resp.json()[0]["avatar"] == "/avatars/jane.jpg"
+
+
+def test_prefix_matches_later_name_words_and_addresses(client):
+    assert client.get("/contacts?prefix=DOE").json()[0]["name"] == "Jane Doe"
+    assert client.get("/contacts?prefix=support@").json()[0]["name"] == "Support Team"
+    assert client.get("/contacts?prefix=zzz").json() == []
+
+
+def test_sending_mail_updates_ranking(client):
+    top = client.get("/contacts?prefix=&limit=1").json()[0]
+    assert top["email"] == "richard@example.com"
+
+    for _ in range(2):
+        client.post(
+            "/emails",
+            json={
+                "recipient": {"name": "Zoe Quinn", "email": "zoe@example.com"},
+                "subject": "Hi",
+                "body": "Hello",
+            },
+        )
+    assert client.get("/contacts?prefix=zo").json()[0]["frequency"] == 2
+    assert client.get("/contacts?prefix=q").json()[0]["email"] == "zoe@example.com"
+
+
+def test_mail_sent_by_another_worker_updates_contacts_in_place(client, monkeypatch):
+    client.get("/contacts?prefix=zo")
+    monkeypatch.setattr(mailbox_version, "interval", 0)
+    loads = contact_index.loads
+
+    other_worker = MailboxVersion()
+    with database.get_db() as conn:
+        contact_id = conn.execute(
+            "INSERT INTO contacts (name, email, avatar, frequency, last_seen) "
+            "VALUES ('Zoe Quinn', 'zoe@example.com', '/avatars/zoe.jpg', 1, '2030-01-01') "
+            "RETURNING id"
+        ).fetchone()[0]
+        email_id = conn.execute(
+            "INSERT INTO emails (sender_id, recipient_id, subject, preview, body, date) "
+            "VALUES (?, 1, 'Hi', '', 'Hello', '2030-01-01T00:00:00') RETURNING id",
+            (contact_id,),
+        ).fetchone()[0]
+        other_worker.bump(conn, [email_id])
+
+    assert client.get("/contacts?prefix=zo").json()[0]["email"] == "zoe@example.com"
+    assert client.get(f"/emails/{email_id}").json()["sender"]["avatar"] == "/avatars/zoe.jpg"
+    assert contact_index.loads == loads
+
+
+def test_cached_short_prefixes_follow_rank_changes():
+    index = ContactIndex(cached_prefix_length=1)
+    index.replace(
+        [(1, "Ann", "ann@x.com", None, 5, "2024"), (2, "Amy", "amy@x.com", None, 1, "2024")],
+        index.begin_load(),
+    )
+    assert [contact.id for contact in index.search("a", 5)] == [1, 2]
+
+    index.apply([(2, "Amy", "amy@x.com", None, 9, "2025")])
+    index.apply([(3, "Abe", "abe@x.com", None, 7, "2025")])
+    assert [contact.id for contact in index.search("a", 5)] == [2, 3, 1]
+    assert index.snapshot()["cache_hits"] == 1
+
+
+def test_lookups_stay_fast_with_many_contacts():
+    index = ContactIndex()
+    rows = [
+        (i, f"Contact {i:06d} Person", f"user{i}@example{i % 97}.com", None, i % 50, "2024")
+        for i in range(100_000)
+    ]
+    index.replace(rows, index.begin_load())
+    prefixes = ["c", "co", "user1", "user12", "person", "contact 0001", "user9999", "x"]
+    for prefix in prefixes:
+        index.search(prefix, 10)
+
+    timings = []
+    for _ in range(50):
+        for prefix in prefixes:
+            started = time.perf_counter()
+            index.search(prefix, 10)
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    # Generous bound for slow CI machines; typically well under a millisecond.
+    assert timings[int(len(timings) * 0.99)] < 0.01
+
+
+def test_emails_reference_contacts_by_id(client):
+    with database.get_db() as conn:
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(emails)").fetchall()}
+        unlinked = conn.execute(
+            "SELECT COUNT(*) FROM emails WHERE sender_id IS NULL OR recipient_id IS NULL"
+        ).fetchone()[0]
+    assert {"sender_id", "recipient_id"} <= columns
+    assert "sender_name" not in columns
+    assert unlinked == 0
+    assert client.get("/emails/1").json()["sender"]["avatar"] == "/avatars/michael.jpg"
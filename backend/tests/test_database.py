@@ -0,0 +1,81 @@
+import importlib
+import os
+import sqlite3
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import database
+from app.repositories import email_repository
+import migrate
+
+
+def test_new_database_is_cloned_from_template(client, template_path):
+    assert os.path.exists(template_path)
+    with database.get_db() as conn:
+        version = migrate.get_schema_version(conn)
+        emails = conn.execute("SELECT COUNT(*) FROM emails").fetchone()[0]
+        # The retention job may already have moved some to the cold tier.
+        if email_repository.cold_tier_available(conn):
+            emails += conn.execute("SELECT COUNT(*) FROM cold.emails").fetchone()[0]
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+
+    template = sqlite3.connect(template_path)
+    assert version == migrate.get_schema_version(template) > 0
+    assert emails == template.execute("SELECT COUNT(*) FROM emails").fetchone()[0] > 0
+    template.close()
+    assert mode == "wal"
+
+
+def test_existing_database_is_not_replaced_by_template(client):
+    client.delete("/emails/1")
+    migrate.run_migrations("upgrade")
+    assert client.get("/emails/1").status_code == 404
+
+
+@pytest.fixture(params=["template", "migrations"])
+def memory_client(request, tmp_path, monkeypatch, template_path):
+    db_path = tmp_path / "memory.db"
+    monkeypatch.setenv("DATABASE_PATH", str(db_path))
+    monkeypatch.setenv("DATABASE_MODE", "memory")
+    # Without a template the app migrates the in-memory database itself.
+    monkeypatch.setenv(
+        "DATABASE_TEMPLATE_PATH", str(template_path) if request.param == "template" else ""
+    )
+    importlib.reload(database)
+    importlib.reload(migrate)
+    # Nothing is migrated here: the app's startup has to prepare the database.
+    importlib.reload(sys.modules["app.main"])
+    from app.main import app
+
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        monkeypatch.undo()
+        importlib.reload(database)
+        importlib.reload(migrate)
+    assert not os.path.exists(db_path)
+
+
+def test_memory_mode_serves_without_files(memory_client):
+    emails = memory_client.get("/emails").json()
+    assert emails
+
+    created = memory_client.post(
+        "/emails",
+        json={
+            "subject": "In memory",
+            "body": "Never touches disk",
+            "recipient": {"name": "Ada", "email": "ada@example.com"},
+        },
+    )
+    assert created.status_code == 201
+    assert memory_client.get(f"/emails/{created.json()['id']}").status_code == 200
+
+    with database.get_db() as conn:
+        assert database.attach_archive(conn)
+        main_file = conn.execute("PRAGMA database_list").fetchall()[0][2]
+    assert not main_file or not os.path.exists(main_file)
+    assert not os.path.exists(database.ARCHIVE_DATABASE_PATH)
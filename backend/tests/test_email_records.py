@@ -0,0 +1,42 @@
+from pydantic import TypeAdapter
+
+from app import database
+from app.repositories import email_repository
+from app.schemas.email import EmailResponse
+from app.services import email_service
+
+adapter = TypeAdapter(list[EmailResponse])
+
+
+def test_encoded_list_matches_pydantic(client):
+    client.post(
+        "/emails",
+        json={
+            "recipient": {"name": 'Zoë "Z" Ünal', "email": "zoe@example.com"},
+            "subject": "Tabs\tquotes \" backslash \\ slash / </script> 🎉",
+            "body": "Line one\nLine two\r\n\x01\x1f\x7f   日本語",
+            "attachments": [
+                {"filename": "a \"b\".pdf", "size": "1.5 MB", "url": "/files/a.pdf"},
+                {"filename": "ü.png", "size": "20 KB", "url": "/files/u.png"},
+            ],
+        },
+    )
+    with database.get_db() as conn:
+        for filter_value in ("all", "unread", "archived"):
+            emails = email_repository.list_emails(conn, filter_value, None)
+            expected = adapter.dump_json(
+                adapter.validate_python([email_repository.serialize_email(e) for e in emails])
+            )
+            assert email_service.encode_email_list(emails) == expected
+
+    assert email_service.encode_email_list([]) == adapter.dump_json([])
+
+
+def test_records_share_contacts(client):
+    with database.get_db() as conn:
+        emails = email_repository.list_emails(conn, "all", None)
+
+    recipients = {id(email.recipient) for email in emails}
+    assert len(recipients) < len(emails)
+    assert all(isinstance(email, email_repository.EmailRecord) for email in emails)
+    assert all(isinstance(email.attachments, tuple) for email in emails)
@@ -62,3 +62,39 @@ def test_date_format_is_iso(client):
     assert resp.status_code == 200
     sample = resp.json()[0]["date"]
     datetime.fromisoformat(sample)
+
+
+def test_update_multiple_fields(client):
+    update_resp = client.put(
+        "/emails/1",
+        json={
+            "subject": "Updated subject",
+            "body": "Updated body",
+            "recipient": {"name": "Jane Doe", "email": "jane.doe@business.com"},
+        },
+    )
+    assert update_resp.status_code == 200
+    updated = update_resp.json()
+    assert updated["subject"] == "Updated subject"
+    assert updated["preview"] == "Updated body"
+    assert updated["recipient"]["email"] == "jane.doe@business.com"
+    assert updated["is_read"] is False
+
+
+def test_list_variants_reuse_prepared_statements(client):
+    from app.jobs import job_queue
+
+    # Background workers would otherwise hand other pooled connections to requests.
+    job_queue.stop()
+    queries = ("", "?filter=unread", "?filter=archived", "?search=Proposal", "?search=Jane")
+    for query in queries:
+        assert client.get(f"/emails{query}").status_code == 200
+
+    before = client.get("/admin/stats").json()["statements"]
+    for _ in range(3):
+        for query in queries:
+            assert client.get(f"/emails{query}").status_code == 200
+    after = client.get("/admin/stats").json()["statements"]
+
+    assert after["prepares"] == before["prepares"]
+    assert after["cache_hits"] - before["cache_hits"] >= 2 * 3 * len(queries)
@@ -0,0 +1,107 @@
+import pytest
+
+from app import database
+from app.coherence import MailboxVersion, mailbox_version
+from app.jobs import job_queue
+from app.middleware import admission_controller
+from app.repositories.inbox_index import InboxIndex, inbox_index
+
+PAYLOAD = {
+    "recipient": {"name": "Jane Doe", "email": "jane@example.com"},
+    "subject": "Indexed",
+    "body": "Indexed body",
+}
+
+
+@pytest.fixture(autouse=True)
+def unlimited_rate(monkeypatch):
+    # Paging through every tab takes more requests than the default list budget.
+    monkeypatch.setattr(
+        admission_controller,
+        "budgets",
+        {route_class: (1000.0, 1000.0) for route_class in admission_controller.budgets},
+    )
+
+
+def paged(client, filter_value, limit=3):
+    emails, offset = [], 0
+    while True:
+        page = client.get(f"/emails?filter={filter_value}&limit={limit}&offset={offset}").json()
+        if not page:
+            return emails
+        emails.extend(page)
+        offset += limit
+
+
+def assert_pages_match_sql(client):
+    for filter_value in ("all", "unread", "archived"):
+        assert paged(client, filter_value) == client.get(f"/emails?filter={filter_value}").json()
+
+
+def test_pages_come_from_index_in_sql_order(client):
+    job_queue.stop()
+    assert_pages_match_sql(client)
+    assert inbox_index.loaded
+    assert inbox_index.snapshot()["hits"] > 0
+
+
+def test_index_is_maintained_incrementally(client):
+    job_queue.stop()
+    assert_pages_match_sql(client)
+    loads = inbox_index.loads
+    client.put("/emails/1", json={"is_read": False})
+    client.put("/emails/3", json={"is_archived": True})
+    client.delete("/emails/4")
+    client.post("/emails", json=PAYLOAD)
+
+    assert_pages_match_sql(client)
+    assert inbox_index.loads == loads
+
+
+def test_writes_from_other_workers_are_applied_per_email(client, monkeypatch):
+    job_queue.stop()
+    assert_pages_match_sql(client)
+    monkeypatch.setattr(mailbox_version, "interval", 0)
+    loads, invalidations = inbox_index.loads, mailbox_version.invalidations
+
+    # Another worker's writes: committed through its own version tracker.
+    other_worker = MailboxVersion()
+    with database.get_db() as conn:
+        conn.execute("UPDATE emails SET is_read = 1 - is_read WHERE id IN (1, 2)")
+        conn.execute("DELETE FROM attachments WHERE email_id = 4")
+        conn.execute("DELETE FROM emails WHERE id = 4")
+        other_worker.bump(conn, [1, 2, 4])
+
+    assert_pages_match_sql(client)
+    assert inbox_index.loads == loads
+    assert mailbox_version.invalidations == invalidations
+
+
+def test_descending_dates_match_sqlite_order():
+    index = InboxIndex()
+    token = index.begin_load()
+    rows = [
+        (1, 0, 0, "2024-01-01", None),
+        (2, 0, 0, "2024-01-01T10:00:00", None),
+        (3, 1, 0, "2025-01-01", None),
+        (4, 0, 0, "2023-12-31", None),
+        (5, 0, 0, "2024-01-01", None),
+    ]
+    assert index.replace(rows, token)
+    assert index.page("all", 0, 10) == [2, 1, 5, 4, 3]
+    assert index.page("unread", 1, 2) == [1, 5]
+
+
+def test_filters_over_the_limit_fall_back_to_sql():
+    index = InboxIndex(max_entries=1)
+    index.replace([(1, 0, 0, "2024", None), (2, 1, 0, "2024", None)], index.begin_load())
+    assert index.page("all", 0, 10) is None
+    assert index.page("unread", 0, 10) == [1]
+
+
+def test_load_racing_a_write_is_discarded():
+    index = InboxIndex()
+    token = index.begin_load()
+    index.remove([1])
+    assert not index.replace([(1, 0, 0, "2024", None)], token)
+    assert not index.loaded
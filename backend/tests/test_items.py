@@ -0,0 +1,106 @@
+import pytest
+
+from app import database
+from app.repositories import item_repository
+
+
+def collect(client, **params):
+    items, cursor = [], None
+    while True:
+        page = client.get("/items", params={**params, **({"cursor": cursor} if cursor else {})}).json()
+        items.extend(page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return items
+
+
+def test_keyset_pages_cover_every_item_once(client):
+    created = client.post(
+        "/items/bulk", json={"upsert": [{"name": f"Item {index:03d}"} for index in range(25)]}
+    ).json()["upserted"]
+    assert len(created) == 25
+
+    items = collect(client, limit=7)
+    assert [item["id"] for item in items] == sorted(item["id"] for item in items)
+    assert len(items) == 28  # with the three sample items
+    assert client.get("/items", params={"limit": 100}).json()["next_cursor"] is None
+
+
+def test_prefix_filter_pages_by_name(client):
+    client.post(
+        "/items/bulk",
+        json={"upsert": [{"name": name} for name in ("Apricot", "Avocado", "apple", "Apple", "Ap\U0010ffff")]},
+    )
+
+    items = collect(client, prefix="Ap", limit=2)
+    assert [item["name"] for item in items] == ["Apple", "Apple", "Apricot", "Ap\U0010ffff"]
+    assert collect(client, prefix="\U0010ffff") == []
+    with database.get_db() as conn:
+        plan = conn.execute(
+            f"EXPLAIN QUERY PLAN {item_repository.STATEMENTS['page_by_name']}", ("Ap", 0, "Aq", 3)
+        ).fetchall()
+    assert "idx_items_name" in plan[0][-1]
+
+
+def test_cursor_must_match_the_listing(client):
+    cursor = client.get("/items", params={"limit": 1}).json()["next_cursor"]
+    assert client.get("/items", params={"cursor": cursor, "prefix": "A"}).status_code == 400
+    assert client.get("/items", params={"cursor": "not a cursor"}).status_code == 400
+
+
+def test_bulk_upserts_then_deletes(client):
+    result = client.post(
+        "/items/bulk",
+        json={"upsert": [{"id": 1, "name": "Green apple"}, {"id": 500, "name": "Fig"}], "delete": [2, 3, 999]},
+    ).json()
+
+    assert result == {
+        "upserted": [{"id": 1, "name": "Green apple"}, {"id": 500, "name": "Fig"}],
+        "deleted": 2,
+    }
+    assert client.get("/items").json()["items"] == [
+        {"id": 1, "name": "Green apple"},
+        {"id": 500, "name": "Fig"},
+    ]
+
+
+def test_bulk_request_is_one_transaction(client):
+    locked = client.post("/items", json={"name": "Locked"}).json()["id"]
+    with database.get_db() as conn:
+        conn.execute(
+            """
+            CREATE TRIGGER items_locked BEFORE DELETE ON items WHEN old.name = 'Locked'
+            BEGIN SELECT RAISE(ABORT, 'item is locked'); END
+            """
+        )
+    response = client.post(
+        "/items/bulk", json={"upsert": [{"name": "Kept?"}], "delete": [locked]}
+    )
+    assert response.status_code == 500
+    names = [item["name"] for item in client.get("/items").json()["items"]]
+    assert "Kept?" not in names and "Locked" in names
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"upsert": [{"id": 0, "name": "Zero"}]},
+        {"upsert": [{"id": -5, "name": "Negative"}]},
+        {"upsert": [{"id": 2**63, "name": "Huge"}]},
+        {"delete": [0]},
+        {"delete": [2**63]},
+    ],
+)
+def test_bulk_ids_outside_the_rowid_range_are_rejected(client, payload):
+    assert client.post("/items/bulk", json=payload).status_code == 422
+
+
+def test_single_item_mutations(client):
+    created = client.post("/items", json={"name": "Date"})
+    assert created.status_code == 201
+    item_id = created.json()["id"]
+    assert client.put(f"/items/{item_id}", json={"name": "Dates"}).json() == {"id": item_id, "name": "Dates"}
+    assert client.get(f"/items/{item_id}").json()["name"] == "Dates"
+    assert client.delete(f"/items/{item_id}").status_code == 204
+    assert client.delete(f"/items/{item_id}").status_code == 404
+    assert client.put(f"/items/{item_id}", json={"name": "Gone"}).status_code == 404
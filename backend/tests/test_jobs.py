@@ -0,0 +1,115 @@
+import time
+
+import pytest
+
+from app import database
+from app.jobs import JobQueue, job_queue
+
+
+@pytest.fixture()
+def queue(client):
+    # Keep the app's own workers and periodic jobs out of the way.
+    job_queue.stop()
+    with database.get_db() as conn:
+        conn.execute("DELETE FROM jobs")
+    return JobQueue(workers=0, visibility_timeout=30)
+
+
+def job_rows():
+    with database.get_db() as conn:
+        return [
+            tuple(row)
+            for row in conn.execute("SELECT kind, status, attempts FROM jobs ORDER BY id").fetchall()
+        ]
+
+
+def test_jobs_run_after_commit_and_only_once(queue):
+    seen = []
+    queue.register("record")(lambda conn, payload: seen.append(payload["value"]))
+
+    with database.get_db() as conn:
+        queue.enqueue(conn, "record", {"value": 1})
+
+    assert queue.run_pending() == 1
+    assert queue.run_pending() == 0
+    assert seen == [1]
+    assert job_rows() == [("record", "done", 1)]
+
+
+def test_rolled_back_enqueue_leaves_no_job(queue):
+    with pytest.raises(RuntimeError):
+        with database.get_db() as conn:
+            queue.enqueue(conn, "record", {})
+            raise RuntimeError("abort")
+
+    assert job_rows() == []
+
+
+def test_dedup_key_collapses_pending_jobs(queue):
+    with database.get_db() as conn:
+        first = queue.enqueue(conn, "record", {}, dedup_key="email:1")
+        second = queue.enqueue(conn, "record", {}, dedup_key="email:1")
+
+    assert first is not None
+    assert second is None
+    assert len(job_rows()) == 1
+
+
+def test_failures_are_retried_until_max_attempts(queue, monkeypatch):
+    monkeypatch.setattr("app.jobs.RETRY_BASE_SECONDS", 0)
+    calls = []
+
+    @queue.register("flaky")
+    def flaky(conn, payload):
+        calls.append(True)
+        raise ValueError("nope")
+
+    with database.get_db() as conn:
+        queue.enqueue(conn, "flaky", {}, max_attempts=2)
+
+    queue.run_pending()
+    assert len(calls) == 2
+    assert job_rows() == [("flaky", "failed", 2)]
+    assert queue.failed == 1 and queue.retried == 1
+
+
+def test_expired_claims_become_visible_again(queue):
+    queue.register("record")(lambda conn, payload: None)
+    with database.get_db() as conn:
+        queue.enqueue(conn, "record", {})
+
+    claimed = queue._claim()
+    assert claimed is not None
+    assert queue._claim() is None
+
+    with database.get_db() as conn:
+        conn.execute("UPDATE jobs SET locked_until = ?", (time.time() - 1,))
+
+    assert queue.run_pending() == 1
+    assert job_rows() == [("record", "done", 2)]
+
+
+def test_queue_stats_are_exposed(queue, client):
+    resp = client.get("/admin/stats")
+    assert resp.status_code == 200
+    assert resp.json()["jobs"]["depth"] == {"pending": 0, "running": 0, "failed": 0}
+
+
+def test_stale_claim_rolls_back_and_is_not_completed(queue):
+    @queue.register("slow")
+    def slow(conn, payload):
+        # Meanwhile the claim expires and another worker claims the job again.
+        with database.get_db() as other:
+            other.execute("UPDATE jobs SET attempts = attempts + 1")
+        conn.execute("INSERT INTO contacts (name, email) VALUES ('Stale', 'stale@example.com')")
+
+    with database.get_db() as conn:
+        queue.enqueue(conn, "slow", {})
+
+    assert queue.run_pending(limit=1) == 1
+    assert queue.completed == 0 and queue.failed == 0 and queue.retried == 0
+    assert job_rows() == [("slow", "running", 2)]
+    with database.get_db() as conn:
+        assert conn.execute(
+            "SELECT COUNT(*) FROM contacts WHERE email = 'stale@example.com'"
+        ).fetchone()[0] == 0
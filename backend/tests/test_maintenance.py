@@ -0,0 +1,76 @@
+from app import database
+from app.jobs import job_queue
+from app.middleware import admission_controller
+from app.services import maintenance_service
+from app.services.maintenance_service import Maintenance
+
+
+def churn(client, monkeypatch, count=40):
+    monkeypatch.setattr(
+        admission_controller, "budgets", {name: (1000.0, 1000.0) for name in admission_controller.budgets}
+    )
+    ids = []
+    for index in range(count):
+        response = client.post(
+            "/emails",
+            json={
+                "recipient": {"name": "Churn", "email": "churn@example.com"},
+                "subject": f"Churn {index}",
+                "body": "x" * 20000,
+            },
+        )
+        ids.append(response.json()["id"])
+    for email_id in ids:
+        assert client.delete(f"/emails/{email_id}").status_code == 204
+
+
+def test_migrations_enable_incremental_vacuum(client):
+    with database.get_db() as conn:
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+
+
+def test_run_frees_pages_and_refreshes_statistics(client, monkeypatch):
+    job_queue.stop()
+    churn(client, monkeypatch)
+    maintenance = Maintenance(budget=30)
+    with database.get_db() as conn:
+        conn.execute("DROP TABLE IF EXISTS sqlite_stat1")
+        assert conn.execute("PRAGMA freelist_count").fetchone()[0] > 0
+        first = maintenance.run(conn)
+        second = maintenance.run(conn)
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        analyzed = conn.execute("SELECT COUNT(*) FROM sqlite_stat1").fetchone()[0]
+
+    assert first["statistics"]["action"] == "analyze"
+    assert second["statistics"]["action"] == "optimize"
+    assert analyzed > 0
+    assert first["vacuum"]["main"]["freed_pages"] > 0
+    assert first["completed"] and first["skipped"] == []
+    assert first["checkpoint"]["mode"] in ("passive", "truncate")
+    assert free_pages == 0
+    assert maintenance.snapshot()["last_run"] is second
+
+
+def test_budget_limits_the_run(client, monkeypatch):
+    churn(client, monkeypatch, count=5)
+    with database.get_db() as conn:
+        report = Maintenance(budget=0).run(conn)
+    assert report["vacuum"] == {}
+    assert "vacuum:main" in report["skipped"] and report["skipped"][-1] == "checkpoint"
+    assert not report["completed"]
+
+
+def test_job_defers_while_busy(client, monkeypatch):
+    job_queue.stop()
+    maintenance = Maintenance()
+    monkeypatch.setattr(maintenance_service, "maintenance", maintenance)
+    monkeypatch.setattr(admission_controller, "in_flight", maintenance_service.MAX_IN_FLIGHT + 1)
+    with database.get_db() as conn:
+        assert maintenance_service.maintenance_job(conn, {}) == maintenance_service.BUSY_RETRY_SECONDS
+    assert maintenance.deferred == 1 and maintenance.runs == 0
+
+    monkeypatch.setattr(admission_controller, "in_flight", 0)
+    monkeypatch.setattr(maintenance_service, "MAX_REQUEST_RATE", float("inf"))
+    with database.get_db() as conn:
+        assert maintenance_service.maintenance_job(conn, {}) is None
+    assert maintenance.runs == 1
@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import textwrap
+
+import pytest
+
+import migrate
+
+
+@pytest.fixture()
+def migrations_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(migrate, "DATABASE_PATH", str(tmp_path / "migrate.db"))
+    directory = tmp_path / "migrations"
+    directory.mkdir()
+    return directory
+
+
+def write_migration(directory, name, source):
+    (directory / f"{name}.py").write_text(textwrap.dedent(source))
+
+
+def query(sql):
+    conn = sqlite3.connect(migrate.DATABASE_PATH)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_upgrade_sets_schema_version_and_skips_when_current(migrations_dir, monkeypatch):
+    write_migration(
+        migrations_dir,
+        "001_widgets",
+        """
+        def upgrade(conn):
+            conn.execute("CREATE TABLE widgets (id INTEGER PRIMARY KEY)")
+
+        def downgrade(conn):
+            conn.execute("DROP TABLE widgets")
+        """,
+    )
+
+    migrate.run_migrations("upgrade", str(migrations_dir))
+    assert query("PRAGMA user_version") == [(1,)]
+
+    def fail_load(filepath):
+        raise AssertionError("modules must not be loaded when nothing is pending")
+
+    monkeypatch.setattr(migrate, "load_migration_module", fail_load)
+    migrate.run_migrations("upgrade", str(migrations_dir))
+
+
+def test_failed_migration_is_rolled_back(migrations_dir):
+    write_migration(
+        migrations_dir,
+        "001_broken",
+        """
+        def upgrade(conn):
+            conn.execute("CREATE TABLE half_done (id INTEGER PRIMARY KEY)")
+            raise RuntimeError("boom")
+
+        def downgrade(conn):
+            pass
+        """,
+    )
+
+    with pytest.raises(RuntimeError):
+        migrate.run_migrations("upgrade", str(migrations_dir))
+
+    assert query("SELECT name FROM sqlite_master WHERE name = 'half_done'") == []
+    assert query("SELECT name FROM _migrations") == []
+    assert query("PRAGMA user_version") == [(0,)]
+
+
+def test_backfill_resumes_from_last_committed_batch(migrations_dir, monkeypatch):
+    write_migration(
+        migrations_dir,
+        "001_numbers",
+        """
+        import os
+
+        def upgrade(conn):
+            conn.execute("CREATE TABLE numbers (id INTEGER PRIMARY KEY, doubled INTEGER)")
+            conn.executemany("INSERT INTO numbers (id) VALUES (?)", [(i,) for i in range(1, 11)])
+
+        def backfill(conn, position, batch_size):
+            if position == 4 and os.environ.get("FAIL_BACKFILL"):
+                raise RuntimeError("interrupted")
+            rows = conn.execute(
+                "SELECT id FROM numbers WHERE id > ? ORDER BY id LIMIT ?",
+                (position or 0, batch_size),
+            ).fetchall()
+            if not rows:
+                return None
+            conn.executemany("UPDATE numbers SET doubled = id * 2 WHERE id = ?", rows)
+            return rows[-1][0]
+
+        def downgrade(conn):
+            conn.execute("DROP TABLE numbers")
+        """,
+    )
+    monkeypatch.setattr(migrate, "BACKFILL_BATCH_SIZE", 4)
+    monkeypatch.setenv("FAIL_BACKFILL", "1")
+
+    with pytest.raises(RuntimeError):
+        migrate.run_migrations("upgrade", str(migrations_dir))
+
+    assert query("SELECT COUNT(*) FROM numbers WHERE doubled IS NOT NULL") == [(4,)]
+    assert query("SELECT position, completed_at FROM _backfills") == [(4, None)]
+    assert query("PRAGMA user_version") == [(0,)]
+
+    monkeypatch.delenv("FAIL_BACKFILL")
+    migrate.run_migrations("upgrade", str(migrations_dir))
+
+    assert query("SELECT COUNT(*) FROM numbers WHERE doubled = id * 2") == [(10,)]
+    assert query("PRAGMA user_version") == [(1,)]
+
+
+def test_downgrade_reverts_schema_version(migrations_dir):
+    write_migration(
+        migrations_dir,
+        "001_widgets",
+        """
+        def upgrade(conn):
+            conn.execute("CREATE TABLE widgets (id INTEGER PRIMARY KEY)")
+
+        def downgrade(conn):
+            conn.execute("DROP TABLE widgets")
+        """,
+    )
+
+    migrate.run_migrations("upgrade", str(migrations_dir))
+    migrate.run_migrations("downgrade", str(migrations_dir))
+
+    assert query("SELECT name FROM sqlite_master WHERE name = 'widgets'") == []
+    assert query("PRAGMA user_version") == [(0,)]
+
+
+def test_non_transactional_migration_runs_outside_a_transaction(migrations_dir):
+    write_migration(
+        migrations_dir,
+        "001_vacuum",
+        """
+        TRANSACTIONAL = False
+
+        def upgrade(conn):
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+
+        def downgrade(conn):
+            conn.execute("PRAGMA auto_vacuum = NONE")
+            conn.execute("VACUUM")
+        """,
+    )
+
+    migrate.run_migrations("upgrade", str(migrations_dir))
+    assert query("PRAGMA auto_vacuum") == [(2,)]
+    assert query("SELECT name FROM _migrations") == [("001_vacuum",)]
+    assert query("PRAGMA user_version") == [(1,)]
+
+    migrate.run_migrations("downgrade", str(migrations_dir))
+    assert query("PRAGMA auto_vacuum") == [(0,)]
+    assert query("SELECT name FROM _migrations") == []
+
+
+def test_contact_normalization_links_emails_written_during_the_backfill():
+    module = migrate.load_migration_module(
+        os.path.join(migrate.MIGRATIONS_DIR, "008_normalize_email_contacts.py")
+    )
+    conn = sqlite3.connect(":memory:")
+    conn.executescript(
+        """
+        CREATE TABLE contacts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, email TEXT NOT NULL,
+            avatar TEXT, frequency INTEGER NOT NULL DEFAULT 0, last_seen TEXT,
+            UNIQUE (email, name)
+        );
+        CREATE TABLE emails (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sender_name TEXT NOT NULL, sender_email TEXT NOT NULL, sender_avatar TEXT,
+            recipient_name TEXT NOT NULL, recipient_email TEXT NOT NULL, date TEXT
+        );
+        INSERT INTO emails (sender_name, sender_email, recipient_name, recipient_email, date)
+        VALUES ('Ann', 'ann@x.com', 'Bob', 'bob@x.com', '2024-01-01');
+        """
+    )
+    module.upgrade(conn)
+    assert module.backfill(conn, None, 10) == 1
+    assert module.backfill(conn, 1, 10) is None
+
+    # The previous release keeps serving until the migration finishes.
+    conn.execute(
+        "INSERT INTO emails (sender_name, sender_email, recipient_name, recipient_email, date) "
+        "VALUES ('Cy', 'cy@x.com', 'Ann', 'ann@x.com', '2024-01-02')"
+    )
+    conn.execute(
+        "UPDATE emails SET recipient_name = 'Dee', recipient_email = 'dee@x.com' WHERE id = 1"
+    )
+    module.finalize(conn)
+
+    linked = conn.execute(
+        """
+        SELECT emails.id, sender.email, recipient.email
+        FROM emails
+        JOIN contacts AS sender ON sender.id = emails.sender_id
+        JOIN contacts AS recipient ON recipient.id = emails.recipient_id
+        ORDER BY emails.id
+        """
+    ).fetchall()
+    assert linked == [(1, "ann@x.com", "dee@x.com"), (2, "cy@x.com", "ann@x.com")]
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(emails)").fetchall()}
+    assert "sender_name" not in columns
@@ -0,0 +1,68 @@
+import pytest
+
+from app import database
+from app.jobs import job_queue
+from app.repositories import email_repository
+from app.services import archive_service
+
+
+@pytest.fixture()
+def mailbox(client):
+    job_queue.stop()
+    with database.get_db() as conn:
+        # Enough emails, with matches spread over every range and duplicate dates.
+        conn.execute(
+            """
+            WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 200)
+            INSERT INTO emails (sender_id, recipient_id, subject, preview, body, date, is_read, is_archived)
+            SELECT 1, 2, 'Order ' || (i % 7) || '-XK' || i, '', 'Body ' || i,
+                   '2024-11-' || printf('%02d', 1 + i % 20) || 'T10:00:00', i % 3 = 0, i % 5 = 0
+            FROM n
+            """
+        )
+    return client
+
+
+def _ids(emails):
+    return [email.id for email in emails]
+
+
+@pytest.mark.parametrize(
+    "filter_value, search_value",
+    [("all", "XK1"), ("unread", "Order 3"), ("all", "jane"), ("all", "no such text")],
+)
+def test_parallel_search_matches_the_single_scan(mailbox, monkeypatch, filter_value, search_value):
+    with database.get_db() as conn:
+        expected = _ids(email_repository.list_emails(conn, filter_value, search_value))
+
+    monkeypatch.setattr(email_repository, "SEARCH_WORKERS", 4)
+    monkeypatch.setattr(email_repository, "PARALLEL_SEARCH_MIN_EMAILS", 1)
+    scanned = []
+    scan_range = email_repository._scan_range
+
+    def record_range(name, params):
+        scanned.append(params[:2])
+        return scan_range(name, params)
+
+    monkeypatch.setattr(email_repository, "_scan_range", record_range)
+    with database.get_db() as conn:
+        assert _ids(email_repository.list_emails(conn, filter_value, search_value)) == expected
+
+    # Four adjacent ranges cover every id.
+    scanned.sort()
+    assert len(scanned) == 4
+    assert scanned[0][0] == 1
+    assert all(previous[1] + 1 == following[0] for previous, following in zip(scanned, scanned[1:]))
+
+
+def test_small_mailboxes_and_cold_archive_keep_the_single_scan(mailbox, monkeypatch):
+    monkeypatch.setattr(email_repository, "SEARCH_WORKERS", 4)
+    monkeypatch.setattr(email_repository, "_scan_range", None)
+    with database.get_db() as conn:
+        # Below the threshold the ranges are not worth their connections.
+        assert email_repository.list_emails(conn, "all", "XK1")
+
+        monkeypatch.setattr(email_repository, "PARALLEL_SEARCH_MIN_EMAILS", 1)
+        archive_service.run_retention_batch(conn)
+    with database.get_db() as conn:
+        assert email_repository.list_emails(conn, "archived", "Annual")
@@ -0,0 +1,79 @@
+import importlib
+import sys
+from collections import deque
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import profiling
+from app.middleware import admission_controller
+
+
+@pytest.fixture()
+def profiled_client(client, monkeypatch):
+    monkeypatch.setattr(profiling, "ENABLED", True)
+    monkeypatch.setattr(profiling.profile_store, "_profiles", deque(maxlen=3))
+    monkeypatch.setattr(
+        admission_controller, "budgets", {name: (1000.0, 1000.0) for name in admission_controller.budgets}
+    )
+    main = importlib.reload(sys.modules["app.main"])
+    with TestClient(main.app, headers=client.headers) as test_client:
+        yield test_client
+    monkeypatch.undo()
+    importlib.reload(sys.modules["app.main"])
+
+
+def test_profiling_middleware_is_not_installed_by_default(client):
+    from app.main import app
+
+    assert not any(m.cls is profiling.ProfilingMiddleware for m in app.user_middleware)
+    response = client.get("/emails", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+
+
+def test_header_profiles_a_search_request(profiled_client):
+    plain = profiled_client.get("/emails?search=proposal")
+    assert "x-profile-id" not in plain.headers
+
+    response = profiled_client.get(
+        "/emails?search=proposal&filter=all", headers={"X-Profile": "1"}
+    )
+    assert response.status_code == 200
+    assert response.json() == plain.json()
+    profile_id = int(response.headers["x-profile-id"])
+
+    profile = profiled_client.get(f"/admin/profiles/{profile_id}").json()
+    assert profile["path"] == "/emails"
+    # Search terms are user data; only the shape of the query is kept.
+    assert profile["query"] == "search=*&filter=all"
+    assert profile["status"] == 200
+    # Coalescing only merges concurrent requests, so this one ran the query itself.
+    for name in ("sql", "serialize", "encode", "other"):
+        assert profile["phases"][name]["seconds"] >= 0
+    assert any("list_emails" in row["function"] for row in profile["functions"])
+
+
+def test_profiles_are_kept_in_a_ring_buffer(profiled_client):
+    ids = [
+        int(profiled_client.get("/emails", headers={"X-Profile": "1"}).headers["x-profile-id"])
+        for _ in range(5)
+    ]
+    listed = profiled_client.get("/admin/profiles").json()
+    assert [profile["id"] for profile in listed] == ids[:1:-1]
+    assert "functions" not in listed[0]
+    assert profiled_client.get(f"/admin/profiles/{ids[0]}").status_code == 404
+    assert profiled_client.get("/admin/stats").json()["profiling"]["buffered"] == 3
+
+
+def test_sample_rate_profiles_without_header(profiled_client, monkeypatch):
+    monkeypatch.setattr(profiling, "SAMPLE_RATE", 1.0)
+    assert "x-profile-id" in profiled_client.get("/contacts?prefix=j").headers
+    monkeypatch.setattr(profiling, "SAMPLE_RATE", 0.0)
+    assert "x-profile-id" not in profiled_client.get("/contacts?prefix=j").headers
+
+
+def test_phase_is_a_no_op_outside_profiled_requests():
+    with profiling.phase("sql"):
+        pass
+    assert profiling.phase("sql") is profiling.phase("encode")
@@ -0,0 +1,93 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+from app import database
+from app.services.send_scheduler import send_scheduler
+
+PAYLOAD = {
+    "recipient": {"name": "Jane Doe", "email": "jane@example.com"},
+    "subject": "Later",
+    "body": "Scheduled body",
+}
+
+
+def in_seconds(seconds):
+    return (datetime.now(timezone.utc) + timedelta(seconds=seconds)).isoformat()
+
+
+def listed_ids(client):
+    return [email["id"] for email in client.get("/emails").json()]
+
+
+def test_scheduled_email_is_hidden_until_due(client):
+    resp = client.post("/emails", json={**PAYLOAD, "scheduled_at": in_seconds(3600)})
+    assert resp.status_code == 201
+    created = resp.json()
+    assert created["scheduled_at"] is not None
+    assert created["date"] == created["scheduled_at"]
+
+    assert created["id"] not in listed_ids(client)
+    assert client.get(f"/emails/{created['id']}").json()["scheduled_at"] == created["scheduled_at"]
+    assert send_scheduler.snapshot()["pending"] == 1
+
+
+def test_scheduled_email_is_delivered_when_due(client):
+    created = client.post("/emails", json={**PAYLOAD, "scheduled_at": in_seconds(1)}).json()
+
+    deadline = time.monotonic() + 5
+    while created["id"] not in listed_ids(client) and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+    delivered = client.get(f"/emails/{created['id']}").json()
+    assert delivered["scheduled_at"] is None
+    assert delivered["date"] == created["scheduled_at"]
+    assert created["id"] in listed_ids(client)
+
+
+def test_past_schedule_sends_immediately(client):
+    created = client.post("/emails", json={**PAYLOAD, "scheduled_at": in_seconds(-60)}).json()
+    assert created["scheduled_at"] is None
+    assert created["id"] in listed_ids(client)
+
+
+def test_pending_emails_are_reloaded_on_start(client):
+    send_scheduler.stop()
+    due = in_seconds(3600)
+    created = client.post("/emails", json={**PAYLOAD, "scheduled_at": due}).json()
+    with database.get_db() as conn:
+        conn.execute("UPDATE emails SET scheduled_at = ? WHERE id = ?", (in_seconds(-1), int(created["id"])))
+
+    send_scheduler.start()
+    deadline = time.monotonic() + 5
+    while created["id"] not in listed_ids(client) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert created["id"] in listed_ids(client)
+
+
+def test_far_future_schedule_keeps_the_scheduler_alive(client):
+    send_scheduler.stop()
+    created = client.post("/emails", json={**PAYLOAD, "scheduled_at": in_seconds(3600)}).json()
+    # Written directly, as an email scheduled before the API limit existed.
+    with database.get_db() as conn:
+        conn.execute(
+            "UPDATE emails SET scheduled_at = '2999-01-01T00:00:00+00:00' WHERE id = ?",
+            (int(created["id"]),),
+        )
+
+    send_scheduler.start()
+    time.sleep(0.2)
+    assert send_scheduler._thread.is_alive()
+    assert send_scheduler.snapshot()["pending"] == 1
+
+    # Later schedules are still delivered.
+    soon = client.post("/emails", json={**PAYLOAD, "scheduled_at": in_seconds(1)}).json()
+    deadline = time.monotonic() + 5
+    while soon["id"] not in listed_ids(client) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert soon["id"] in listed_ids(client)
+
+
+def test_out_of_range_schedule_is_rejected(client):
+    for scheduled_at in ("2999-01-01T00:00:00Z", "9999-12-31T23:59:59+00:00"):
+        resp = client.post("/emails", json={**PAYLOAD, "scheduled_at": scheduled_at})
+        assert resp.status_code == 422
@@ -0,0 +1,58 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app.services.single_flight import SingleFlight
+
+
+def run_concurrently(flight, key, fn, callers=5):
+    started = threading.Barrier(callers)
+
+    def call():
+        started.wait()
+        return flight.do(key, fn)
+
+    with ThreadPoolExecutor(callers) as pool:
+        return [future.result() for future in [pool.submit(call) for _ in range(callers)]]
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    release = threading.Event()
+    executions = []
+
+    def slow():
+        executions.append(True)
+        release.wait(5)
+        return b"[]"
+
+    threading.Timer(0.2, release.set).start()
+    results = run_concurrently(flight, ("unread", None, 1), slow)
+
+    assert results == [b"[]"] * 5
+    assert len(executions) == 1
+    assert flight.snapshot()["coalesced"] == 4
+    assert flight.snapshot()["in_flight"] == 0
+
+
+def test_errors_propagate_to_waiters_and_are_not_cached():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def failing():
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    threading.Timer(0.2, release.set).start()
+    with pytest.raises(RuntimeError):
+        run_concurrently(flight, "key", failing, callers=3)
+
+    assert flight.do("key", lambda: "ok") == "ok"
+
+
+def test_list_response_is_unchanged(client):
+    emails = client.get("/emails?filter=all").json()
+    assert emails[0]["sender"]["name"]
+    assert client.get("/emails?search=Proposal").json()[0]["id"] == "2"
+    assert "list_coalescing" in client.get("/admin/stats").json()
@@ -0,0 +1,94 @@
+from app import database
+from app.jobs import job_queue
+from app.repositories import email_repository
+from app.services import archive_service, stats_service
+
+PAYLOAD = {
+    "recipient": {"name": "Jane Doe", "email": "jane@example.com"},
+    "subject": "Numbers",
+    "body": "Quarterly numbers attached",
+    "attachments": [{"filename": "q3.xlsx", "size": "250 KB", "url": "/files/q3.xlsx"}],
+}
+
+
+def stats(client):
+    resp = client.get("/emails/stats")
+    assert resp.status_code == 200
+    body = resp.json()
+    body.pop("rebuilt_at")
+    return body
+
+
+def rebuilt(client):
+    with database.get_db() as conn:
+        stats_service.rebuild_stats(conn)
+    return stats(client)
+
+
+def test_stats_are_built_from_existing_mail(client):
+    body = stats(client)
+    assert body["totals"] == {
+        "messages": 8,
+        "unread": 2,
+        "attachments": 1,
+        "attachment_bytes": 1_500_000,
+    }
+    assert body["unread_backlog"]["oldest_day"] == "2024-12-10"
+    assert [day["day"] for day in body["daily"]] == ["2024-12-11", "2024-12-10"]
+    top = body["top_senders"][0]
+    assert top["sender"]["name"] == "Downe Johnson"
+    assert top["messages"] == 2
+
+
+def test_writes_update_rollups_incrementally(client):
+    job_queue.stop()
+    client.post("/emails", json=PAYLOAD)
+    client.put("/emails/1", json={"is_read": True})
+    client.put("/emails/2", json={"attachments": []})
+    client.delete("/emails/3")
+
+    body = stats(client)
+    assert body["totals"] == {
+        "messages": 8,
+        "unread": 1,
+        "attachments": 1,
+        "attachment_bytes": 250_000,
+    }
+    assert body == rebuilt(client)
+
+
+def test_scheduled_and_archived_mail(client):
+    job_queue.stop()
+    with database.get_db() as conn:
+        scheduled = email_repository.create_email(
+            conn,
+            sender_name="Richard Brown",
+            sender_email="richard@example.com",
+            sender_avatar=None,
+            recipient_name="Jane Doe",
+            recipient_email="jane@example.com",
+            subject="Later",
+            preview="Later",
+            body="Later",
+            date="2030-01-01T00:00:00+00:00",
+            attachments=[],
+            scheduled_at="2030-01-01T00:00:00+00:00",
+        )
+    assert stats(client)["totals"]["messages"] == 8
+
+    with database.get_db() as conn:
+        email_repository.deliver_scheduled(conn, [int(scheduled["id"])], "2030-01-01T00:00:00+00:00")
+    assert stats(client)["daily"][0] == {
+        "day": "2030-01-01",
+        "messages": 1,
+        "unread": 0,
+        "attachments": 0,
+        "attachment_bytes": 0,
+    }
+
+    with database.get_db() as conn:
+        archive_service.run_retention_batch(conn)
+    assert stats(client)["totals"]["messages"] == 9
+    client.delete("/emails/8")
+    assert stats(client)["totals"]["messages"] == 8
+    assert stats(client) == rebuilt(client)
@@ -0,0 +1,73 @@
+import pytest
+
+from app import database
+from app.jobs import job_queue
+from app.repositories import email_repository
+from app.services import archive_service, email_service
+
+
+@pytest.fixture()
+def streaming(client, monkeypatch):
+    job_queue.stop()
+    monkeypatch.setattr(email_service, "STREAM_LISTS", True)
+    monkeypatch.setattr(email_service, "STREAM_BATCH_SIZE", 2)
+    return client
+
+
+@pytest.mark.parametrize(
+    "filter_value, search_value",
+    [("all", None), ("unread", None), ("archived", None), ("all", "meeting"), ("all", "no such text")],
+)
+def test_stream_matches_encoded_list(client, filter_value, search_value):
+    job_queue.stop()
+    with database.get_db() as conn:
+        archive_service.run_retention_batch(conn)
+        expected = email_service.encode_email_list(
+            email_repository.list_emails(conn, filter_value, search_value)
+        )
+        count = len(email_repository.list_emails(conn, filter_value, search_value))
+        chunks = list(email_service.stream_email_list(conn, filter_value, search_value, batch_size=3))
+
+    assert b"".join(chunks) == expected
+    # One chunk per batch, plus the closing bracket.
+    assert len(chunks) == -(-count // 3) + 1
+
+
+def test_streamed_response_is_identical(streaming, monkeypatch):
+    streamed = streaming.get("/emails", headers={"Accept-Encoding": "identity"})
+    monkeypatch.setattr(email_service, "STREAM_LISTS", False)
+    buffered = streaming.get("/emails", headers={"Accept-Encoding": "identity"})
+
+    assert streamed.status_code == 200
+    assert streamed.headers["content-type"] == "application/json"
+    assert "content-length" not in streamed.headers
+    assert streamed.content == buffered.content
+    # Paged requests are small and keep the buffered path.
+    assert "content-length" in streaming.get("/emails?limit=2").headers
+
+
+def test_abandoned_stream_releases_its_snapshot(client):
+    with database.get_db() as conn:
+        batches = email_repository.iter_email_batches(conn, "all", None, 1)
+        next(batches)
+        batches.close()
+
+        other = database.connect()
+        try:
+            other.execute("UPDATE emails SET subject = 'After the stream' WHERE id = 1")
+            other.commit()
+        finally:
+            other.close()
+        # A statement left open would still be reading the old snapshot.
+        assert conn.execute("SELECT subject FROM emails WHERE id = 1").fetchone()[0] == "After the stream"
+
+
+def test_slow_stream_is_cut_off(streaming, monkeypatch):
+    monkeypatch.setattr(email_service, "STREAM_MAX_SECONDS", 0)
+    # The first batch is sent; reading the next one is past the deadline.
+    with pytest.raises(ExceptionGroup) as aborted:
+        streaming.get("/emails", headers={"Accept-Encoding": "identity"})
+    assert aborted.group_contains(TimeoutError)
+    with database.get_db() as conn:
+        busy, _, _ = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+    assert busy == 0
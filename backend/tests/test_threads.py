@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta, timezone
+
+from app import database
+from app.jobs import job_queue
+from app.repositories import thread_repository
+from app.services import archive_service
+
+
+def _reply(client, subject, **extra):
+    payload = {
+        "recipient": {"name": "Jane Doe", "email": "jane.doe@business.com"},
+        "subject": subject,
+        "body": "Sounds good, let us talk tomorrow.",
+        **extra,
+    }
+    response = client.post("/emails", json=payload)
+    assert response.status_code == 201
+    return response.json()
+
+
+def _threads(client, **params):
+    response = client.get("/threads", params=params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def _thread(client, thread_id):
+    return next(thread for thread in _threads(client)["items"] if thread["id"] == thread_id)
+
+
+def test_base_subject_strips_reply_prefixes():
+    assert thread_repository.base_subject("RE: Fwd:  re[2]: Proposal   for you") == "Proposal for you"
+    assert thread_repository.thread_key(3, 2, "Re: Hello") == thread_repository.thread_key(2, 3, "HELLO")
+    assert thread_repository.thread_key(2, 3, "Hello") != thread_repository.thread_key(2, 4, "Hello")
+
+
+def test_existing_mail_is_threaded(client):
+    page = _threads(client)
+    assert page["next_cursor"] is None
+    activity = [(thread["last_activity"], int(thread["id"])) for thread in page["items"]]
+    assert activity == sorted(activity, reverse=True)
+    invitation = next(
+        thread for thread in page["items"] if thread["subject"] == "Invitation: Annual Client Appreciation"
+    )
+    assert invitation["messages"] == 2
+    first, second = client.get("/emails/5").json(), client.get("/emails/8").json()
+    assert first["thread_id"] == second["thread_id"] == invitation["id"]
+
+
+def test_replies_join_the_thread(client):
+    job_queue.stop()
+    original = client.get("/emails/2").json()
+    thread = _thread(client, original["thread_id"])
+
+    by_subject = _reply(client, "RE:  proposal for partnership")
+    by_reference = _reply(client, "Next steps", in_reply_to=2)
+    assert by_subject["thread_id"] == by_reference["thread_id"] == original["thread_id"]
+
+    updated = _thread(client, original["thread_id"])
+    assert updated["messages"] == thread["messages"] + 2
+    assert updated["subject"] == "Proposal for Partnership"
+    assert updated["last_activity"] == by_reference["date"]
+    # The most recently active thread comes first.
+    assert _threads(client, limit=1)["items"][0]["id"] == original["thread_id"]
+
+    other = _reply(
+        client, "Proposal for Partnership", recipient={"name": "Ann", "email": "ann@example.com"}
+    )
+    assert other["thread_id"] != original["thread_id"]
+
+
+def test_read_and_delete_update_counts(client):
+    job_queue.stop()
+    original = client.get("/emails/2").json()
+    assert original["is_read"] is False
+    thread_id = original["thread_id"]
+    unread = _thread(client, thread_id)["unread"]
+
+    assert client.put("/emails/2", json={"is_read": True}).status_code == 200
+    assert _thread(client, thread_id)["unread"] == unread - 1
+
+    reply = _reply(client, "Re: Proposal for Partnership")
+    assert _thread(client, thread_id)["last_activity"] == reply["date"]
+    assert client.delete(f"/emails/{reply['id']}").status_code == 204
+    thread = _thread(client, thread_id)
+    assert thread["messages"] == 1
+    assert thread["last_activity"] == original["date"]
+
+    assert client.delete("/emails/2").status_code == 204
+    assert thread_id not in [thread["id"] for thread in _threads(client)["items"]]
+
+
+def test_archived_mail_keeps_its_thread(client):
+    job_queue.stop()
+    with database.get_db() as conn:
+        archive_service.run_retention_batch(conn)
+        assert conn.execute("SELECT COUNT(*) FROM cold.emails WHERE id = 8").fetchone()[0] == 1
+    thread_id = client.get("/emails/8").json()["thread_id"]
+
+    reply = _reply(client, "Thanks!", in_reply_to=8)
+    assert reply["thread_id"] == thread_id
+    assert _thread(client, thread_id)["messages"] == 3
+
+    assert client.delete(f"/emails/{reply['id']}").status_code == 204
+    assert client.delete("/emails/5").status_code == 204
+    thread = _thread(client, thread_id)
+    assert thread["messages"] == 1
+    assert thread["last_activity"] == client.get("/emails/8").json()["date"]
+
+
+def test_threads_are_paged_by_cursor(client):
+    seen = []
+    cursor = None
+    while True:
+        page = _threads(client, limit=3, **({"cursor": cursor} if cursor else {}))
+        seen.extend(thread["id"] for thread in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [thread["id"] for thread in _threads(client)["items"]]
+    assert len(seen) == 7
+
+    assert client.get("/threads?cursor=not-a-cursor").status_code == 400
+    assert client.get("/threads?cursor=WzFd").status_code == 400
+
+
+def test_scheduled_mail_has_no_visible_thread(client):
+    job_queue.stop()
+    next_month = (datetime.now(timezone.utc) + timedelta(days=30)).isoformat()
+    scheduled = _reply(client, "Brand new topic", scheduled_at=next_month)
+    thread_id = scheduled["thread_id"]
+    assert thread_id not in [thread["id"] for thread in _threads(client)["items"]]
+
+    assert client.delete(f"/emails/{scheduled['id']}").status_code == 204
+    with database.get_db() as conn:
+        assert conn.execute("SELECT id FROM threads WHERE id = ?", (thread_id,)).fetchone() is None
@@ -0,0 +1,39 @@
+from app import database
+from app.repositories import email_repository
+from app.warmup import Warmup, warmup
+
+
+def test_ready_flips_after_warmup(client):
+    assert client.get("/health").json() == {"status": "healthy"}
+    assert warmup.ready
+    assert client.get("/ready").json() == {"status": "ready"}
+    report = client.get("/admin/stats").json()["warmup"]["report"]
+    assert report["error"] is None
+    assert report["steps"]["connections"]["opened"] == database.POOL_SIZE
+    assert report["steps"]["indexes"]["entries"]["idx_emails_listing"] > 0
+    assert "cProfile" in report["steps"]["modules"]["imported"]
+
+
+def test_not_ready_until_warmup_finishes(client, monkeypatch):
+    from app.routes import health
+
+    monkeypatch.setattr(health, "warmup", Warmup())
+    assert client.get("/ready").status_code == 503
+    assert client.get("/health").status_code == 200
+
+
+def test_failed_warmup_stays_unready(client, monkeypatch):
+    def broken(conn):
+        raise RuntimeError("disk unavailable")
+
+    monkeypatch.setattr(email_repository, "touch_hot_indexes", broken)
+    failing = Warmup()
+    report = failing.run()
+    assert report["error"] == "disk unavailable"
+    assert not failing.ready
+
+
+def test_pooled_connections_have_hot_statements_prepared(client):
+    hot = {email_repository.STATEMENTS[name] for name in email_repository.WARM_STATEMENTS}
+    with database.get_db() as conn:
+        assert hot <= conn.prepared_statements
@@ -0,0 +1,129 @@
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from app import database
+from app.jobs import job_queue
+from app.middleware import admission_controller
+from app.repositories import email_repository
+from app.services import archive_service
+from app.services.write_coalescer import write_coalescer
+
+
+@pytest.fixture()
+def coalescing(client, monkeypatch):
+    monkeypatch.setattr(write_coalescer, "enabled", True)
+    monkeypatch.setattr(write_coalescer, "window", 0.05)
+    monkeypatch.setattr(
+        admission_controller, "budgets", {name: (1000.0, 1000.0) for name in admission_controller.budgets}
+    )
+    return write_coalescer
+
+
+def test_concurrent_updates_share_a_commit(client, coalescing):
+    batches, writes = coalescing.batches, coalescing.writes
+    ids = [1, 2, 3, 4, 5, 6]
+    with ThreadPoolExecutor(len(ids)) as pool:
+        responses = list(
+            pool.map(lambda email_id: client.put(f"/emails/{email_id}", json={"is_read": True}), ids)
+        )
+
+    assert [response.status_code for response in responses] == [200] * len(ids)
+    assert all(response.json()["is_read"] for response in responses)
+    assert coalescing.writes - writes == len(ids)
+    assert coalescing.batches - batches < len(ids)
+    unread = {email["id"] for email in client.get("/emails?filter=unread").json()}
+    assert not unread & {str(email_id) for email_id in ids}
+
+
+def test_failed_write_rolls_back_alone(client, coalescing):
+    committed = []
+    barrier = threading.Barrier(3)
+
+    def write(subject, fail):
+        def run(conn):
+            conn.execute("UPDATE emails SET subject = ? WHERE id = ?", (subject, subject_ids[subject]))
+            database.on_commit(conn, lambda: committed.append(subject))
+            if fail:
+                raise ValueError("rejected")
+            return subject
+
+        barrier.wait()
+        return coalescing.submit(run)
+
+    subject_ids = {"first": 1, "broken": 2, "last": 3}
+    with ThreadPoolExecutor(3) as pool:
+        futures = {
+            subject: pool.submit(write, subject, subject == "broken") for subject in subject_ids
+        }
+
+    assert futures["first"].result() == "first"
+    assert futures["last"].result() == "last"
+    with pytest.raises(ValueError, match="rejected"):
+        futures["broken"].result()
+    assert sorted(committed) == ["first", "last"]
+    assert client.get("/emails/1").json()["subject"] == "first"
+    assert client.get("/emails/2").json()["subject"] != "broken"
+    assert client.get("/emails/3").json()["subject"] == "last"
+
+
+def test_coalesced_delete_and_missing_email(client, coalescing):
+    assert client.delete("/emails/4").status_code == 204
+    assert client.delete("/emails/4").status_code == 404
+    assert client.put("/emails/999", json={"is_read": True}).status_code == 404
+    assert client.get("/admin/stats").json()["write_coalescing"]["writes"] >= 2
+
+
+def test_disabled_coalescer_commits_directly(client):
+    assert not write_coalescer.enabled
+    batches = write_coalescer.batches
+    assert client.put("/emails/1", json={"is_archived": True}).status_code == 200
+    assert write_coalescer.batches == batches
+
+
+def test_new_leader_commits_leftovers_and_its_own_write(client, coalescing, monkeypatch):
+    from app.services.write_coalescer import _Write
+
+    monkeypatch.setattr(coalescing, "max_batch", 2)
+    # Left over from a full batch, before any of their submitters woke up.
+    leftovers = [_Write(lambda conn: "leftover") for _ in range(2)]
+    with coalescing._condition:
+        coalescing._pending.extend(leftovers)
+        coalescing._collecting = False
+
+    with ThreadPoolExecutor(1) as pool:
+        own = pool.submit(coalescing.submit, lambda conn: "own")
+        assert own.result(timeout=5) == "own"
+
+    assert [write.future.result(timeout=1) for write in leftovers] == ["leftover", "leftover"]
+    assert coalescing.snapshot()["pending"] == 0
+
+
+def test_archive_created_before_the_batch_begins_is_attached(
+    client, coalescing, monkeypatch, tmp_path
+):
+    job_queue.stop()
+    # Start over without an archive: new path, and pooled connections that have none attached.
+    monkeypatch.setattr(database, "ARCHIVE_DATABASE_PATH", str(tmp_path / "new-archive.db"))
+    monkeypatch.setattr(database, "_pool", queue.LifoQueue(maxsize=database.POOL_SIZE))
+    assert not database.archive_exists()
+    checks = []
+    cold_tier_available = email_repository.cold_tier_available
+
+    def archive_appears_after_the_check(conn, create=False):
+        available = cold_tier_available(conn, create)
+        if create:
+            return available
+        checks.append(available)
+        if len(checks) == 1:
+            # The retention job creates the archive between the check and BEGIN.
+            with database.get_db() as other:
+                archive_service.run_retention_batch(other)
+        return available
+
+    monkeypatch.setattr(email_repository, "cold_tier_available", archive_appears_after_the_check)
+    response = client.put("/emails/1", json={"is_read": True})
+    assert response.status_code == 200, response.text
+    assert checks[:2] == [False, True]